@@ -1,4 +1,6 @@
+import json
 import os
+import socket
 from pathlib import Path
 
 # Определение базовых путей
@@ -25,7 +27,14 @@ def validate_config():
         errors.append("Не установлен ID группы ВКонтакте (VK_GROUP_ID)")
     elif VK_GROUP_ID <= 0:
         errors.append("Некорректный ID группы ВКонтакте")
-    
+
+    if WEB_WORKERS_CONFIG['workers'] < 0:
+        errors.append("WEB_WORKERS не может быть отрицательным")
+    elif WEB_WORKERS_CONFIG['workers'] > 0 and not hasattr(socket, "SO_REUSEPORT"):
+        errors.append("WEB_WORKERS требует поддержки SO_REUSEPORT в ОС")
+    elif WEB_WORKERS_CONFIG['workers'] > 0 and WEB_WORKERS_CONFIG['metrics_port'] == APP_PORT:
+        errors.append("METRICS_PORT должен отличаться от APP_PORT")
+
     if errors:
         raise ValueError("\n".join(errors))
 
@@ -37,11 +46,116 @@ VK_GROUP_ID = int(os.getenv("VK_GROUP_ID", "228564877"))
 APP_HOST = os.getenv("APP_HOST", "0.0.0.0")
 APP_PORT = int(os.getenv("APP_PORT", "5000"))
 
+# Веб-воркеры: при workers > 0 веб-сервер работает в отдельных процессах,
+# слушающих APP_PORT через SO_REUSEPORT, а основной процесс - VK бот и
+# фоновые задачи. 0 - веб-сервер и бот в одном процессе
+WEB_WORKERS_CONFIG = {
+    'workers': int(os.getenv("WEB_WORKERS", "0")),
+    'heartbeat_interval': float(os.getenv("WEB_WORKER_HEARTBEAT", "1")),     # Период heartbeat, сек
+    'max_restart_delay': float(os.getenv("WEB_WORKER_MAX_RESTART_DELAY", "30")),
+    'shutdown_timeout': float(os.getenv("WEB_WORKER_SHUTDOWN_TIMEOUT", "10")),
+    # Служебный порт основного процесса (/metrics, /readyz, /healthz) при workers > 0
+    'metrics_port': int(os.getenv("METRICS_PORT", str(APP_PORT + 1)))
+}
+
+# Ограничения пакетного приема заявок (/submit/batch)
+BATCH_CONFIG = {
+    'max_items': int(os.getenv("BATCH_MAX_ITEMS", "5000")),
+    'max_body_bytes': int(os.getenv("BATCH_MAX_BODY_BYTES", str(5 * 1024 * 1024)))
+}
+
+# Ограничение частоты запросов к /submit с одного IP (ведро токенов)
+RATE_LIMIT_CONFIG = {
+    'rate': float(os.getenv("SUBMIT_RATE_PER_SEC", "0.5")),   # Пополнение, запросов в секунду
+    'burst': float(os.getenv("SUBMIT_RATE_BURST", "10")),     # Размер ведра
+    'max_clients': int(os.getenv("SUBMIT_RATE_MAX_CLIENTS", "10000")),
+    'trust_proxy': os.getenv("TRUST_PROXY", "0") == "1"       # Брать IP из X-Forwarded-For
+}
+
+# Ключи идемпотентности для /submit (заголовок Idempotency-Key)
+IDEMPOTENCY_CONFIG = {
+    'ttl': int(os.getenv("IDEMPOTENCY_TTL", str(24 * 3600))),     # Срок действия ключа, сек
+    'cache_size': int(os.getenv("IDEMPOTENCY_CACHE_SIZE", "10000"))
+}
+
+# Асинхронный прием заявок: /submit отвечает 202 сразу после записи в очередь,
+# заявки сохраняются в orders фоновым обработчиком
+INGEST_CONFIG = {
+    'enabled': os.getenv("SUBMIT_ASYNC", "0") == "1",
+    'batch_size': int(os.getenv("INGEST_BATCH_SIZE", "200")),           # Заявок за одну транзакцию
+    'poll_interval': float(os.getenv("INGEST_POLL_INTERVAL", "1")),     # Период опроса, сек
+    'max_attempts': int(os.getenv("INGEST_MAX_ATTEMPTS", "5")),         # После - статус failed
+    'retention_hours': int(os.getenv("INGEST_RETENTION_HOURS", "72"))   # Хранение обработанных
+}
+
+# API заявок для операторов (/api/orders), без токена API отключен
+OPERATOR_API_CONFIG = {
+    'token': os.getenv("OPERATOR_API_TOKEN", ""),                       # Bearer-токен
+    'default_limit': int(os.getenv("OPERATOR_API_DEFAULT_LIMIT", "50")),
+    'max_limit': int(os.getenv("OPERATOR_API_MAX_LIMIT", "1000")),
+    'gzip_min_items': int(os.getenv("OPERATOR_API_GZIP_MIN_ITEMS", "100"))  # Сжимать страницы от этого размера
+}
+
+# Лента событий заявок для операторов (SSE / WebSocket)
+FEED_CONFIG = {
+    'client_buffer': int(os.getenv("FEED_CLIENT_BUFFER", "256")),   # Событий в очереди клиента, при переполнении - отключение
+    'history_size': int(os.getenv("FEED_HISTORY_SIZE", "1000")),    # Событий в памяти для возобновления
+    'max_backfill': int(os.getenv("FEED_MAX_BACKFILL", "5000")),    # Событий из базы при возобновлении
+    'max_clients': int(os.getenv("FEED_MAX_CLIENTS", "500")),
+    'heartbeat': float(os.getenv("FEED_HEARTBEAT", "15")),          # Период ping, сек
+    'poll_interval': float(os.getenv("FEED_POLL_INTERVAL", "5"))    # Опрос outbox без сигнала, сек
+}
+
+# Конвейер обработки сообщений бота (services/pipeline.py): этапы ingest,
+# dedupe, throttle, state_load, handle, persist, render, send
+PIPELINE_CONFIG = {
+    'skip': [name.strip() for name in os.getenv("PIPELINE_SKIP", "").split(",") if name.strip()],  # Отключенные этапы
+    'dedupe_size': int(os.getenv("PIPELINE_DEDUPE_SIZE", "10000"))   # Последних событий для отсева повторов
+}
+
+# Бюджет времени на обработку одного сообщения бота: обращения к VK API, базе
+# и приемникам уведомлений ждут не дольше остатка, по истечении обработка
+# отменяется и пользователю уходит короткий ответ об ошибке
+DEADLINE_CONFIG = {
+    'message_budget': float(os.getenv("MESSAGE_DEADLINE", "15")),            # Сек, 0 - без ограничения
+    'fallback_timeout': float(os.getenv("MESSAGE_FALLBACK_TIMEOUT", "5"))    # Отправка ответа об ошибке, сек
+}
+
+# Ограничение частоты сообщений одного пользователя бота (ведро токенов)
+FLOOD_CONFIG = {
+    'rate': float(os.getenv("USER_RATE_PER_SEC", "1")),          # Пополнение, сообщений в секунду
+    'burst': float(os.getenv("USER_RATE_BURST", "8")),           # Размер ведра
+    'mute_after': int(os.getenv("USER_MUTE_AFTER", "10")),       # Отброшенных подряд до заглушения, 0 - не глушить
+    'mute_seconds': float(os.getenv("USER_MUTE_SECONDS", "300")),
+    'max_users': int(os.getenv("USER_RATE_MAX_USERS", "10000")),
+    # Склейка серий текста на шагах описания задачи
+    'coalesce_window': float(os.getenv("COALESCE_WINDOW", "1")),    # Пауза, завершающая серию, сек (0 - не склеивать)
+    'coalesce_max_wait': float(os.getenv("COALESCE_MAX_WAIT", "5"))  # Максимальная задержка ответа, сек
+}
+
+# Незаконченные заявки: черновик удаляется через ttl секунд без ответа
+# пользователя, при reminder=1 пользователю уходит напоминание
+DRAFT_CONFIG = {
+    'ttl': float(os.getenv("DRAFT_TTL", "1800")),                  # 0 - не удалять
+    'reminder': os.getenv("DRAFT_REMINDER", "1") == "1",
+    'tick': float(os.getenv("DRAFT_TIMER_TICK", "1")),             # Точность таймеров, сек
+    'send_queue_size': int(os.getenv("SEND_QUEUE_SIZE", "1000"))   # Очередь фоновых сообщений
+}
+
+# Локализация: период проверки изменений locales/*.json, сек (0 - без перезагрузки)
+LOCALIZATION_CONFIG = {
+    'reload_interval': float(os.getenv("LOCALES_RELOAD_INTERVAL", "5"))
+}
+
 # Пути к файлам
 DATABASE_PATH = DATA_DIR / 'orders.db'
+INGEST_QUEUE_PATH = DATA_DIR / 'ingest_queue.db'
+LOCALES_DIR = BASE_DIR / 'locales'
 LOG_FILE = LOG_DIR / 'bot.log'
 
-# Настройки логирования
+# Настройки логирования: обработчики работают в фоновом потоке через очередь
+# (config/logging_config.py), файл ротируется по размеру, старые части сжимаются gzip
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
 LOGGING_CONFIG = {
     'version': 1,
     'disable_existing_loggers': False,
@@ -54,24 +168,37 @@ LOGGING_CONFIG = {
         'console': {
             'class': 'logging.StreamHandler',
             'formatter': 'detailed',
-            'level': 'INFO',
+            'level': LOG_LEVEL,
         },
         'file': {
-            'class': 'logging.FileHandler',
+            'class': 'config.logging_config.CompressedRotatingFileHandler',
             'filename': str(LOG_FILE),
+            'maxBytes': int(os.getenv("LOG_MAX_BYTES", str(10 * 1024 * 1024))),
+            'backupCount': int(os.getenv("LOG_BACKUP_COUNT", "5")),
+            'encoding': 'utf-8',
             'formatter': 'detailed',
-            'level': 'INFO',
+            'level': LOG_LEVEL,
         }
     },
     'loggers': {
         '': {  # Корневой логгер
             'handlers': ['console', 'file'],
-            'level': 'INFO',
+            'level': LOG_LEVEL,
             'propagate': True
         }
     }
 }
 
+# Прореживание однотипных INFO-записей обработки сообщений
+LOG_SAMPLING_CONFIG = {
+    'every': int(os.getenv("LOG_SAMPLE_EVERY", "10")),     # Из скольких записей пишется одна (1 - все)
+    'loggers': [
+        name.strip() for name in
+        os.getenv("LOG_SAMPLED_LOGGERS", "services.vk_service,services.pipeline,dialogs.handlers").split(",")
+        if name.strip()
+    ]
+}
+
 # Настройки базы данных
 DB_CONFIG = {
     'pragmas': {
@@ -81,5 +208,71 @@ DB_CONFIG = {
     }
 }
 
+# Настройки HTTP-клиента для уведомлений в Telegram
+TELEGRAM_WEBHOOK = os.getenv("TELEGRAM_WEBHOOK", "https://telegram-form.creatmanick-850.workers.dev")
+TELEGRAM_HTTP_CONFIG = {
+    'connect_timeout': float(os.getenv("TELEGRAM_CONNECT_TIMEOUT", "3")),  # Установка соединения, сек
+    'read_timeout': float(os.getenv("TELEGRAM_READ_TIMEOUT", "10")),       # Ожидание ответа, сек
+    'pool_limit': int(os.getenv("TELEGRAM_POOL_LIMIT", "10")),             # Максимум соединений
+    'dns_cache_ttl': int(os.getenv("TELEGRAM_DNS_CACHE_TTL", "300")),      # Кэш DNS, сек
+    'keepalive_timeout': float(os.getenv("TELEGRAM_KEEPALIVE", "60"))      # Простой соединения, сек
+}
+
+# Приемники уведомлений (JSON-список), по умолчанию - webhook Telegram для всех событий.
+# Пример: [{"name": "ops", "type": "telegram", "url": "https://...", "events": ["order_created"],
+#           "timeout": 5, "concurrency": 2, "failure_threshold": 5, "reset_timeout": 30},
+#          {"name": "crm", "type": "http", "url": "http://crm.local/hook", "events": ["*"], "required": false}]
+# Событие outbox доставлено, когда его получили все приемники с "required": true (по умолчанию);
+# при повторе уведомление уходит только в приемники, которые его еще не получили.
+NOTIFICATION_SINKS = json.loads(os.getenv("NOTIFICATION_SINKS") or "null") or [
+    {"name": "telegram", "type": "telegram", "url": TELEGRAM_WEBHOOK, "events": ["*"]}
+]
+
+# Подавление повторяющихся уведомлений об ошибках
+ERROR_THROTTLE_CONFIG = {
+    'limit': int(os.getenv("ERROR_NOTIFY_LIMIT", "3")),         # Уведомлений на отпечаток за окно
+    'window': float(os.getenv("ERROR_NOTIFY_WINDOW", "300"))    # Скользящее окно, сек
+}
+
+# Настройки фоновой доставки уведомлений (outbox)
+OUTBOX_CONFIG = {
+    'poll_interval': float(os.getenv("OUTBOX_POLL_INTERVAL", "5")),   # Период опроса, сек
+    'batch_size': int(os.getenv("OUTBOX_BATCH_SIZE", "50")),          # Событий за один проход
+    'max_attempts': int(os.getenv("OUTBOX_MAX_ATTEMPTS", "8")),       # После - статус dead
+    'backoff_base': float(os.getenv("OUTBOX_BACKOFF_BASE", "5")),     # Первая задержка, сек
+    'backoff_max': float(os.getenv("OUTBOX_BACKOFF_MAX", "900")),     # Максимальная задержка, сек
+    'retention_days': int(os.getenv("OUTBOX_RETENTION_DAYS", "7"))    # Хранение доставленных
+}
+
+# Режим сводок: уведомления копятся в outbox и уходят одним сообщением
+NOTIFICATION_DIGEST = {
+    'enabled': os.getenv("DIGEST_ENABLED", "0") == "1",
+    'window': float(os.getenv("DIGEST_WINDOW", "60")),          # Максимальное ожидание, сек
+    'max_events': int(os.getenv("DIGEST_MAX_EVENTS", "20")),    # Событий в одной сводке
+    # Типы событий, которые отправляются сразу, минуя сводку
+    'urgent_events': [
+        event.strip() for event in os.getenv("DIGEST_URGENT_EVENTS", "").split(",") if event.strip()
+    ]
+}
+
+# Настройки резервного копирования
+BACKUP_DIR = Path(os.getenv("BACKUP_DIR", str(DATA_DIR / 'backups')))
+BACKUP_CONFIG = {
+    'interval_hours': float(os.getenv("BACKUP_INTERVAL_HOURS", "6")),  # 0 - отключить расписание
+    'keep': int(os.getenv("BACKUP_KEEP", "14")),                       # Сколько копий хранить
+    'compress': os.getenv("BACKUP_COMPRESS", "1") == "1",              # Сжатие gzip
+    'pages_per_step': int(os.getenv("BACKUP_PAGES_PER_STEP", "64")),   # Страниц за один шаг
+    'step_pause': float(os.getenv("BACKUP_STEP_PAUSE", "0.005")),      # Пауза между шагами, сек
+    'max_restarts': int(os.getenv("BACKUP_MAX_RESTARTS", "3"))         # Перезапусков до копирования за один шаг
+}
+
+# Проверка готовности (/readyz)
+READINESS_CONFIG = {
+    'check_timeout': float(os.getenv("READY_CHECK_TIMEOUT", "1")),         # Таймаут одной проверки, сек
+    'cache_ttl': float(os.getenv("READY_CACHE_TTL", "1")),                 # Кэш результата, сек
+    'longpoll_max_age': float(os.getenv("READY_LONGPOLL_MAX_AGE", "90")),  # Допустимое время с последнего опроса
+    'outbox_max_backlog': int(os.getenv("READY_OUTBOX_MAX_BACKLOG", "500"))
+}
+
 # Проверяем конфигурацию при импорте
 validate_config()
\ No newline at end of file
@@ -1,55 +1,140 @@
 """
 Конфигурация логирования для приложения
+
+Обработчики из LOGGING_CONFIG (консоль, файл) не вызываются из цикла
+событий напрямую: корневой логгер получает один QueueHandler, а запись
+на диск и в консоль выполняет QueueListener в фоновом потоке. Файл
+ротируется по размеру, старые части сжимаются gzip (тоже в фоновом
+потоке). Однотипные INFO-записи горячего пути прореживаются
+SamplingFilter до постановки в очередь.
 """
 
-import os
-from logging.handlers import RotatingFileHandler
+import atexit
+import copy
+import gzip
 import logging
+import logging.config
+import multiprocessing
+import os
+import queue
+import shutil
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from typing import Any, Dict, Hashable, Iterable, Optional
+
+class CompressedRotatingFileHandler(RotatingFileHandler):
+    """RotatingFileHandler, сжимающий ротированные файлы: bot.log.1.gz, bot.log.2.gz, ..."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.namer = self._gzip_name
+        self.rotator = self._compress
+
+    @staticmethod
+    def _gzip_name(name: str) -> str:
+        return name + ".gz"
+
+    @staticmethod
+    def _compress(source: str, dest: str) -> None:
+        with open(source, "rb") as src, gzip.open(dest, "wb") as dst:
+            shutil.copyfileobj(src, dst)
+        os.remove(source)
+
+class SamplingFilter(logging.Filter):
+    """
+    Прореживание однотипных INFO-записей
+
+    Однотипные - с одним логгером и одним шаблоном сообщения (record.msg),
+    поэтому на горячем пути аргументы передаются отдельно:
+    logger.info("Ответ отправлен пользователю %s", user_id). Из каждых
+    every таких записей пропускается первая; записи других уровней и
+    логгеров не затрагиваются.
+    """
+
+    def __init__(self, every: int, loggers: Iterable[str] = (), max_keys: int = 1000):
+        """
+        Args:
+            every: Из скольких однотипных записей пропускается одна (1 - все)
+            loggers: Прореживаемые логгеры (с дочерними); пусто - все
+            max_keys: Шаблонов в счетчиках, при превышении счетчики сбрасываются
+        """
+        super().__init__()
+        self.every = every
+        self.loggers = tuple(loggers)
+        self.prefixes = tuple(f"{name}." for name in self.loggers)
+        self.max_keys = max_keys
+        self.dropped = 0
+        self._counts: Dict[Hashable, int] = {}
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno != logging.INFO or self.every <= 1 or not isinstance(record.msg, str):
+            return True
+        if self.loggers and record.name not in self.loggers and not record.name.startswith(self.prefixes):
+            return True
+
+        key = (record.name, record.msg)
+        count = self._counts.get(key)
+        if count is None:
+            if len(self._counts) >= self.max_keys:
+                self._counts.clear()
+            count = 0
+        self._counts[key] = count + 1
+        if count % self.every:
+            self.dropped += 1
+            return False
+        return True
+
+class _BackgroundListener(QueueListener):
+    """QueueListener, который можно остановить повторно (явно и при выходе)"""
+
+    def stop(self) -> None:
+        if self._thread is not None:
+            super().stop()
+
+def _per_process_files(config: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Отдельный файл лога для дочернего процесса (веб-воркера)
+
+    Ротация одного файла из нескольких процессов теряет записи, поэтому
+    воркер web-worker-1 пишет в bot.web-worker-1.log.
+    """
+    name = multiprocessing.current_process().name
+    if name == "MainProcess":
+        return config
+    config = copy.deepcopy(config)
+    for handler in config.get("handlers", {}).values():
+        filename = handler.get("filename")
+        if filename:
+            base, ext = os.path.splitext(filename)
+            handler["filename"] = f"{base}.{name}{ext}"
+    return config
+
+def setup_logging(config: Dict[str, Any], sampling: Optional[Dict[str, Any]] = None) -> QueueListener:
+    """
+    Настройка системы логирования
+
+    Args:
+        config: Конфигурация для logging.config.dictConfig
+        sampling: Параметры SamplingFilter (every, loggers)
+
+    Returns:
+        QueueListener: Фоновый писатель; останавливается при выходе из процесса
+    """
+    logging.config.dictConfig(_per_process_files(config))
+
+    # Обработчики корневого логгера переезжают в фоновый поток
+    root = logging.getLogger()
+    handlers = list(root.handlers)
+    for handler in handlers:
+        root.removeHandler(handler)
+
+    log_queue: "queue.SimpleQueue[logging.LogRecord]" = queue.SimpleQueue()
+    queue_handler = QueueHandler(log_queue)
+    if sampling and sampling.get("every", 1) > 1:
+        queue_handler.addFilter(SamplingFilter(sampling["every"], sampling.get("loggers", ())))
+    root.addHandler(queue_handler)
 
-# Создаем директорию для логов, если её нет
-LOGS_DIR = "logs"
-if not os.path.exists(LOGS_DIR):
-    os.makedirs(LOGS_DIR)
-
-# Настройки логирования
-LOGGING_CONFIG = {
-    'version': 1,
-    'disable_existing_loggers': False,
-    'formatters': {
-        'standard': {
-            'format': '%(asctime)s [%(levelname)s] %(name)s: %(message)s'
-        },
-    },
-    'handlers': {
-        'console': {
-            'class': 'logging.StreamHandler',
-            'level': 'INFO',
-            'formatter': 'standard',
-            'stream': 'ext://sys.stdout'
-        },
-        'file': {
-            'class': 'logging.FileHandler',
-            'level': 'INFO',
-            'formatter': 'standard',
-            'filename': 'app.log',
-            'mode': 'a',
-        }
-    },
-    'loggers': {
-        '': {  # root logger
-            'handlers': ['console', 'file'],
-            'level': 'INFO',
-            'propagate': True
-        }
-    }
-}
-
-def setup_logging():
-    """Настройка системы логирования"""
-    logging.config.dictConfig(LOGGING_CONFIG)
-    
-    # Создаем логгер для бота
-    logger = logging.getLogger('bot')
-    logger.info('Логирование настроено')
-    
-    return logger 
\ No newline at end of file
+    listener = _BackgroundListener(log_queue, *handlers, respect_handler_level=True)
+    listener.start()
+    # Записи, оставшиеся в очереди, дописываются при завершении
+    atexit.register(listener.stop)
+    return listener
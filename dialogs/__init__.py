@@ -13,7 +13,10 @@
 - states.py: Определение состояний диалога и переходов между ними
 - keyboard.py: Генерация клавиатур для разных состояний
 - handlers.py: Обработчики пользовательского ввода
+- state_machine.py: Таблица обработчиков состояний и проверка переходов
+- intents.py: Распознавание намерений по кнопкам и свободному тексту
 - messages.py: Шаблоны сообщений и текстов
+- templates.py: Каталог скомпилированных шаблонов ответов по языкам
 
 Основные возможности:
 1. Управление состояниями:
@@ -75,7 +78,10 @@ if current_state == DialogState.CONTACT_INPUT:
 
 from .states import DialogState, OrderStatus, STATE_TRANSITIONS, STATE_MESSAGES, GLOBAL_COMMANDS
 from .handlers import DialogHandler
+from .intents import Intent, IntentMatcher, normalize_text
+from .state_machine import DialogInput, InvalidTransition, state_handler
 from .messages import MessageBuilder
+from .templates import Template, TemplateCatalog
 from .keyboard import KeyboardBuilder, MAIN_MENU_KEYBOARD, SERVICE_TYPE_KEYBOARD, CONFIRMATION_KEYBOARD, HELP_KEYBOARD, CANCEL_KEYBOARD
 
 __all__ = [
@@ -85,7 +91,15 @@ __all__ = [
     'STATE_MESSAGES',
     'GLOBAL_COMMANDS',
     'DialogHandler',
+    'DialogInput',
+    'Intent',
+    'IntentMatcher',
+    'normalize_text',
+    'InvalidTransition',
+    'state_handler',
     'MessageBuilder',
+    'Template',
+    'TemplateCatalog',
     'KeyboardBuilder',
     'MAIN_MENU_KEYBOARD',
     'SERVICE_TYPE_KEYBOARD',
@@ -3,34 +3,65 @@
 """
 
 import logging
-from typing import Tuple, Dict, Any
+from typing import Any, Optional
 
-from .states import DialogState, STATE_MESSAGES, STATE_TRANSITIONS
-from .keyboard import KeyboardBuilder
+from .states import DialogState, GLOBAL_COMMANDS
+from .intents import Intent, IntentMatcher, LOCALE_BUTTONS, normalize_text
+from .state_machine import (
+    DialogInput,
+    HandlerResult,
+    check_transition,
+    compile_handlers,
+    state_handler,
+    validate_state_machine
+)
+from .templates import TemplateCatalog
 from models.schemas import UserState
 from services.storage_service import StorageService
 from utils.helpers import PhoneNumberHelper, TextHelper, DateTimeHelper, OrderHelper
-from services.telegram_service import TelegramService
+from utils.deadline import DeadlineExceeded
+from utils.metrics import ERRORS_TOTAL
 
 logger = logging.getLogger(__name__)
 
 class DialogHandler:
-    """Обработчик диалогов"""
+    """
+    Обработчик диалогов
+
+    Ввод в каждом состоянии обрабатывает один метод, помеченный
+    state_handler; таблица состояние -> метод собирается при создании
+    обработчика (см. dialogs.state_machine). Тексты ответов берутся из
+    каталога шаблонов на языке пользователя (см. dialogs.templates).
+    """
+
+    # Ответы на глобальные команды: состояние и флаг клавиатуры
+    GLOBAL_COMMAND_KEYBOARDS = {
+        DialogState.START: {"show_start": True},
+        DialogState.MAIN_MENU: {"show_main_menu": True},
+        DialogState.HELP: {"show_help": True},
+        DialogState.CANCEL_CONFIRMATION: {"show_cancel": True}
+    }
     
-    def __init__(self, storage: StorageService):
+    def __init__(self, storage: StorageService, templates: Optional[TemplateCatalog] = None):
         self.storage = storage
+        self.templates = templates or TemplateCatalog()
+        self.handlers = compile_handlers(self)
+        self.intents = IntentMatcher()
+        self.validation_report = validate_state_machine(self.handlers)
         
     async def handle_state(
         self,
         user_state: UserState,
-        message: str
-    ) -> Tuple[DialogState, str, Dict[str, Any]]:
+        message: str,
+        payload: Any = None
+    ) -> HandlerResult:
         """
         Обработка текущего состояния диалога
         
         Args:
             user_state: Текущее состояние пользователя
             message: Сообщение от пользователя
+            payload: Полезная нагрузка нажатой кнопки (если есть)
             
         Returns:
             Tuple[DialogState, str, Dict[str, Any]]: 
@@ -40,271 +71,238 @@ class DialogHandler:
         """
         try:
             current_state = DialogState[user_state.state]
-            logger.info(f"Обработка состояния {current_state} с сообщением: {message}")
+            logger.info("Обработка состояния %s с сообщением: %s", current_state, message)
+            normalized = normalize_text(message)
             
             # Проверяем глобальные команды
-            if message.startswith('/'):
-                command = message.lower()
-                if command == '/start':
-                    return DialogState.START, STATE_MESSAGES[DialogState.START], {"show_start": True}
-                elif command == '/menu':
-                    return DialogState.MAIN_MENU, STATE_MESSAGES[DialogState.MAIN_MENU], {"show_main_menu": True}
-                elif command == '/help':
-                    return DialogState.HELP, STATE_MESSAGES[DialogState.HELP], {"show_help": True}
-                elif command == '/cancel':
-                    return DialogState.CANCEL_CONFIRMATION, STATE_MESSAGES[DialogState.CANCEL_CONFIRMATION], {"show_cancel": True}
+            command_state = GLOBAL_COMMANDS.get(normalized)
+            # Нажатая кнопка распознается по полезной нагрузке, текст не разбирается
+            match = self.intents.match_payload(payload) if payload else None
+            if match and match.intent is Intent.START:
+                command_state = DialogState.START
+            if command_state:
+                return command_state, self._state_text(user_state, command_state), dict(self.GLOBAL_COMMAND_KEYBOARDS[command_state])
             
-            # Обработка состояний
-            if current_state == DialogState.START:
-                return DialogState.MAIN_MENU, STATE_MESSAGES[DialogState.MAIN_MENU], {"show_main_menu": True}
-                
-            elif current_state == DialogState.MAIN_MENU:
-                if "заявк" in message.lower():
-                    return DialogState.CHOOSING_SERVICE_TYPE, STATE_MESSAGES[DialogState.CHOOSING_SERVICE_TYPE], {"show_service_types": True}
-                elif "помощь" in message.lower():
-                    return DialogState.HELP, STATE_MESSAGES[DialogState.HELP], {"show_help": True}
-                else:
-                    return current_state, "Выберите действие из меню:", {"show_main_menu": True}
-                    
-            elif current_state == DialogState.CHOOSING_SERVICE_TYPE:
-                if "населен" in message.lower():
-                    return DialogState.PERSONAL_TASK_INPUT, STATE_MESSAGES[DialogState.PERSONAL_TASK_INPUT], {"show_back": True}
-                elif "бизнес" in message.lower():
-                    return DialogState.BUSINESS_TYPE_INPUT, STATE_MESSAGES[DialogState.BUSINESS_TYPE_INPUT], {"show_back": True}
-                else:
-                    return current_state, "Пожалуйста, выберите тип услуг:", {"show_service_types": True}
-                    
-            elif current_state == DialogState.PERSONAL_TASK_INPUT:
-                message = TextHelper.clean_text(message)
-                if not message or len(message.strip()) < 10:
-                    return (
-                        DialogState.PERSONAL_TASK_INPUT,
-                        "Пожалуйста, опишите вашу задачу подробнее (минимум 10 символов):\n\n"
-                        "Например:\n"
-                        "- Нужна помощь с настройкой принтера\n"
-                        "- Не работает интернет\n"
-                        "- Требуется обучение работе с Excel\n\n"
-                        "Для отмены введите /cancel",
-                        {"show_back": True}
-                    )
-                    
-                user_state.temp_data["task"] = message
-                return (
-                    DialogState.CONTACT_INPUT,
-                    "Для связи с вами укажите, пожалуйста, номер телефона:\n"
-                    "Формат: 89991234567\n\n"
-                    "Для отмены введите /cancel",
-                    {"show_back": True}
-                )
-                
-            elif current_state == DialogState.CONTACT_INPUT:
-                if not PhoneNumberHelper.is_valid_phone(message):
-                    return (
-                        DialogState.CONTACT_INPUT,
-                        "Некорректный формат номера телефона. Пожалуйста, введите номер в формате: 89991234567\n\n"
-                        "Для отмены введите /cancel",
-                        {"show_back": True}
-                    )
-
-                user_state.temp_data["phone"] = PhoneNumberHelper.format_phone(message)
-                
-                # Формируем детали заявки для подтверждения
-                order_details = (
-                    f"Имя: {user_state.context['name']}\n"
-                    f"Телефон: {user_state.temp_data['phone']}\n"
-                    f"Описание: {user_state.temp_data['task']}"
-                )
-                
-                if user_state.temp_data.get("business_type"):
-                    order_details += f"\nТип бизнеса: {user_state.temp_data['business_type']}"
-                    
-                return (
-                    DialogState.ORDER_CONFIRMATION,
-                    f"Проверьте данные вашей заявки:\n\n{order_details}\n\nВсё верно?",
-                    {"show_confirmation": True}
-                )
-                
-            elif current_state == DialogState.ORDER_CONFIRMATION:
-                if message.lower() in ["подтвердить", "отправить заявку"]:
-                    # Создаем заявку
-                    order_id = await self.storage.create_order(
-                        user_id=user_state.user_id,
-                        name=user_state.context["name"],
-                        phone=user_state.temp_data["phone"],
-                        task=user_state.temp_data["task"],
-                        business_type=user_state.temp_data.get("business_type")
-                    )
-                    
-                    # Получаем созданную заявку
-                    order = await self.storage.get_order(order_id)
-                    if order:
-                        # Отправляем уведомление в Telegram
-                        await TelegramService.notify_new_order(order)
-                    
-                    # Очищаем временные данные
-                    user_state.temp_data = {}
-                    
-                    return (
-                        DialogState.FINISHED,
-                        f"Спасибо! Ваша заявка №{order_id} принята. "
-                        "Мы свяжемся с вами в ближайшее время.",
-                        {"show_main_menu": True}
-                    )
-                else:
-                    return (
-                        DialogState.CHOOSING_SERVICE_TYPE,
-                        "Хорошо, давайте заполним заявку заново. Выберите категорию услуг:",
-                        {"show_service_types": True}
-                    )
+            handler = self.handlers.get(current_state)
+            if handler is None:
+                # Если состояние не обработано, возвращаемся в главное меню
+                logger.warning("Необработанное состояние %s", current_state)
+                return DialogState.MAIN_MENU, self._state_text(user_state, DialogState.MAIN_MENU), {"show_main_menu": True}
             
-            # Если состояние не обработано, возвращаемся в главное меню
-            logger.warning(f"Необработанное состояние {current_state}")
-            return DialogState.MAIN_MENU, STATE_MESSAGES[DialogState.MAIN_MENU], {"show_main_menu": True}
+            if match is None:
+                match = self.intents.match(current_state, normalized)
+            dialog_input = DialogInput(
+                message or "",
+                (message or "").strip(),
+                normalized,
+                match.intent if match else None,
+                match.args if match else None
+            )
+            result = await handler(user_state, dialog_input)
+            check_transition(current_state, result[0])
+            return result
             
+        except DeadlineExceeded:
+            # Срок сообщения истек - обработка прерывается целиком, без ответа об ошибке диалога
+            raise
         except Exception as e:
-            logger.error(f"Ошибка при обработке состояния: {e}", exc_info=True)
-            return DialogState.ERROR_HANDLING, STATE_MESSAGES[DialogState.ERROR_HANDLING], {"show_error": True}
+            ERRORS_TOTAL.labels("dialog").inc()
+            logger.error("Ошибка при обработке состояния: %s", e, exc_info=True)
+            return DialogState.ERROR_HANDLING, self._state_text(user_state, DialogState.ERROR_HANDLING), {"show_error": True}
 
-    async def handle_start(self, user_state: UserState, message: str) -> Tuple[DialogState, str, Dict[str, Any]]:
-        """Обработка начального состояния"""
-        # Проверяем наличие активных заявок
-        orders = await self.storage.get_user_orders(user_state.user_id)
-        keyboard_data = {
-            "show_orders": bool(orders),
-            "show_new_order": True
-        }
-        
-        return (
-            DialogState.MAIN_MENU,
-            f"Здравствуйте, {user_state.context['name']}! "
-            "Я автоматический помощник сообщества IT-Помощь в Поварово.\n\n"
-            "Чем могу помочь?",
-            keyboard_data
-        )
+    @state_handler(DialogState.START)
+    async def handle_start(self, user_state: UserState, message: DialogInput) -> HandlerResult:
+        """Обработка начального состояния (кнопка English сразу переключает язык)"""
+        if message.intent is Intent.SET_LOCALE and self._set_locale(user_state, message):
+            return DialogState.MAIN_MENU, self._text(user_state, "language.changed"), {"show_main_menu": True}
+        return DialogState.MAIN_MENU, self._state_text(user_state, DialogState.MAIN_MENU), {"show_main_menu": True}
 
-    async def handle_main_menu(self, user_state: UserState, message: str) -> Tuple[DialogState, str, Dict[str, Any]]:
-        """Обработка главного меню"""
-        if message.lower() in ["создать заявку", "новая заявка"]:
-            return (
-                DialogState.CHOOSING_SERVICE_TYPE,
-                "Выберите категорию услуг:",
-                {"show_service_types": True}
-            )
-        elif message.lower() == "мои заявки":
+    @state_handler(DialogState.MAIN_MENU, DialogState.HELP, DialogState.FINISHED)
+    async def handle_main_menu(self, user_state: UserState, message: DialogInput) -> HandlerResult:
+        """Обработка главного меню (те же кнопки показываются в справке и после заявки)"""
+        if message.intent is Intent.MY_ORDERS:
             return await self.handle_orders_list(user_state)
+        elif message.intent is Intent.CREATE_ORDER:
+            return DialogState.CHOOSING_SERVICE_TYPE, self._state_text(user_state, DialogState.CHOOSING_SERVICE_TYPE), {"show_service_types": True}
+        elif message.intent is Intent.HELP:
+            return DialogState.HELP, self._state_text(user_state, DialogState.HELP), {"show_help": True}
+        elif message.intent is Intent.LANGUAGE:
+            return DialogState.LANGUAGE_SELECTION, self._state_text(user_state, DialogState.LANGUAGE_SELECTION), {"show_language": True}
         else:
-            return (
-                DialogState.MAIN_MENU,
-                "Пожалуйста, выберите действие с помощью кнопок:",
-                {"show_main_menu": True}
-            )
+            return DialogState.MAIN_MENU, self._text(user_state, "menu.choose"), {"show_main_menu": True}
+
+    @state_handler(DialogState.LANGUAGE_SELECTION)
+    async def handle_language_selection(self, user_state: UserState, message: DialogInput) -> HandlerResult:
+        """Выбор языка: сохраняется в контексте пользователя и действует со следующего ответа"""
+        if message.intent in (Intent.MENU, Intent.BACK):
+            return DialogState.MAIN_MENU, self._state_text(user_state, DialogState.MAIN_MENU), {"show_main_menu": True}
+        if message.intent is Intent.SET_LOCALE and self._set_locale(user_state, message):
+            return DialogState.MAIN_MENU, self._text(user_state, "language.changed"), {"show_main_menu": True}
+        return DialogState.LANGUAGE_SELECTION, self._state_text(user_state, DialogState.LANGUAGE_SELECTION), {"show_language": True}
+
+    def _set_locale(self, user_state: UserState, message: DialogInput) -> bool:
+        """Язык из нажатой кнопки в UserState.context['locale']; False, если языка нет в каталоге"""
+        locale = (message.args or {}).get("locale") or LOCALE_BUTTONS.get(message.normalized)
+        if locale not in self.templates.locales:
+            return False
+        user_state.context["locale"] = locale
+        return True
 
-    async def handle_service_choice(self, user_state: UserState, message: str) -> Tuple[DialogState, str, Dict[str, Any]]:
+    @state_handler(DialogState.CHOOSING_SERVICE_TYPE)
+    async def handle_service_choice(self, user_state: UserState, message: DialogInput) -> HandlerResult:
         """Обработка выбора типа услуг"""
-        if message.lower() == "услуги для бизнеса":
-            return (
-                DialogState.BUSINESS_TYPE_INPUT,
-                "Расскажите кратко о вашей компании:",
-                {"show_back": True}
-            )
-        elif message.lower() == "услуги населению":
-            return (
-                DialogState.PERSONAL_TASK_INPUT,
-                "Опишите, какая помощь вам требуется:",
-                {"show_back": True}
-            )
+        if message.intent is Intent.SERVICE_PERSONAL:
+            return DialogState.PERSONAL_TASK_INPUT, self._state_text(user_state, DialogState.PERSONAL_TASK_INPUT), {"show_back": True}
+        elif message.intent is Intent.SERVICE_BUSINESS:
+            return DialogState.BUSINESS_TYPE_INPUT, self._state_text(user_state, DialogState.BUSINESS_TYPE_INPUT), {"show_back": True}
+        elif message.intent is Intent.HELP:
+            return DialogState.HELP, self._state_text(user_state, DialogState.HELP), {"show_help": True}
+        elif message.intent in (Intent.BACK, Intent.MENU):
+            return DialogState.MAIN_MENU, self._state_text(user_state, DialogState.MAIN_MENU), {"show_main_menu": True}
         else:
-            return (
-                DialogState.CHOOSING_SERVICE_TYPE,
-                "Пожалуйста, выберите тип услуг с помощью кнопок:",
-                {"show_service_types": True}
-            )
-    async def handle_business_type(self, user_state: UserState, message: str) -> Tuple[DialogState, str, Dict[str, Any]]:
+            return DialogState.CHOOSING_SERVICE_TYPE, self._text(user_state, "service.choose_again"), {"show_service_types": True}
+
+    @state_handler(DialogState.BUSINESS_TYPE_INPUT)
+    async def handle_business_type(self, user_state: UserState, message: DialogInput) -> HandlerResult:
         """Обработка ввода типа бизнеса"""
-        message = TextHelper.clean_text(message)
-        if not message:
+        navigation = await self._input_navigation(user_state, message, DialogState.CHOOSING_SERVICE_TYPE)
+        if navigation:
+            return navigation
+
+        text = TextHelper.clean_text(message.text)
+        if not text:
             return (
                 DialogState.BUSINESS_TYPE_INPUT,
-                "Пожалуйста, введите информацию о вашей компании:",
+                self._text(user_state, "business_type.empty"),
                 {"show_back": True}
             )
             
-        user_state.temp_data["business_type"] = message
+        user_state.temp_data["business_type"] = text
         return (
             DialogState.BUSINESS_TASK_INPUT,
-            "Опишите, какая помощь требуется для вашего бизнеса:",
+            self._state_text(user_state, DialogState.BUSINESS_TASK_INPUT),
             {"show_back": True}
         )
 
-    async def handle_business_task(self, user_state: UserState, message: str) -> Tuple[DialogState, str, Dict[str, Any]]:
+    @state_handler(DialogState.BUSINESS_TASK_INPUT)
+    async def handle_business_task(self, user_state: UserState, message: DialogInput) -> HandlerResult:
         """Обработка ввода задачи для бизнеса"""
-        message = TextHelper.clean_text(message)
-        if not message:
+        navigation = await self._input_navigation(user_state, message, DialogState.BUSINESS_TYPE_INPUT)
+        if navigation:
+            return navigation
+
+        text = TextHelper.clean_text(message.text)
+        if not text:
             return (
                 DialogState.BUSINESS_TASK_INPUT,
-                "Пожалуйста, опишите вашу задачу:",
+                self._text(user_state, "business_task.empty"),
                 {"show_back": True}
             )
             
-        user_state.temp_data["task"] = message
-        return (
-            DialogState.CONTACT_INPUT,
-            "Для связи с вами укажите, пожалуйста, номер телефона:",
-            {"show_back": True}
-        )
+        user_state.temp_data["task"] = text
+        return self._ask_contact(user_state)
 
-    async def handle_personal_task(self, user_state: UserState, message: str) -> Tuple[DialogState, str, Dict[str, Any]]:
+    @state_handler(DialogState.PERSONAL_TASK_INPUT)
+    async def handle_personal_task(self, user_state: UserState, message: DialogInput) -> HandlerResult:
         """Обработка ввода личной задачи"""
-        message = TextHelper.clean_text(message)
-        if not message or len(message.strip()) < 10:
+        navigation = await self._input_navigation(user_state, message, DialogState.CHOOSING_SERVICE_TYPE)
+        if navigation:
+            return navigation
+
+        text = TextHelper.clean_text(message.text)
+        if not text or len(text.strip()) < 10:
             return (
                 DialogState.PERSONAL_TASK_INPUT,
-                "Пожалуйста, опишите вашу задачу подробнее (минимум 10 символов):\n\n"
-                "Например:\n"
-                "- Нужна помощь с настройкой принтера\n"
-                "- Не работает интернет\n"
-                "- Требуется обучение работе с Excel\n\n"
-                "Для отмены введите /cancel",
+                self._text(user_state, "personal_task.too_short"),
                 {"show_back": True}
             )
             
-        user_state.temp_data["task"] = message
-        return (
-            DialogState.CONTACT_INPUT,
-            "Для связи с вами укажите, пожалуйста, номер телефона:",
-            {"show_back": True}
-        )
+        user_state.temp_data["task"] = text
+        return self._ask_contact(user_state)
+
+    def _ask_contact(self, user_state: UserState) -> HandlerResult:
+        return DialogState.CONTACT_INPUT, self._text(user_state, "contact.ask"), {"show_back": True}
+
+    def _text(self, user_state: UserState, key: str, **params: Any) -> str:
+        """Текст из каталога шаблонов на языке пользователя"""
+        return self.templates.render(key, user_state.context.get("locale"), **params)
 
-    async def handle_contact_input(self, user_state: UserState, message: str) -> Tuple[DialogState, str, Dict[str, Any]]:
+    def _state_text(self, user_state: UserState, state: DialogState) -> str:
+        """Текст состояния на языке пользователя"""
+        return self.templates.state_text(state, user_state.context.get("locale"))
+
+    @staticmethod
+    def _check_target(user_state: UserState, new_state: DialogState) -> None:
+        """
+        Проверка перехода до записи в хранилище
+
+        handle_state проверяет переход после обработчика; обработчики, которые
+        пишут в базу, проверяют его заранее, чтобы при недопустимом переходе
+        пользователь не получил ошибку после уже сохраненной заявки.
+        """
+        check_transition(DialogState[user_state.state], new_state)
+
+    async def _input_navigation(self, user_state: UserState, message: DialogInput,
+                                back_state: DialogState) -> Optional[HandlerResult]:
+        """Кнопки навигации на шагах ввода: Назад, Отменить заявку, В главное меню"""
+        if message.intent is Intent.BACK and back_state == DialogState.ORDER_MANAGEMENT:
+            # Назад к карточке заявки, которую редактировали
+            order_id = user_state.temp_data.get("current_order_id")
+            return await self.handle_order_management(
+                user_state, DialogInput.from_message("", Intent.OPEN_ORDER)._replace(args={"id": order_id})
+            )
+        if message.intent is Intent.BACK:
+            keyboard = {"show_service_types": True} if back_state == DialogState.CHOOSING_SERVICE_TYPE else {"show_back": True}
+            return back_state, self._state_text(user_state, back_state), keyboard
+        if message.intent is Intent.CANCEL:
+            return await self.handle_cancel(user_state)
+        if message.intent is Intent.MENU:
+            return DialogState.MAIN_MENU, self._state_text(user_state, DialogState.MAIN_MENU), {"show_main_menu": True}
+        return None
+
+    @state_handler(DialogState.CONTACT_INPUT)
+    async def handle_contact_input(self, user_state: UserState, message: DialogInput) -> HandlerResult:
         """Обработка ввода контактных данных"""
-        if not PhoneNumberHelper.is_valid_phone(message):
+        task_state = (DialogState.BUSINESS_TASK_INPUT if user_state.temp_data.get("business_type")
+                      else DialogState.PERSONAL_TASK_INPUT)
+        navigation = await self._input_navigation(user_state, message, task_state)
+        if navigation:
+            return navigation
+
+        if not PhoneNumberHelper.is_valid_phone(message.text):
             return (
                 DialogState.CONTACT_INPUT,
-                "Некорректный формат номера телефона. Пожалуйста, введите номер в формате: 89991234567",
+                self._text(user_state, "contact.invalid"),
                 {"show_back": True}
             )
 
-        user_state.temp_data["phone"] = PhoneNumberHelper.format_phone(message)
+        user_state.temp_data["phone"] = PhoneNumberHelper.format_phone(message.text)
         
         # Формируем детали заявки для подтверждения
-        order_details = (
-            f"Имя: {user_state.context['name']}\n"
-            f"Телефон: {user_state.temp_data['phone']}\n"
-            f"Описание: {user_state.temp_data['task']}"
+        order_details = self._text(
+            user_state,
+            "order.summary",
+            name=user_state.context['name'],
+            phone=user_state.temp_data['phone'],
+            task=user_state.temp_data['task']
         )
         
         if user_state.temp_data.get("business_type"):
-            order_details += f"\nТип бизнеса: {user_state.temp_data['business_type']}"
+            order_details += self._text(
+                user_state, "order.summary_business", business_type=user_state.temp_data['business_type']
+            )
             
         return (
             DialogState.ORDER_CONFIRMATION,
-            f"Проверьте данные вашей заявки:\n\n{order_details}\n\nВсё верно?",
+            self._text(user_state, "confirmation.check", order_details=order_details),
             {"show_confirmation": True}
         )
 
-    async def handle_confirmation(self, user_state: UserState, message: str) -> Tuple[DialogState, str, Dict[str, Any]]:
+    @state_handler(DialogState.ORDER_CONFIRMATION)
+    async def handle_confirmation(self, user_state: UserState, message: DialogInput) -> HandlerResult:
         """Обработка подтверждения заявки"""
-        if message.lower() == "подтвердить" or message.lower() == "отправить заявку":
+        if message.intent is Intent.CONFIRM:
+            self._check_target(user_state, DialogState.FINISHED)
             # Создаем заявку
             order_id = await self.storage.create_order(
                 user_id=user_state.user_id,
@@ -314,50 +312,49 @@ class DialogHandler:
                 business_type=user_state.temp_data.get("business_type")
             )
             
-            # Получаем созданную заявку
-            order = await self.storage.get_order(order_id)
-            if order:
-                # Отправляем уведомление в Telegram
-                await TelegramService.notify_new_order(order)
+            # Уведомление в Telegram доставляется в фоне через outbox
             
             # Очищаем временные данные
             user_state.temp_data = {}
             
             return (
                 DialogState.FINISHED,
-                f"Спасибо! Ваша заявка №{order_id} принята. "
-                "Мы свяжемся с вами в ближайшее время.",
+                self._text(user_state, "confirmation.accepted", order_id=order_id),
                 {"show_main_menu": True}
             )
         else:
             return (
                 DialogState.CHOOSING_SERVICE_TYPE,
-                "Хорошо, давайте заполним заявку заново. Выберите категорию услуг:",
+                self._text(user_state, "confirmation.restart"),
                 {"show_service_types": True}
             )
 
-    async def handle_orders_list(self, user_state: UserState) -> Tuple[DialogState, str, Dict[str, Any]]:
+    async def handle_orders_list(self, user_state: UserState) -> HandlerResult:
         """Отображение списка заявок пользователя"""
         orders = await self.storage.get_user_orders(user_state.user_id)
         
         if not orders:
             return (
                 DialogState.MAIN_MENU,
-                "У вас пока нет активных заявок.",
+                self._text(user_state, "orders.empty"),
                 {"show_main_menu": True}
             )
         
-        message_parts = ["Ваши активные заявки:\n"]
+        message_parts = [self._text(user_state, "orders.header")]
         for order in orders:
             status = OrderHelper.format_order_status(order.status)
             status_emoji = OrderHelper.get_status_emoji(order.status)
             time_ago = DateTimeHelper.get_readable_delta(order.created_at)
             
-            message_parts.append(
-                f"{status_emoji} Заявка №{order.id} ({status})\n"
-                f"Создана: {time_ago}\n"
-                f"Задача: {TextHelper.truncate(order.task, 100)}\n"
-            )
+            message_parts.append(self._text(
+                user_state,
+                "orders.item",
+                emoji=status_emoji,
+                order_id=order.id,
+                status=status,
+                created=time_ago,
+                task=TextHelper.truncate(order.task, 100)
+            ))
         
         keyboard_data = {
             "orders": [{"id": order.id, "status": order.status} for order in orders],
@@ -371,96 +368,113 @@ class DialogHandler:
             keyboard_data
         )
 
-    async def handle_order_management(self, user_state: UserState, message: str) -> Tuple[DialogState, str, Dict[str, Any]]:
+    @state_handler(DialogState.VIEWING_ORDERS)
+    async def handle_orders_view(self, user_state: UserState, message: DialogInput) -> HandlerResult:
+        """Выбор заявки из списка"""
+        if message.intent in (Intent.BACK, Intent.CANCEL, Intent.MENU):
+            return DialogState.MAIN_MENU, self._state_text(user_state, DialogState.MAIN_MENU), {"show_main_menu": True}
+        return await self.handle_order_management(user_state, message)
+
+    @state_handler(DialogState.ORDER_MANAGEMENT)
+    async def handle_order_management(self, user_state: UserState, message: DialogInput) -> HandlerResult:
         """Обработка действий с конкретной заявкой"""
-        # Извлекаем ID заявки из сообщения
-        if not message.startswith("заявка №"):
+        if (user_state.state == DialogState.ORDER_MANAGEMENT.name
+                and message.intent is Intent.EDIT
+                and user_state.temp_data.get("current_order_id")):
+            return DialogState.ORDER_EDITING, self._state_text(user_state, DialogState.ORDER_EDITING), {"show_back": True}
+
+        if user_state.state == DialogState.ORDER_MANAGEMENT.name and message.intent is Intent.MENU:
+            return DialogState.MAIN_MENU, self._state_text(user_state, DialogState.MAIN_MENU), {"show_main_menu": True}
+
+        order_id = self._order_id(message)
+        if order_id is None:
             return await self.handle_orders_list(user_state)
             
-        try:
-            order_id = int(message.split("№")[1])
-            order = await self.storage.get_order(order_id)
-            
-            if not order:
-                return await self.handle_orders_list(user_state)
-                
-            # Сохраняем ID текущей заявки
-            user_state.temp_data["current_order_id"] = order_id
-            
-            status = OrderHelper.format_order_status(order.status)
-            message = (
-                f"Заявка №{order.id} ({status})\n"
-                f"Создана: {DateTimeHelper.format_datetime(order.created_at)}\n"
-                f"Описание: {order.task}\n\n"
-                "Выберите действие:"
-            )
-            
-            return (
-                DialogState.ORDER_MANAGEMENT,
-                message,
-                {"show_order_actions": True}
-            )
-            
-        except (ValueError, IndexError):
+        order = await self.storage.get_order(order_id)
+        if not order or order.user_id != user_state.user_id:
             return await self.handle_orders_list(user_state)
+            
+        # Сохраняем ID текущей заявки
+        user_state.temp_data["current_order_id"] = order_id
+        
+        status = OrderHelper.format_order_status(order.status)
+        text = self._text(
+            user_state,
+            "order.card",
+            order_id=order.id,
+            status=status,
+            created=DateTimeHelper.format_datetime(order.created_at),
+            task=order.task
+        )
+        
+        return (
+            DialogState.ORDER_MANAGEMENT,
+            text,
+            {"show_order_actions": True}
+        )
 
-    async def handle_order_editing(self, user_state: UserState, message: str) -> Tuple[DialogState, str, Dict[str, Any]]:
+    @staticmethod
+    def _order_id(message: DialogInput) -> Optional[int]:
+        """ID заявки из кнопки (полезная нагрузка) или из введенного текста «Заявка №N»"""
+        try:
+            if message.intent is Intent.OPEN_ORDER and message.args:
+                return int(message.args["id"])
+            if message.normalized.startswith("заявка №"):
+                return int(message.normalized[len("заявка №"):])
+        except (KeyError, TypeError, ValueError):
+            pass
+        return None
+
+    @state_handler(DialogState.ORDER_EDITING)
+    async def handle_order_editing(self, user_state: UserState, message: DialogInput) -> HandlerResult:
         """Обработка редактирования заявки"""
+        navigation = await self._input_navigation(user_state, message, DialogState.ORDER_MANAGEMENT)
+        if navigation:
+            return navigation
+
         order_id = user_state.temp_data.get("current_order_id")
         if not order_id:
             return await self.handle_orders_list(user_state)
             
-        message = TextHelper.clean_text(message)
-        if not message:
+        text = TextHelper.clean_text(message.text)
+        if not text:
             return (
                 DialogState.ORDER_EDITING,
-                "Пожалуйста, введите новое описание заявки:",
+                self._text(user_state, "editing.empty"),
                 {"show_back": True}
             )
             
         # Обновляем заявку
-        updated_order = await self.storage.update_order(order_id, message)
+        self._check_target(user_state, DialogState.VIEWING_ORDERS)
+        updated_order = await self.storage.update_order(order_id, text)
         if not updated_order:
             return await self.handle_orders_list(user_state)
             
         return (
             DialogState.VIEWING_ORDERS,
-            f"Заявка №{order_id} успешно обновлена!",
+            self._text(user_state, "editing.updated", order_id=order_id),
             {"show_orders_list": True}
         )
 
-    async def handle_cancel(self, user_state: UserState) -> Tuple[DialogState, str, Dict[str, Any]]:
+    @state_handler(DialogState.CANCEL_CONFIRMATION)
+    async def handle_cancel_confirmation(self, user_state: UserState, message: DialogInput) -> HandlerResult:
+        """Ответ на вопрос об отмене"""
+        if message.intent is Intent.RESUME:
+            return DialogState.MAIN_MENU, self._state_text(user_state, DialogState.MAIN_MENU), {"show_main_menu": True}
+        return await self.handle_cancel(user_state)
+
+    @state_handler(DialogState.ERROR_HANDLING)
+    async def handle_error_recovery(self, user_state: UserState, message: DialogInput) -> HandlerResult:
+        """Выход из состояния ошибки"""
+        if message.intent is Intent.HELP:
+            return DialogState.HELP, self._state_text(user_state, DialogState.HELP), {"show_help": True}
+        return DialogState.MAIN_MENU, self._state_text(user_state, DialogState.MAIN_MENU), {"show_main_menu": True}
+
+    async def handle_cancel(self, user_state: UserState) -> HandlerResult:
         """Обработка отмены"""
         user_state.temp_data = {}  # Очищаем временные данные
         return (
             DialogState.MAIN_MENU,
-            "Действие отменено. Выберите, что хотите сделать:",
+            self._text(user_state, "cancel.done"),
             {"show_main_menu": True}
         )
-
-    async def handle_back(self, user_state: UserState) -> Tuple[DialogState, str, Dict[str, Any]]:
-        """Обработка команды "назад\""""
-        current_state = DialogState[user_state.state]
-        transitions = STATE_TRANSITIONS.get(current_state, [])
-        
-        if not transitions:
-            return (
-                DialogState.MAIN_MENU,
-                "Выберите действие:",
-                {"show_main_menu": True}
-            )
-            
-        prev_state = transitions[-1]  # Берем последний возможный переход как "назад"
-        
-        if prev_state == DialogState.MAIN_MENU:
-            return await self.handle_main_menu(user_state, "")
-        elif prev_state == DialogState.CHOOSING_SERVICE_TYPE:
-            return await self.handle_service_choice(user_state, "")
-        elif prev_state == DialogState.VIEWING_ORDERS:
-            return await self.handle_orders_list(user_state)
-            
-        return (
-            prev_state,
-            "Вернулись назад. Выберите действие:",
-            {"show_back": True}
-        )
\ No newline at end of file
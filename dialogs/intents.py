@@ -0,0 +1,388 @@
+"""
+Распознавание намерений пользователя
+
+Сообщение нормализуется один раз (casefold, ё -> е, пробелы), затем
+проверяется по порядку:
+1. Точное совпадение с надписью кнопки или синонимом - поиск в словаре.
+2. Ключевые слова состояния - префиксное дерево основ слов. Фраза
+   засчитывается, если все ее основы найдены в сообщении и покрывают
+   не меньше половины слов, поэтому длинный свободный текст со словом
+   "заявка" не принимается за нажатие "Создать заявку".
+3. Опечатки - расстояние Левенштейна с ограничением, только среди
+   кнопок текущего состояния и только в состояниях, где не ждем
+   свободного текста.
+
+Кнопки несут компактную полезную нагрузку JSON с кодом действия и
+аргументами, например {"a":"open_order","id":15}. Код действия - значение
+Intent, поэтому нажатие кнопки распознается одним поиском в словаре, без
+разбора текста надписи.
+
+Таблицы строятся один раз при создании IntentMatcher из надписей
+клавиатур, которые бот отправляет в каждом состоянии (общий реестр
+dialogs.keyboard.KEYBOARDS), и ключевых слов STATE_KEYWORDS.
+"""
+
+import json
+import logging
+import re
+from collections import Counter
+from enum import Enum
+from typing import Any, Dict, FrozenSet, Iterable, List, NamedTuple, Optional, Tuple
+
+from .states import DialogState
+from utils.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+INTENT_MATCHES_TOTAL = metrics.counter(
+    "vkbot_intent_matches_total", "Распознавание намерений по способу", ["method"]
+)
+
+_WHITESPACE = re.compile(r"\s+")
+_EDGE_PUNCTUATION = ".,!?;:()\"'«» "
+
+class Intent(Enum):
+    """Намерения пользователя"""
+    START = "start"
+    MENU = "menu"
+    HELP = "help"
+    BACK = "back"
+    CANCEL = "cancel"
+    RESUME = "resume"
+    RETRY = "retry"
+    CREATE_ORDER = "create_order"
+    MY_ORDERS = "my_orders"
+    OPEN_ORDER = "open_order"
+    SERVICE_PERSONAL = "service_personal"
+    SERVICE_BUSINESS = "service_business"
+    CONFIRM = "confirm"
+    EDIT = "edit"
+    FEEDBACK = "feedback"
+    LANGUAGE = "language"
+    SET_LOCALE = "set_locale"
+
+# Надписи кнопок (обеих клавиатур) и синонимы
+BUTTON_INTENTS: Dict[str, Intent] = {
+    "начать": Intent.START,
+    "в главное меню": Intent.MENU,
+    "назад в меню": Intent.MENU,
+    "в меню": Intent.MENU,
+    "меню": Intent.MENU,
+    "помощь": Intent.HELP,
+    "назад": Intent.BACK,
+    "отменить": Intent.CANCEL,
+    "отмена": Intent.CANCEL,
+    "отменить заявку": Intent.CANCEL,
+    "да, отменить": Intent.CANCEL,
+    "нет, продолжить": Intent.RESUME,
+    "повторить": Intent.RETRY,
+    "ввести заново": Intent.RETRY,
+    "создать заявку": Intent.CREATE_ORDER,
+    "создать новую заявку": Intent.CREATE_ORDER,
+    "новая заявка": Intent.CREATE_ORDER,
+    "мои заявки": Intent.MY_ORDERS,
+    "назад к заявкам": Intent.MY_ORDERS,
+    "услуги населению": Intent.SERVICE_PERSONAL,
+    "услуги для бизнеса": Intent.SERVICE_BUSINESS,
+    "подтвердить": Intent.CONFIRM,
+    "отправить заявку": Intent.CONFIRM,
+    "изменить": Intent.EDIT,
+    "изменить заявку": Intent.EDIT,
+    "оставить отзыв": Intent.FEEDBACK,
+    "сменить язык": Intent.LANGUAGE,
+    "change language": Intent.LANGUAGE,
+    "русский": Intent.SET_LOCALE,
+    "english": Intent.SET_LOCALE
+}
+
+# Кнопки выбора языка: надпись -> язык (UserState.context['locale'])
+LOCALE_BUTTONS: Dict[str, str] = {
+    "русский": "ru",
+    "english": "en"
+}
+
+# Ключевые слова свободного текста по состояниям: фразы из основ слов
+_MENU_KEYWORDS = {
+    Intent.CREATE_ORDER: [("заявк",), ("созда", "заявк"), ("нов", "заявк"), ("оставить", "заявк")],
+    Intent.MY_ORDERS: [("мои", "заявк"), ("статус", "заявк"), ("мои", "заказ")],
+    Intent.HELP: [("помощ",), ("справк",)]
+}
+STATE_KEYWORDS: Dict[DialogState, Dict[Intent, List[Tuple[str, ...]]]] = {
+    DialogState.MAIN_MENU: _MENU_KEYWORDS,
+    DialogState.HELP: _MENU_KEYWORDS,
+    DialogState.FINISHED: _MENU_KEYWORDS,
+    DialogState.CHOOSING_SERVICE_TYPE: {
+        Intent.SERVICE_PERSONAL: [("населен",), ("частн",), ("личн",)],
+        Intent.SERVICE_BUSINESS: [("бизнес",), ("компан",), ("организац",)],
+        Intent.HELP: [("помощ",)]
+    },
+    DialogState.ORDER_CONFIRMATION: {
+        Intent.CONFIRM: [("да",), ("верно",), ("подтвер",), ("отправ",)],
+        Intent.EDIT: [("измен",), ("исправ",)]
+    },
+    DialogState.CANCEL_CONFIRMATION: {
+        Intent.CANCEL: [("да",), ("отмен",)],
+        Intent.RESUME: [("нет",), ("продолж",)]
+    },
+    DialogState.ORDER_MANAGEMENT: {
+        Intent.EDIT: [("измен",), ("редактир",)]
+    }
+}
+
+# Состояния, в которых ждем свободный текст: только точные совпадения с кнопками
+FREE_TEXT_STATES = frozenset({
+    DialogState.BUSINESS_TYPE_INPUT,
+    DialogState.BUSINESS_TASK_INPUT,
+    DialogState.PERSONAL_TASK_INPUT,
+    DialogState.CONTACT_INPUT,
+    DialogState.ORDER_EDITING,
+    DialogState.ORDER_FEEDBACK
+})
+
+# Нечеткое сравнение только для коротких сообщений
+FUZZY_MAX_LENGTH = 30
+
+# Ограничение VK на полезную нагрузку кнопки
+MAX_PAYLOAD_LENGTH = 255
+
+_INTENTS_BY_CODE: Dict[str, Intent] = {intent.value: intent for intent in Intent}
+
+def normalize_text(text: Optional[str]) -> str:
+    """casefold, ё -> е, одиночные пробелы, без знаков препинания по краям"""
+    if not text:
+        return ""
+    text = _WHITESPACE.sub(" ", text.casefold().replace("ё", "е"))
+    return text.strip(_EDGE_PUNCTUATION)
+
+def encode_payload(intent: Intent, **args: Any) -> str:
+    """JSON полезной нагрузки для кнопки"""
+    payload = json.dumps({"a": intent.value, **args}, ensure_ascii=False, separators=(",", ":"))
+    if len(payload) > MAX_PAYLOAD_LENGTH:
+        raise ValueError(f"Полезная нагрузка кнопки длиннее {MAX_PAYLOAD_LENGTH} символов: {payload}")
+    return payload
+
+def decode_payload(raw: Any) -> Optional[Tuple[Intent, Dict[str, Any]]]:
+    """
+    Разбор полезной нагрузки из message_new (строка JSON) или message_event (объект)
+
+    Returns:
+        Optional[Tuple[Intent, Dict[str, Any]]]: Действие и аргументы или None,
+        если нагрузки нет или она не от наших кнопок
+    """
+    if not raw:
+        return None
+    if isinstance(raw, str):
+        try:
+            raw = json.loads(raw)
+        except ValueError:
+            logger.debug("Некорректная полезная нагрузка кнопки: %r", raw)
+            return None
+    if not isinstance(raw, dict):
+        return None
+
+    # Кнопка "Начать" в новом диалоге VK присылает {"command": "start"}
+    if raw.get("command") == "start":
+        return Intent.START, {}
+
+    code = raw.get("a")
+    intent = _INTENTS_BY_CODE.get(code) if isinstance(code, str) else None
+    if intent is None:
+        return None
+    return intent, {key: value for key, value in raw.items() if key != "a"}
+
+def bounded_distance(a: str, b: str, limit: int) -> int:
+    """
+    Расстояние Левенштейна, если оно не больше limit, иначе limit + 1
+
+    Считается только полоса шириной 2 * limit + 1 вокруг диагонали.
+    """
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    if len(a) > len(b):
+        a, b = b, a
+    previous = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, 1):
+        low, high = max(1, i - limit), min(len(b), i + limit)
+        current = [limit + 1] * (len(b) + 1)
+        current[0] = i if i <= limit else limit + 1
+        for j in range(low, high + 1):
+            current[j] = min(
+                previous[j] + 1,
+                current[j - 1] + 1,
+                previous[j - 1] + (char_a != b[j - 1])
+            )
+        if min(current[low - 1:high + 1]) > limit:
+            return limit + 1
+        previous = current
+    return min(previous[len(b)], limit + 1)
+
+class IntentMatch(NamedTuple):
+    """Результат распознавания"""
+    intent: Intent
+    method: str     # payload, exact, keyword, fuzzy
+    score: float
+    args: Optional[Dict[str, Any]] = None   # Аргументы из полезной нагрузки кнопки
+
+class _StemTrie:
+    """Префиксное дерево основ: для слова находит все основы, которыми оно начинается"""
+
+    __slots__ = ("root",)
+
+    _END = ""
+
+    def __init__(self, stems: Iterable[str]):
+        self.root: Dict[str, dict] = {}
+        for stem in stems:
+            node = self.root
+            for char in stem:
+                node = node.setdefault(char, {})
+            node[self._END] = stem
+
+    def prefixes(self, word: str) -> List[str]:
+        found = []
+        node = self.root
+        for char in word:
+            node = node.get(char)
+            if node is None:
+                break
+            if self._END in node:
+                found.append(node[self._END])
+        return found
+
+class _StateTable:
+    """Таблица намерений одного состояния"""
+
+    __slots__ = ("intents", "trie", "phrases", "fuzzy_labels")
+
+    def __init__(self, state: DialogState, labels: List[str]):
+        keywords = STATE_KEYWORDS.get(state, {})
+        label_intents = {BUTTON_INTENTS[label] for label in labels if label in BUTTON_INTENTS}
+        self.intents: FrozenSet[Intent] = frozenset(label_intents | set(keywords))
+        self.phrases = [(intent, phrase) for intent, phrases in keywords.items() for phrase in phrases]
+        self.trie = _StemTrie({stem for _, phrase in self.phrases for stem in phrase})
+        # Кандидаты для опечаток - все надписи с намерениями этого состояния
+        self.fuzzy_labels: List[Tuple[str, Intent]] = [] if state in FREE_TEXT_STATES else [
+            (label, intent) for label, intent in BUTTON_INTENTS.items() if intent in self.intents
+        ]
+
+class IntentMatcher:
+    """Распознавание намерений с таблицами, построенными один раз"""
+
+    def __init__(self):
+        self.tables: Dict[DialogState, _StateTable] = {}
+        unknown = set()
+        for state in DialogState:
+            labels = self._keyboard_labels(state)
+            unknown.update(label for label in labels if label not in BUTTON_INTENTS)
+            self.tables[state] = _StateTable(state, labels)
+        if unknown:
+            logger.debug("Кнопки без намерения: %s", ", ".join(sorted(unknown)))
+
+        # Статистика
+        self.matched: Counter = Counter()
+        self.unmatched = 0
+        self._metric_children = {
+            method: INTENT_MATCHES_TOTAL.labels(method)
+            for method in ("payload", "exact", "keyword", "fuzzy", "none")
+        }
+
+    @staticmethod
+    def _keyboard_labels(state: DialogState) -> List[str]:
+        # Клавиатуры сами используют Intent для полезной нагрузки кнопок
+        from .keyboard import KEYBOARDS
+        keyboard = json.loads(KEYBOARDS.for_state(state))
+        return [normalize_text(button["action"]["label"]) for row in keyboard["buttons"] for button in row]
+
+    def intents_for(self, state: DialogState) -> FrozenSet[Intent]:
+        """Намерения, которые ожидаются в состоянии"""
+        return self.tables[state].intents
+
+    def match_payload(self, raw: Any) -> Optional[IntentMatch]:
+        """Намерение по полезной нагрузке нажатой кнопки"""
+        payload = decode_payload(raw)
+        if payload is None:
+            return None
+        intent, args = payload
+        self.matched[("payload", intent.value)] += 1
+        self._metric_children["payload"].inc()
+        return IntentMatch(intent, "payload", 1.0, args)
+
+    def match(self, state: DialogState, normalized: str) -> Optional[IntentMatch]:
+        """
+        Намерение нормализованного сообщения (см. normalize_text) в состоянии
+
+        Returns:
+            Optional[IntentMatch]: Намерение, способ и уверенность или None
+        """
+        result = self._match(self.tables[state], normalized) if normalized else None
+        if result:
+            self.matched[(result.method, result.intent.value)] += 1
+            self._metric_children[result.method].inc()
+        else:
+            self.unmatched += 1
+            self._metric_children["none"].inc()
+        return result
+
+    def _match(self, table: _StateTable, normalized: str) -> Optional[IntentMatch]:
+        intent = BUTTON_INTENTS.get(normalized)
+        if intent:
+            return IntentMatch(intent, "exact", 1.0)
+
+        words = normalized.split(" ")
+        if table.phrases:
+            result = self._match_keywords(table, words)
+            if result:
+                return result
+
+        if table.fuzzy_labels and len(normalized) <= FUZZY_MAX_LENGTH:
+            return self._match_fuzzy(table, normalized)
+        return None
+
+    @staticmethod
+    def _match_keywords(table: _StateTable, words: List[str]) -> Optional[IntentMatch]:
+        stems = {}
+        for index, word in enumerate(words):
+            for stem in table.trie.prefixes(word):
+                stems.setdefault(stem, index)
+
+        best: Optional[IntentMatch] = None
+        ambiguous = False
+        for intent, phrase in table.phrases:
+            if not all(stem in stems for stem in phrase):
+                continue
+            coverage = len({stems[stem] for stem in phrase}) / len(words)
+            if coverage < 0.5:
+                continue
+            if best is None or coverage > best.score:
+                best, ambiguous = IntentMatch(intent, "keyword", coverage), False
+            elif coverage == best.score and intent != best.intent:
+                ambiguous = True
+        return None if ambiguous else best
+
+    @staticmethod
+    def _match_fuzzy(table: _StateTable, normalized: str) -> Optional[IntentMatch]:
+        limit = 1 if len(normalized) <= 6 else 2
+        best: Optional[Tuple[int, Intent]] = None
+        ambiguous = False
+        for label, intent in table.fuzzy_labels:
+            distance = bounded_distance(normalized, label, limit)
+            if distance > limit:
+                continue
+            if best is None or distance < best[0]:
+                best, ambiguous = (distance, intent), False
+            elif distance == best[0] and intent != best[1]:
+                ambiguous = True
+        if best is None or ambiguous:
+            return None
+        return IntentMatch(best[1], "fuzzy", 1 - best[0] / max(len(normalized), 1))
+
+    def get_stats(self) -> Dict[str, object]:
+        """Количество распознаваний по способу и намерению"""
+        by_method: Counter = Counter()
+        for (method, _), count in self.matched.items():
+            by_method[method] += count
+        return {
+            "matched": dict(by_method),
+            "unmatched": self.unmatched,
+            "intents": {f"{method}:{intent}": count for (method, intent), count in self.matched.items()}
+        }
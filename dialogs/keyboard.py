@@ -13,11 +13,102 @@
 - Цветовое оформление кнопок навигации
 - Контекстно-зависимые клавиатуры
 - Поддержка inline-клавиатур
+- Полезная нагрузка с кодом действия у каждой кнопки (см. dialogs.intents)
+- Реестр готовых JSON-клавиатур (KeyboardRegistry): статические клавиатуры
+  сериализуются один раз, кнопки заявок собираются из кэшированных фрагментов
+- Одна таблица кнопок (FLAG_BUTTONS) и один общий реестр (KEYBOARDS) для
+  ответов бота, клавиатур состояний и таблиц намерений
+- Перевод подписей по каталогу шаблонов (BUTTON_KEYS, catalog_translator)
 """
 
 import json
-from typing import List, Optional
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Iterable, List, Optional, Sequence, Tuple, Union
+from utils.metrics import CACHE_REQUESTS_TOTAL
+from .intents import BUTTON_INTENTS, Intent, encode_payload, normalize_text
 from .states import DialogState, OrderStatus
+from .templates import TemplateCatalog
+
+# Кнопка: надпись или (надпись, действие, аргументы)
+ButtonSpec = Union[str, Tuple[str, Intent, Dict[str, Any]]]
+
+# Надписи навигационных кнопок (второстепенный цвет)
+SECONDARY_LABELS = frozenset({"Отменить", "Назад", "Отмена", "В главное меню"})
+
+# Язык подписей по умолчанию (подписи в таблицах ниже - на нем)
+DEFAULT_LOCALE = "ru"
+
+# Кнопок заявок в клавиатуре (ограничение VK - 10 рядов)
+MAX_ORDER_BUTTONS = 6
+
+# Клавиатура, если для состояния или флагов кнопок нет
+DEFAULT_BUTTONS: Tuple[str, ...] = ("В главное меню",)
+
+# Кнопки по флагам keyboard_data обработчиков диалога; если выставлено
+# несколько флагов, действует первый по порядку
+FLAG_BUTTONS: Dict[str, Tuple[str, ...]] = {
+    "show_start": ("Начать", "English", "Помощь"),
+    "show_main_menu": ("Создать заявку", "Мои заявки", "Помощь", "Сменить язык"),
+    "show_service_types": ("Услуги Населению", "Услуги для Бизнеса", "Назад"),
+    "show_help": ("Создать заявку", "Мои заявки", "Сменить язык", "Назад в меню"),
+    "show_language": ("Русский", "English", "Назад в меню"),
+    "show_cancel": ("Да, отменить", "Нет, продолжить", "В главное меню"),
+    "show_error": ("Повторить", "Помощь", "В главное меню"),
+    "show_confirmation": ("Подтвердить", "Изменить", "Отменить"),
+    "show_order_actions": ("Изменить заявку", "Назад к заявкам", "В главное меню"),
+    "show_back": ("Назад", "Отменить")
+}
+
+# Клавиатура, которую обработчики диалога отправляют в каждом состоянии
+# (флаг FLAG_BUTTONS); в состояниях без флага - DEFAULT_BUTTONS
+STATE_FLAGS: Dict[DialogState, str] = {
+    DialogState.START: "show_start",
+    DialogState.MAIN_MENU: "show_main_menu",
+    DialogState.HELP: "show_help",
+    DialogState.LANGUAGE_SELECTION: "show_language",
+    DialogState.CHOOSING_SERVICE_TYPE: "show_service_types",
+    DialogState.BUSINESS_TYPE_INPUT: "show_back",
+    DialogState.BUSINESS_TASK_INPUT: "show_back",
+    DialogState.PERSONAL_TASK_INPUT: "show_back",
+    DialogState.CONTACT_INPUT: "show_back",
+    DialogState.ORDER_CONFIRMATION: "show_confirmation",
+    DialogState.VIEWING_ORDERS: "show_back",
+    DialogState.ORDER_MANAGEMENT: "show_order_actions",
+    DialogState.ORDER_EDITING: "show_back",
+    DialogState.CANCEL_CONFIRMATION: "show_cancel",
+    DialogState.ERROR_HANDLING: "show_error",
+    DialogState.FINISHED: "show_main_menu"
+}
+
+# Ключи переводов подписей в каталоге шаблонов (раздел "dialog" файлов
+# locales/<язык>.json); подписи без ключа не переводятся
+BUTTON_KEYS: Dict[str, str] = {
+    "Начать": "button.start",
+    "Помощь": "button.help",
+    "Создать заявку": "button.create_order",
+    "Мои заявки": "button.my_orders",
+    "Сменить язык": "button.change_language",
+    "Услуги Населению": "button.personal_services",
+    "Услуги для Бизнеса": "button.business_services",
+    "Назад": "button.back",
+    "Назад в меню": "button.back_to_menu",
+    "Да, отменить": "button.cancel_yes",
+    "Нет, продолжить": "button.cancel_no",
+    "В главное меню": "button.main_menu",
+    "Повторить": "button.retry",
+    "Подтвердить": "button.confirm",
+    "Изменить": "button.edit",
+    "Отменить": "button.cancel",
+    "Изменить заявку": "button.edit_order",
+    "Назад к заявкам": "button.back_to_orders"
+}
+
+_KEYBOARD_HITS = CACHE_REQUESTS_TOTAL.labels("keyboard", "hit")
+_KEYBOARD_MISSES = CACHE_REQUESTS_TOTAL.labels("keyboard", "miss")
+
+def _dumps(value: Any) -> str:
+    """Компактный JSON без экранирования кириллицы"""
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":"))
 
 class KeyboardBuilder:
     """
@@ -40,20 +131,71 @@ class KeyboardBuilder:
     # Получение клавиатуры для состояния
     state_keyboard = KeyboardBuilder.get_state_keyboard(
         DialogState.MAIN_MENU,
-        context={'user_id': 123}
+        context={'locale': 'en'}
     )
     ```
     """
     
     @staticmethod
-    def create_keyboard(buttons: List[str], one_time: bool = True, inline: bool = False) -> str:
+    def button(label: str, intent: Optional[Intent] = None, args: Optional[Dict[str, Any]] = None,
+               callback: bool = False) -> Dict[str, Any]:
+        """
+        Кнопка с полезной нагрузкой.
+        
+        Действие по умолчанию определяется по надписи (BUTTON_INTENTS).
+        Кнопки с аргументами при callback=True создаются как callback:
+        нажатие приходит событием message_event, без сообщения в чате.
+        
+        Args:
+            label: Надпись
+            intent: Действие кнопки
+            args: Аргументы действия
+            callback: Клиент поддерживает callback-кнопки
+        """
+        label = str(label)
+        intent = intent or BUTTON_INTENTS.get(normalize_text(label))
+        action: Dict[str, Any] = {
+            "type": "callback" if callback and args else "text",
+            "label": label[:40]  # Ограничение VK API
+        }
+        if intent:
+            action["payload"] = encode_payload(intent, **(args or {}))
+        return {
+            "action": action,
+            "color": "secondary" if label in SECONDARY_LABELS else "primary"
+        }
+
+    @classmethod
+    def layout(cls, buttons: Sequence[ButtonSpec], callback: bool = False) -> List[List[Dict[str, Any]]]:
+        """Разбиение кнопок на ряды по 2 кнопки"""
+        button_rows = []
+        current_row = []
+        
+        for spec in buttons:
+            if isinstance(spec, tuple):
+                current_row.append(cls.button(*spec, callback=callback))
+            else:
+                current_row.append(cls.button(spec))
+            
+            if len(current_row) == 2:
+                button_rows.append(current_row)
+                current_row = []
+        
+        if current_row:
+            button_rows.append(current_row)
+        return button_rows
+
+    @classmethod
+    def create_keyboard(cls, buttons: Sequence[ButtonSpec], one_time: bool = True, inline: bool = False,
+                        callback: bool = False) -> str:
         """
         Создание клавиатуры ВКонтакте.
         
         Args:
-            buttons: Список текстов кнопок
+            buttons: Надписи кнопок или (надпись, действие, аргументы)
             one_time: Скрывать ли клавиатуру после нажатия
             inline: Встроенная клавиатура или нет
+            callback: Кнопки с аргументами делать callback-кнопками
         
         Returns:
             str: JSON строка с клавиатурой для VK API
@@ -66,30 +208,10 @@ class KeyboardBuilder:
         )
         ```
         """
-        # Разбиваем кнопки на ряды по 2 кнопки
-        button_rows = []
-        current_row = []
-        
-        for btn in buttons:
-            current_row.append({
-                "action": {
-                    "type": "text",
-                    "label": str(btn)[:40]
-                },
-                "color": "primary" if btn not in ["Отменить", "Назад", "Отмена"] else "secondary"
-            })
-            
-            if len(current_row) == 2:
-                button_rows.append(current_row)
-                current_row = []
-        
-        if current_row:
-            button_rows.append(current_row)
-
         keyboard = {
             "one_time": one_time,
             "inline": inline,
-            "buttons": button_rows
+            "buttons": cls.layout(buttons, callback)
         }
         return json.dumps(keyboard, ensure_ascii=False)
 
@@ -106,10 +228,10 @@ class KeyboardBuilder:
             str: JSON строка с клавиатурой
         
         Особенности:
-        - Для каждого состояния своя клавиатура
-        - Учет контекста пользователя
-        - Добавление навигационных кнопок
-        - Поддержка глобальных команд
+        - Та же клавиатура, что отправляется пользователю в этом состоянии (STATE_FLAGS)
+        - Собирается через общий реестр KEYBOARDS
+        - Кнопки заявок из context['orders'] / context['history'] добавляются первыми рядами
+        - Язык подписей - context['locale']
         
         Пример:
         ```python
@@ -121,117 +243,15 @@ class KeyboardBuilder:
         ```
         """
         context = context or {}
-        
-        if state == DialogState.START:
-            buttons = ["Начать", "English", "Помощь"]
-        
-        elif state == DialogState.MAIN_MENU:
-            buttons = [
-                "Создать заявку",
-                "Мои заявки",
-                "Помощь",
-                "Сменить язык"
-            ]
-            
-        elif state == DialogState.HELP:
-            buttons = [
-                "Создать заявку",
-                "Мои заявки",
-                "Сменить язык",
-                "Назад в меню"
-            ]
-            
-        elif state == DialogState.LANGUAGE_SELECTION:
-            buttons = ["Русский", "English", "Назад в меню"]
-            
-        elif state == DialogState.CHOOSING_SERVICE_TYPE:
-            buttons = [
-                "Услуги Населению",
-                "Услуги для Бизнеса",
-                "Помощь",
-                "Назад в меню"
-            ]
-            
-        elif state == DialogState.VIEWING_ORDERS:
-            buttons = [
-                "Создать новую заявку",
-                "Фильтр заявок",
-                "История заявок"
-            ]
-            # Добавляем кнопки активных заявок
-            orders = context.get('orders', [])
-            if orders:
-                buttons[1:1] = [f"Заявка №{order['id']}" for order in orders]
-            buttons.extend(["Назад в меню", "Помощь"])
-            
-        elif state == DialogState.ORDERS_FILTER:
-            buttons = [
-                "Все заявки",
-                "Активные",
-                "Завершенные",
-                "Отмененные",
-                "Назад к заявкам",
-                "В главное меню"
-            ]
-            
-        elif state == DialogState.ORDER_HISTORY:
-            buttons = ["Назад к заявкам", "В главное меню"]
-            # Добавляем кнопки истории заявок
-            history = context.get('history', [])
-            if history:
-                buttons[0:0] = [f"Заявка №{order['id']}" for order in history]
-            
-        elif state == DialogState.ORDER_MANAGEMENT:
-            buttons = [
-                "Изменить заявку",
-                "Оставить отзыв",
-                "Отменить заявку",
-                "Назад к заявкам",
-                "В главное меню"
-            ]
-            
-        elif state == DialogState.ORDER_CONFIRMATION:
-            buttons = [
-                "Отправить заявку",
-                "Изменить заявку",
-                "Отменить",
-                "В главное меню"
-            ]
-            
-        elif state == DialogState.ORDER_FEEDBACK:
-            buttons = ["1", "2", "3", "4", "5", "Пропустить", "Назад", "В главное меню"]
-            
-        elif state == DialogState.CONTACT_INPUT_RETRY:
-            buttons = ["Ввести заново", "Отменить", "В главное меню"]
-            
-        elif state == DialogState.ERROR_HANDLING:
-            buttons = [
-                "Повторить",
-                "Помощь",
-                "В главное меню"
-            ]
-            
-        elif state == DialogState.CANCEL_CONFIRMATION:
-            buttons = ["Да, отменить", "Нет, продолжить", "В главное меню"]
-            
-        elif state in [
-            DialogState.BUSINESS_TYPE_INPUT,
-            DialogState.BUSINESS_TASK_INPUT,
-            DialogState.PERSONAL_TASK_INPUT,
-            DialogState.CONTACT_INPUT
-        ]:
-            buttons = ["Назад", "Отменить заявку", "В главное меню"]
-            
-        elif state == DialogState.FINISHED:
-            buttons = ["Создать заявку", "В главное меню"]
-            
-        else:
-            buttons = ["В главное меню"]
-
-        return cls.create_keyboard(buttons)
+        return KEYBOARDS.for_state(
+            state,
+            locale=context.get('locale') or DEFAULT_LOCALE,
+            orders=context.get('orders') or context.get('history') or (),
+            callback=context.get('callback', False)
+        )
 
-    @classmethod
-    def get_empty_keyboard(cls) -> str:
+    @staticmethod
+    def get_empty_keyboard() -> str:
         """
         Создание пустой клавиатуры.
         
@@ -241,7 +261,169 @@ class KeyboardBuilder:
         Используется в случаях, когда нужно скрыть клавиатуру
         или когда ввод с клавиатуры не требуется.
         """
-        return json.dumps({"buttons": [], "one_time": True})
+        return EMPTY_KEYBOARD
+
+
+def catalog_translator(catalog: TemplateCatalog) -> Callable[[str, str], Optional[str]]:
+    """Перевод подписей кнопок по каталогу шаблонов (ключи BUTTON_KEYS)"""
+    def translate(label: str, locale: str) -> Optional[str]:
+        key = BUTTON_KEYS.get(label)
+        template = catalog.get(key, locale) if key else None
+        return template.render({}) if template else None
+    return translate
+
+
+class KeyboardRegistry:
+    """
+    Реестр готовых клавиатур.
+    
+    Статическая часть клавиатуры (кнопки флага FLAG_BUTTONS) сериализуется
+    один раз на ключ (флаг, язык) и дальше берется из словаря. Подписи
+    переводятся хуком translate (см. set_translate); после смены перевода
+    кэши сбрасываются.
+    Кнопки заявок - единственная переменная часть: JSON каждой кнопки
+    кэшируется по (ID, язык, callback), при ответе ряды склеиваются строкой.
+    
+    Пример:
+    ```python
+    registry = KeyboardRegistry()
+    registry.set_translate(catalog_translator(TemplateCatalog.from_locales(localization.locales)))
+    keyboard = registry.for_flags({"show_main_menu": True}, locale="en")
+    keyboard = registry.for_flags({"orders": [{"id": 5}], "show_back": True}, callback=True)
+    ```
+    """
+
+    def __init__(self, one_time: bool = False, inline: bool = False,
+                 translate: Optional[Callable[[str, str], Optional[str]]] = None,
+                 max_order_buttons: int = MAX_ORDER_BUTTONS, fragment_cache_size: int = 4096):
+        """
+        Args:
+            one_time: Скрывать клавиатуру после нажатия
+            inline: Встроенная клавиатура
+            translate: Перевод подписи (подпись, язык) -> подпись или None; по умолчанию подписи не переводятся
+            max_order_buttons: Кнопок заявок в одной клавиатуре
+            fragment_cache_size: Кэшированных кнопок заявок
+        """
+        self.translate = translate
+        self.max_order_buttons = max_order_buttons
+        self.fragment_cache_size = fragment_cache_size
+        self._prefix = _dumps({"one_time": one_time, "inline": inline})[:-1] + ',"buttons":['
+        # (ключ, язык) -> (готовая клавиатура, JSON рядов без скобок)
+        self._static: Dict[Tuple[Hashable, str], Tuple[str, str]] = {}
+        self._fragments: "OrderedDict[Tuple[Any, str, bool], str]" = OrderedDict()
+
+    def set_translate(self, translate: Optional[Callable[[str, str], Optional[str]]]) -> None:
+        """Новый перевод подписей; собранные клавиатуры собираются заново при следующем запросе"""
+        self.translate = translate
+        self._static.clear()
+        self._fragments.clear()
+
+    def _label(self, label: str, locale: str) -> str:
+        if self.translate is None or locale == DEFAULT_LOCALE:
+            return label
+        return self.translate(label, locale) or label
+
+    def _button(self, label: str, locale: str, intent: Optional[Intent] = None,
+                args: Optional[Dict[str, Any]] = None, callback: bool = False) -> Dict[str, Any]:
+        # Действие и цвет определяются по исходной подписи, переводится только текст
+        button = KeyboardBuilder.button(label, intent, args, callback)
+        button["action"]["label"] = self._label(label, locale)[:40]
+        return button
+
+    def _build_static(self, key: Tuple[Hashable, str], buttons: Sequence[str]) -> Tuple[str, str]:
+        _KEYBOARD_MISSES.inc()
+        locale = key[1]
+        rows = []
+        for index in range(0, len(buttons), 2):
+            rows.append([self._button(label, locale) for label in buttons[index:index + 2]])
+        rows_json = _dumps(rows)[1:-1]
+        entry = (self._prefix + rows_json + "]}", rows_json)
+        self._static[key] = entry
+        return entry
+
+    def _order_button(self, order_id: Any, locale: str, callback: bool) -> str:
+        key = (order_id, locale, callback)
+        fragment = self._fragments.get(key)
+        if fragment is None:
+            fragment = _dumps(self._button(
+                f"Заявка №{order_id}", locale, Intent.OPEN_ORDER, {"id": order_id}, callback
+            ))
+            self._fragments[key] = fragment
+            if len(self._fragments) > self.fragment_cache_size:
+                self._fragments.popitem(last=False)
+        return fragment
+
+    def render(self, key: Hashable, buttons: Sequence[str], locale: str = DEFAULT_LOCALE,
+               orders: Iterable[Dict[str, Any]] = (), callback: bool = False) -> str:
+        """
+        Клавиатура: ряды кнопок заявок, затем статические кнопки ключа
+        
+        Args:
+            key: Ключ статической части (флаг)
+            buttons: Подписи статических кнопок (используются при первой сборке ключа)
+            locale: Язык подписей
+            orders: Заявки (словари с 'id') для кнопок с полезной нагрузкой
+            callback: Кнопки заявок делать callback-кнопками
+        
+        Returns:
+            str: JSON клавиатуры, готовый к отправке в VK API
+        """
+        entry = self._static.get((key, locale))
+        if entry is None:
+            entry = self._build_static((key, locale), buttons)
+        else:
+            _KEYBOARD_HITS.inc()
+        if not orders:
+            return entry[0]
+        
+        fragments = [
+            self._order_button(order["id"], locale, callback)
+            for order in list(orders)[:self.max_order_buttons]
+        ]
+        rows = ["[" + ",".join(fragments[index:index + 2]) + "]" for index in range(0, len(fragments), 2)]
+        if entry[1]:
+            rows.append(entry[1])
+        return self._prefix + ",".join(rows) + "]}"
+
+    def for_flags(self, data: Dict[str, Any], locale: str = DEFAULT_LOCALE, callback: bool = False) -> str:
+        """
+        Клавиатура по keyboard_data обработчика диалога (флаги show_* и список orders)
+        
+        Если ни один флаг не выставлен и заявок нет - кнопка возврата в меню.
+        """
+        orders = data.get("orders")
+        for flag, buttons in FLAG_BUTTONS.items():
+            if data.get(flag):
+                return self.render(flag, buttons, locale, orders or (), callback)
+        if orders:
+            return self.render("orders", (), locale, orders, callback)
+        return self.render(None, DEFAULT_BUTTONS, locale)
+
+    def for_state(self, state: DialogState, locale: str = DEFAULT_LOCALE,
+                  orders: Iterable[Dict[str, Any]] = (), callback: bool = False) -> str:
+        """Клавиатура, которую обработчики диалога отправляют в состоянии state (STATE_FLAGS)"""
+        flag = STATE_FLAGS.get(state)
+        return self.for_flags({flag: True, "orders": orders} if flag else {"orders": orders}, locale, callback)
+
+    def warm(self, locales: Iterable[str] = (DEFAULT_LOCALE,)) -> int:
+        """Сборка всех клавиатур по флагам заранее; возвращает число собранных"""
+        built = 0
+        for locale in locales:
+            for flag, buttons in FLAG_BUTTONS.items():
+                if (flag, locale) not in self._static:
+                    self._build_static((flag, locale), buttons)
+                    built += 1
+        return built
+
+    def get_stats(self) -> Dict[str, int]:
+        """Размеры кэшей"""
+        return {"static": len(self._static), "fragments": len(self._fragments)}
+
+
+EMPTY_KEYBOARD = _dumps({"buttons": [], "one_time": True})
+
+# Общий реестр клавиатур: ответы бота (VKService) и KeyboardBuilder.get_state_keyboard
+KEYBOARDS = KeyboardRegistry()
 
 
 # Предустановленные клавиатуры для часто используемых состояний
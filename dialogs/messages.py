@@ -1,114 +1,87 @@
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 from .states import DialogState
+from .templates import DEFAULT_CATALOG, TemplateCatalog
 
 class MessageBuilder:
-    @staticmethod
-    def get_greeting(name: str) -> str:
-        return (
-            f"Здравствуйте, {name}! "
-            "Я автоматический помощник сообщества IT-Помощь в Поварово.\n\n"
-            "Чем могу помочь?"
-        )
+    """Сборка текстов сообщений из каталога шаблонов (см. dialogs.templates)"""
 
-    @staticmethod
-    def get_services_list() -> str:
-        return (
-            "Наши услуги для частных лиц:\n\n"
-            "🔧 Компьютерная помощь:\n"
-            "• Настройка и ремонт компьютеров\n"
-            "• Установка программ и антивирусов\n"
-            "• Восстановление данных\n\n"
-            "💻 Разработка:\n"
-            "• Создание сайтов и приложений\n"
-            "• Разработка чат-ботов\n"
-            "• Автоматизация процессов\n\n"
-            "📱 Обучение:\n"
-            "• Работа с компьютером и программами\n"
-            "• Основы программирования\n"
-            "• Работа с искусственным интеллектом\n\n"
-            "Опишите вашу задачу:"
-        )
+    catalog: TemplateCatalog = DEFAULT_CATALOG
 
-    @staticmethod
-    def get_business_services() -> str:
-        return (
-            "IT-услуги для бизнеса:\n\n"
-            "🏢 Автоматизация:\n"
-            "• Внедрение CRM-систем\n"
-            "• Автоматизация бизнес-процессов\n"
-            "• Интеграция сервисов\n\n"
-            "🌐 Разработка:\n"
-            "• Создание сайтов и веб-приложений\n"
-            "• Корпоративные порталы\n"
-            "• Мобильные приложения\n\n"
-            "🔧 Обслуживание:\n"
-            "• Техническая поддержка\n"
-            "• Настройка серверов\n"
-            "• Обеспечение безопасности\n\n"
-            "Опишите деятельность вашей компании:"
-        )
+    @classmethod
+    def get_greeting(cls, name: str, locale: Optional[str] = None) -> str:
+        return cls.catalog.render("greeting", locale, name=name)
+
+    @classmethod
+    def get_services_list(cls, locale: Optional[str] = None) -> str:
+        return cls.catalog.render("services.personal", locale)
+
+    @classmethod
+    def get_business_services(cls, locale: Optional[str] = None) -> str:
+        return cls.catalog.render("services.business", locale)
 
-    @staticmethod
-    def format_order_details(order_data: Dict[str, Any]) -> str:
-        details = (
-            f"Заявка №{order_data['id']}\n"
-            f"Дата создания: {order_data['created_at']}\n"
-            f"Имя: {order_data['name']}\n"
-            f"Телефон: {order_data['phone']}\n"
-            f"Описание: {order_data['task']}"
+    @classmethod
+    def format_order_details(cls, order_data: Dict[str, Any], locale: Optional[str] = None) -> str:
+        summary = cls.catalog.render(
+            "order.summary", locale,
+            name=order_data['name'], phone=order_data['phone'], task=order_data['task']
         )
         if order_data.get('business_type'):
-            details += f"\nТип бизнеса: {order_data['business_type']}"
-        return details
+            summary += cls.catalog.render("order.summary_business", locale, business_type=order_data['business_type'])
+        return cls.catalog.render(
+            "order.details", locale,
+            order_id=order_data['id'], created_at=order_data['created_at'], summary=summary
+        )
 
-    @staticmethod
-    def get_state_message(state: DialogState, context: Dict[str, Any] = None) -> str:
+    @classmethod
+    def get_state_message(cls, state: DialogState, context: Dict[str, Any] = None) -> str:
         """Получение сообщения для конкретного состояния"""
         context = context or {}
-        
+        locale = context.get('locale')
+        render = cls.catalog.render
+
         if state == DialogState.START:
-            return MessageBuilder.get_greeting(context.get('name', 'Пользователь'))
-            
+            return cls.get_greeting(context.get('name', 'Пользователь'), locale)
+
         elif state == DialogState.MAIN_MENU:
-            return "Выберите действие:"
-            
+            return cls.catalog.state_text(DialogState.MAIN_MENU, locale)
+
         elif state == DialogState.CHOOSING_SERVICE_TYPE:
-            return "Выберите категорию услуг:"
-            
+            return cls.catalog.state_text(DialogState.CHOOSING_SERVICE_TYPE, locale)
+
         elif state == DialogState.BUSINESS_TYPE_INPUT:
-            return MessageBuilder.get_business_services()
-            
+            return cls.get_business_services(locale)
+
         elif state == DialogState.BUSINESS_TASK_INPUT:
-            return "Опишите, какая помощь требуется для вашего бизнеса:"
-            
+            return render("business_task.ask", locale)
+
         elif state == DialogState.PERSONAL_TASK_INPUT:
-            return MessageBuilder.get_services_list()
-            
+            return cls.get_services_list(locale)
+
         elif state == DialogState.CONTACT_INPUT:
-            return "Для связи с вами укажите, пожалуйста, номер телефона:"
-            
+            return render("contact.ask", locale)
+
         elif state == DialogState.ORDER_CONFIRMATION:
             if 'order_details' in context:
-                return f"Проверьте данные вашей заявки:\n\n{context['order_details']}\n\nВсё верно?"
-            return "Проверьте данные заявки:"
-            
+                return render("confirmation.check", locale, order_details=context['order_details'])
+            return render("confirmation.check_empty", locale)
+
         elif state == DialogState.VIEWING_ORDERS:
             if not context.get('orders'):
-                return "У вас пока нет активных заявок."
-            return "Ваши активные заявки:"
-            
+                return render("orders.empty", locale)
+            return cls.catalog.state_text(DialogState.VIEWING_ORDERS, locale)
+
         elif state == DialogState.ORDER_MANAGEMENT:
             if 'order_details' in context:
-                return f"Заявка №{context['order_id']}:\n\n{context['order_details']}\n\nВыберите действие:"
-            return "Выберите действие с заявкой:"
-            
+                return render(
+                    "order.card_header", locale,
+                    order_id=context['order_id'], order_details=context['order_details']
+                )
+            return render("order.choose_action", locale)
+
         elif state == DialogState.ORDER_EDITING:
-            return "Введите новое описание заявки:"
-            
+            return render("editing.ask", locale)
+
         elif state == DialogState.FINISHED:
-            return (
-                f"Спасибо! Ваша заявка №{context.get('order_id', '')} принята.\n"
-                "Мы свяжемся с вами в ближайшее время."
-            )
-            
-        return "Произошла ошибка. Пожалуйста, начните сначала."
\ No newline at end of file
+            return render("confirmation.accepted", locale, order_id=context.get('order_id', ''))
+
+        return render("error.restart", locale)
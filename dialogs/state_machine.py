@@ -0,0 +1,120 @@
+"""
+Таблица обработчиков состояний диалога
+
+Методы DialogHandler помечаются декоратором state_handler, при создании
+обработчика они собираются в словарь DialogState -> метод, и выбор
+обработчика сводится к одному поиску в словаре. При сборке проверяется
+граф STATE_TRANSITIONS: состояния без обработчика и состояния, в которые
+нельзя попасть из START, попадают в лог. Каждое возвращенное
+обработчиком состояние сверяется с допустимыми переходами.
+"""
+
+import logging
+from collections import deque
+from typing import Any, Callable, Dict, FrozenSet, List, NamedTuple, Optional, Tuple
+
+from .intents import Intent, normalize_text
+from .states import DialogState, GLOBAL_COMMANDS, STATE_TRANSITIONS
+
+logger = logging.getLogger(__name__)
+
+# Результат обработчика: новое состояние, текст ответа, данные для клавиатуры
+HandlerResult = Tuple[DialogState, str, Dict[str, Any]]
+
+# Допустимые переходы: из таблицы плюс глобальные команды, доступные везде
+ALLOWED_TRANSITIONS: Dict[DialogState, FrozenSet[DialogState]] = {
+    state: frozenset(STATE_TRANSITIONS.get(state, ())) | frozenset(GLOBAL_COMMANDS.values()) | {state}
+    for state in DialogState
+}
+
+class DialogInput(NamedTuple):
+    """Сообщение пользователя, нормализованное и распознанное один раз на входе"""
+    raw: str                    # Как пришло от VK
+    text: str                   # Без пробелов по краям
+    normalized: str             # См. dialogs.intents.normalize_text
+    intent: Optional[Intent]    # Распознанное намерение
+    args: Optional[Dict[str, Any]] = None   # Аргументы из полезной нагрузки кнопки
+
+    @classmethod
+    def from_message(cls, message: str, intent: Optional[Intent] = None) -> "DialogInput":
+        return cls(message or "", (message or "").strip(), normalize_text(message), intent)
+
+class InvalidTransition(Exception):
+    """Обработчик вернул состояние, недопустимое из текущего"""
+
+    def __init__(self, current: DialogState, new: DialogState):
+        super().__init__(f"Недопустимый переход {current.name} -> {new.name}")
+        self.current = current
+        self.new = new
+
+def state_handler(*states: DialogState) -> Callable:
+    """Декоратор: метод обрабатывает ввод в указанных состояниях"""
+    def decorator(func):
+        func._dialog_states = states
+        return func
+    return decorator
+
+def compile_handlers(owner: Any) -> Dict[DialogState, Callable]:
+    """
+    Сборка таблицы обработчиков объекта
+
+    Raises:
+        ValueError: Если на одно состояние зарегистрировано два метода
+    """
+    handlers: Dict[DialogState, Callable] = {}
+    for name in dir(type(owner)):
+        states = getattr(getattr(type(owner), name), "_dialog_states", None)
+        if not states:
+            continue
+        for state in states:
+            if state in handlers:
+                raise ValueError(f"Состояние {state.name} уже обрабатывается методом {handlers[state].__name__}")
+            handlers[state] = getattr(owner, name)
+    return handlers
+
+def reachable_states(start: DialogState = DialogState.START) -> FrozenSet[DialogState]:
+    """Состояния, достижимые из start по таблице переходов и глобальным командам"""
+    seen = {start, *GLOBAL_COMMANDS.values()}
+    queue = deque(seen)
+    while queue:
+        for state in STATE_TRANSITIONS.get(queue.popleft(), ()):
+            if state not in seen:
+                seen.add(state)
+                queue.append(state)
+    return frozenset(seen)
+
+def validate_state_machine(handlers: Dict[DialogState, Callable]) -> Dict[str, List[DialogState]]:
+    """
+    Проверка таблицы обработчиков по графу переходов
+
+    Returns:
+        Dict[str, List[DialogState]]:
+        - unhandled: состояния без обработчика
+        - unreachable: состояния, недостижимые из START
+    """
+    reachable = reachable_states()
+    report = {
+        "unhandled": [state for state in DialogState if state not in handlers],
+        "unreachable": [state for state in DialogState if state not in reachable]
+    }
+    if report["unhandled"]:
+        logger.warning(
+            "Состояния без обработчика (ввод в них возвращает в главное меню): %s",
+            ", ".join(state.name for state in report["unhandled"])
+        )
+    if report["unreachable"]:
+        logger.warning(
+            "Состояния, недостижимые из START: %s",
+            ", ".join(state.name for state in report["unreachable"])
+        )
+    return report
+
+def check_transition(current: DialogState, new: DialogState) -> None:
+    """
+    Проверка перехода по таблице
+
+    Raises:
+        InvalidTransition: Если переход не описан в STATE_TRANSITIONS
+    """
+    if new not in ALLOWED_TRANSITIONS[current]:
+        raise InvalidTransition(current, new)
@@ -57,7 +57,18 @@ GLOBAL_COMMANDS = {
     "/cancel": DialogState.CANCEL_CONFIRMATION
 }
 
-# Возможные переходы между состояниями
+# Состояния заполнения новой заявки: данные черновика лежат в temp_data
+# и удаляются, если пользователь долго не отвечает (DRAFT_CONFIG)
+DRAFT_STATES = frozenset({
+    DialogState.BUSINESS_TYPE_INPUT,
+    DialogState.BUSINESS_TASK_INPUT,
+    DialogState.PERSONAL_TASK_INPUT,
+    DialogState.CONTACT_INPUT,
+    DialogState.CONTACT_INPUT_RETRY,
+    DialogState.ORDER_CONFIRMATION
+})
+
+# Возможные переходы между состояниями (проверяются в DialogHandler.handle_state)
 STATE_TRANSITIONS = {
     DialogState.START: [
         DialogState.MAIN_MENU,
@@ -72,6 +83,7 @@ STATE_TRANSITIONS = {
     DialogState.HELP: [
         DialogState.MAIN_MENU,
         DialogState.CHOOSING_SERVICE_TYPE,
+        DialogState.LANGUAGE_SELECTION,
         DialogState.VIEWING_ORDERS
     ],
     DialogState.LANGUAGE_SELECTION: [
@@ -109,6 +121,8 @@ STATE_TRANSITIONS = {
     DialogState.CONTACT_INPUT: [
         DialogState.ORDER_CONFIRMATION,
         DialogState.CONTACT_INPUT_RETRY,
+        DialogState.BUSINESS_TASK_INPUT,
+        DialogState.PERSONAL_TASK_INPUT,
         DialogState.ERROR_HANDLING,
         DialogState.CANCEL_CONFIRMATION,
         DialogState.MAIN_MENU
@@ -122,6 +136,7 @@ STATE_TRANSITIONS = {
     DialogState.ORDER_CONFIRMATION: [
         DialogState.FINISHED,
         DialogState.CONTACT_INPUT,
+        DialogState.CHOOSING_SERVICE_TYPE,
         DialogState.ERROR_HANDLING,
         DialogState.CANCEL_CONFIRMATION,
         DialogState.MAIN_MENU
@@ -150,6 +165,7 @@ STATE_TRANSITIONS = {
     ],
     DialogState.ORDER_EDITING: [
         DialogState.ORDER_MANAGEMENT,
+        DialogState.VIEWING_ORDERS,
         DialogState.ERROR_HANDLING,
         DialogState.CANCEL_CONFIRMATION,
         DialogState.MAIN_MENU
@@ -173,7 +189,12 @@ STATE_TRANSITIONS = {
     DialogState.CANCEL_CONFIRMATION: [
         DialogState.MAIN_MENU
     ],
-    DialogState.FINISHED: [DialogState.MAIN_MENU]
+    DialogState.FINISHED: [
+        DialogState.CHOOSING_SERVICE_TYPE,
+        DialogState.VIEWING_ORDERS,
+        DialogState.LANGUAGE_SELECTION,
+        DialogState.MAIN_MENU
+    ]
 }
 
 # Сообщения для каждого состояния
@@ -0,0 +1,263 @@
+"""
+Каталог шаблонов ответов бота
+
+Тексты собраны в один каталог по языкам:
+- русские тексты по умолчанию: STATE_MESSAGES (ключи state.<СОСТОЯНИЕ>)
+  и DEFAULT_TEMPLATES ниже;
+- переводы и правки - раздел "dialog" файлов locales/<язык>.json, они
+  перекрывают встроенные тексты.
+
+Каталог компилируется один раз: каждый шаблон разбирается на литералы и
+подстановки, и отрисовка сводится к одному join. Тексты без подстановок
+(меню, справка) хранятся готовыми строками. Язык берется из
+UserState.context['locale'], при отсутствии ключа - русский текст.
+"""
+
+import logging
+from string import Formatter
+from typing import Any, Dict, List, Mapping, Optional, Tuple
+
+from .states import DialogState, STATE_MESSAGES
+
+logger = logging.getLogger(__name__)
+
+# Язык встроенных текстов и запасной язык
+DEFAULT_LOCALE = "ru"
+
+# Раздел файлов локализации с текстами диалога
+LOCALE_SECTION = "dialog"
+
+# Ключи текстов состояний
+STATE_KEYS: Dict[DialogState, str] = {state: f"state.{state.name}" for state in DialogState}
+
+# Тексты обработчиков диалога
+DEFAULT_TEMPLATES: Dict[str, str] = {
+    "greeting": (
+        "Здравствуйте, {name}! "
+        "Я автоматический помощник сообщества IT-Помощь в Поварово.\n\n"
+        "Чем могу помочь?"
+    ),
+    "menu.choose": "Выберите действие из меню:",
+    "service.choose_again": "Пожалуйста, выберите тип услуг:",
+    "services.personal": (
+        "Наши услуги для частных лиц:\n\n"
+        "🔧 Компьютерная помощь:\n"
+        "• Настройка и ремонт компьютеров\n"
+        "• Установка программ и антивирусов\n"
+        "• Восстановление данных\n\n"
+        "💻 Разработка:\n"
+        "• Создание сайтов и приложений\n"
+        "• Разработка чат-ботов\n"
+        "• Автоматизация процессов\n\n"
+        "📱 Обучение:\n"
+        "• Работа с компьютером и программами\n"
+        "• Основы программирования\n"
+        "• Работа с искусственным интеллектом\n\n"
+        "Опишите вашу задачу:"
+    ),
+    "services.business": (
+        "IT-услуги для бизнеса:\n\n"
+        "🏢 Автоматизация:\n"
+        "• Внедрение CRM-систем\n"
+        "• Автоматизация бизнес-процессов\n"
+        "• Интеграция сервисов\n\n"
+        "🌐 Разработка:\n"
+        "• Создание сайтов и веб-приложений\n"
+        "• Корпоративные порталы\n"
+        "• Мобильные приложения\n\n"
+        "🔧 Обслуживание:\n"
+        "• Техническая поддержка\n"
+        "• Настройка серверов\n"
+        "• Обеспечение безопасности\n\n"
+        "Опишите деятельность вашей компании:"
+    ),
+    "business_type.empty": "Пожалуйста, введите информацию о вашей компании:",
+    "business_task.ask": "Опишите, какая помощь требуется для вашего бизнеса:",
+    "business_task.empty": "Пожалуйста, опишите вашу задачу:",
+    "personal_task.too_short": (
+        "Пожалуйста, опишите вашу задачу подробнее (минимум 10 символов):\n\n"
+        "Например:\n"
+        "- Нужна помощь с настройкой принтера\n"
+        "- Не работает интернет\n"
+        "- Требуется обучение работе с Excel\n\n"
+        "Для отмены введите /cancel"
+    ),
+    "contact.ask": (
+        "Для связи с вами укажите, пожалуйста, номер телефона:\n"
+        "Формат: 89991234567\n\n"
+        "Для отмены введите /cancel"
+    ),
+    "contact.invalid": (
+        "Некорректный формат номера телефона. Пожалуйста, введите номер в формате: 89991234567\n\n"
+        "Для отмены введите /cancel"
+    ),
+    "order.summary": "Имя: {name}\nТелефон: {phone}\nОписание: {task}",
+    "order.summary_business": "\nТип бизнеса: {business_type}",
+    "order.details": "Заявка №{order_id}\nДата создания: {created_at}\n{summary}",
+    "confirmation.check": "Проверьте данные вашей заявки:\n\n{order_details}\n\nВсё верно?",
+    "confirmation.check_empty": "Проверьте данные заявки:",
+    "confirmation.accepted": (
+        "Спасибо! Ваша заявка №{order_id} принята. "
+        "Мы свяжемся с вами в ближайшее время."
+    ),
+    "confirmation.restart": "Хорошо, давайте заполним заявку заново. Выберите категорию услуг:",
+    "orders.empty": "У вас пока нет активных заявок.",
+    "orders.header": "Ваши активные заявки:\n",
+    "orders.item": "{emoji} Заявка №{order_id} ({status})\nСоздана: {created}\nЗадача: {task}\n",
+    "order.card": "Заявка №{order_id} ({status})\nСоздана: {created}\nОписание: {task}\n\nВыберите действие:",
+    "order.card_header": "Заявка №{order_id}:\n\n{order_details}\n\nВыберите действие:",
+    "order.choose_action": "Выберите действие с заявкой:",
+    "editing.ask": "Введите новое описание заявки:",
+    "editing.empty": "Пожалуйста, введите новое описание заявки:",
+    "editing.updated": "Заявка №{order_id} успешно обновлена!",
+    "cancel.done": "Действие отменено. Выберите, что хотите сделать:",
+    "language.changed": "Язык бота: русский. Выберите действие:",
+    "error.restart": "Произошла ошибка. Пожалуйста, начните сначала.",
+    "error.timeout": "Не удалось вовремя обработать сообщение. Пожалуйста, отправьте его еще раз чуть позже.",
+    "flood.muted": (
+        "Слишком много сообщений подряд. "
+        "Бот не будет отвечать {minutes} мин., затем можно продолжить."
+    ),
+    "draft.expired": (
+        "Вы не закончили заявку, и введенные данные удалены. "
+        "Чтобы оформить заявку, нажмите «Создать заявку»."
+    )
+}
+
+_FORMATTER = Formatter()
+
+class Template:
+    """
+    Шаблон с заранее разобранными подстановками
+
+    Литералы лежат в списке частей, места подстановок помечены индексами;
+    render заполняет копию списка и склеивает ее. Для отсутствующего
+    параметра остается исходная подстановка {name}, как у str.format с
+    перехваченным KeyError в LocalizationService.
+    """
+
+    __slots__ = ("source", "text", "_parts", "_fields")
+
+    def __init__(self, source: str):
+        self.source = source
+        parts: List[str] = []
+        fields: List[Tuple[int, str, str, Optional[str]]] = []
+        for literal, name, spec, conversion in _FORMATTER.parse(source):
+            if literal:
+                parts.append(literal)
+            if name is not None:
+                fields.append((len(parts), name, spec or "", conversion))
+                parts.append("{" + name + "}")
+        self._parts = parts
+        self._fields = tuple(fields)
+        # Готовый текст шаблона без подстановок
+        self.text: Optional[str] = None if fields else "".join(parts)
+
+    @property
+    def fields(self) -> Tuple[str, ...]:
+        return tuple(field[1] for field in self._fields)
+
+    def render(self, params: Mapping[str, Any]) -> str:
+        if self.text is not None:
+            return self.text
+        parts = self._parts.copy()
+        for index, name, spec, conversion in self._fields:
+            if name not in params:
+                continue
+            value = params[name]
+            if conversion == "r":
+                value = repr(value)
+            elif conversion == "a":
+                value = ascii(value)
+            parts[index] = format(value, spec) if spec else str(value)
+        return "".join(parts)
+
+def flatten_section(tree: Mapping[str, Any], prefix: str = "") -> Dict[str, str]:
+    """Вложенный раздел локализации -> {"a.b.c": текст}"""
+    flat: Dict[str, str] = {}
+    for name, value in tree.items():
+        key = f"{prefix}{name}"
+        if isinstance(value, Mapping):
+            flat.update(flatten_section(value, key + "."))
+        elif isinstance(value, str):
+            flat[key] = value
+    return flat
+
+class TemplateCatalog:
+    """
+    Скомпилированные шаблоны по языкам
+
+    Пример:
+    ```python
+    catalog = TemplateCatalog.from_locales(LocalizationService().locales)
+    catalog.render("orders.empty", "en")
+    catalog.render("confirmation.accepted", user_state.context.get("locale"), order_id=42)
+    ```
+    """
+
+    def __init__(self, overrides: Optional[Mapping[str, Mapping[str, str]]] = None):
+        """
+        Args:
+            overrides: Тексты по языкам {язык: {ключ: текст}}, перекрывают встроенные
+        """
+        base = {STATE_KEYS[state]: text for state, text in STATE_MESSAGES.items()}
+        base.update(DEFAULT_TEMPLATES)
+        overrides = overrides or {}
+
+        sources: Dict[str, Dict[str, str]] = {DEFAULT_LOCALE: {**base, **overrides.get(DEFAULT_LOCALE, {})}}
+        for locale, texts in overrides.items():
+            if locale != DEFAULT_LOCALE:
+                sources[locale] = dict(texts)
+
+        self._templates: Dict[str, Dict[str, Template]] = {
+            locale: {key: Template(text) for key, text in texts.items()}
+            for locale, texts in sources.items()
+        }
+        self._default = self._templates[DEFAULT_LOCALE]
+        # Запасной язык - русский: недостающие ключи языка берутся из него
+        for locale, templates in self._templates.items():
+            if locale != DEFAULT_LOCALE:
+                for key, template in self._default.items():
+                    templates.setdefault(key, template)
+
+        logger.info(
+            "Каталог шаблонов собран: %s",
+            ", ".join(f"{locale} ({len(templates)})" for locale, templates in self._templates.items())
+        )
+
+    @classmethod
+    def from_locales(cls, locales: Mapping[str, Mapping[str, Any]]) -> "TemplateCatalog":
+        """Каталог из деревьев локализации (раздел "dialog" каждого языка)"""
+        return cls({
+            locale: flatten_section(tree.get(LOCALE_SECTION) or {})
+            for locale, tree in locales.items()
+        })
+
+    @property
+    def locales(self) -> List[str]:
+        return list(self._templates)
+
+    def get(self, key: str, locale: Optional[str] = None) -> Optional[Template]:
+        """Шаблон по ключу с откатом на русский"""
+        templates = self._templates.get(locale or DEFAULT_LOCALE, self._default)
+        return templates.get(key)
+
+    def render(self, key: str, locale: Optional[str] = None, **params: Any) -> str:
+        """
+        Текст по ключу
+
+        Returns:
+            str: Отрисованный шаблон; если ключа нет ни в одном языке - сам ключ
+        """
+        template = self.get(key, locale)
+        if template is None:
+            logger.warning("Нет шаблона %s", key)
+            return key
+        return template.render(params)
+
+    def state_text(self, state: DialogState, locale: Optional[str] = None) -> str:
+        """Текст состояния (STATE_MESSAGES или его перевод)"""
+        return self.render(STATE_KEYS[state], locale)
+
+# Каталог встроенных русских текстов (без файлов локализации)
+DEFAULT_CATALOG = TemplateCatalog()
@@ -1,8 +1,10 @@
 import asyncio
 import logging
-import logging.config
 import os
+import signal
+import time
 from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
 from aiohttp import web
 from flask import Flask, request, jsonify
 
@@ -11,60 +13,139 @@ from config.config import (
     APP_PORT,
     DATABASE_PATH,
     LOGGING_CONFIG,
+    LOG_SAMPLING_CONFIG,
+    BATCH_CONFIG,
+    RATE_LIMIT_CONFIG,
+    IDEMPOTENCY_CONFIG,
+    INGEST_CONFIG,
+    WEB_WORKERS_CONFIG,
     validate_config
 )
+from config.logging_config import setup_logging
 from services.vk_service import VKService
 from services.storage_service import StorageService
+from services.backup_service import BackupService
+from services.outbox_service import OutboxService
+from services.telegram_service import TelegramService
+from services.ingest_queue import IngestQueueService
+from services.health_service import HealthService
+from services.worker_supervisor import WorkerBoard, WorkerSupervisor
 from utils.helpers import PhoneNumberHelper, TextHelper
+from utils.rate_limit import KeyedRateLimiter
+from utils.metrics import (
+    metrics,
+    CACHE_REQUESTS_TOTAL,
+    ERROR_FINGERPRINTS,
+    ERROR_NOTIFICATIONS_TOTAL,
+    ERRORS_TOTAL,
+    NOTIFY_CIRCUIT_OPEN,
+    NOTIFY_FAILURES_TOTAL,
+    NOTIFY_REQUESTS_TOTAL,
+    QUEUE_DEPTH
+)
+from web.middlewares import (
+    MAX_IDEMPOTENCY_KEY_LENGTH,
+    IdempotencyCache,
+    create_idempotency_middleware,
+    create_rate_limit_middleware
+)
+from web.orders_api import OrdersApi
+from web.order_feed import OrderFeed
 
 # Проверяем конфигурацию
 validate_config()
 
-# Настройка логирования
-logging.config.dictConfig(LOGGING_CONFIG)
+# Настройка логирования (запись в файл и консоль - в фоновом потоке)
+setup_logging(LOGGING_CONFIG, LOG_SAMPLING_CONFIG)
 logger = logging.getLogger(__name__)
 
 # Инициализация сервисов
 storage = StorageService()
-vk_service = VKService()
+telegram = TelegramService()
+# VK бот создается после запуска веб-сервера: его инициализация
+# блокирующая, а /readyz должен отвечать уже во время нее
+vk_service: Optional[VKService] = None
+backup_service = BackupService()
+outbox_service = OutboxService(storage, telegram)
+ingest_queue = IngestQueueService(storage)
+health_service = HealthService(storage, telegram, lambda: vk_service)
+
+# Счетчики уведомлений читаются при сборе метрик, как и счетчики middleware
+ERROR_NOTIFICATIONS_TOTAL.labels("allowed").set_function(lambda: telegram.error_throttle.allowed)
+ERROR_NOTIFICATIONS_TOTAL.labels("suppressed").set_function(lambda: telegram.error_throttle.suppressed)
+ERROR_FINGERPRINTS.set_function(lambda: len(telegram.error_throttle))
+for sink in telegram.router.sinks.values():
+    NOTIFY_REQUESTS_TOTAL.labels(sink.name).set_function(lambda sink=sink: sink.requests_total)
+    NOTIFY_FAILURES_TOTAL.labels(sink.name).set_function(lambda sink=sink: sink.requests_failed)
+    NOTIFY_CIRCUIT_OPEN.labels(sink.name).set_function(lambda sink=sink: sink.circuit_state == "open")
+# Таблица процессов и номер текущего веб-воркера (при WEB_WORKERS > 0)
+worker_board: Optional[WorkerBoard] = None
+worker_slot = 0
 
 # Создаем директорию для базы данных если её нет
 Path(DATABASE_PATH).parent.mkdir(parents=True, exist_ok=True)
 
+def validate_submission(data: Any) -> Tuple[Optional[Dict[str, str]], Optional[str]]:
+    """
+    Проверка и форматирование заявки с сайта
+    
+    Returns:
+        Tuple[Optional[Dict[str, str]], Optional[str]]:
+        - Отформатированные данные заявки или None
+        - Текст ошибки или None
+    """
+    # Проверка обязательных полей
+    required_fields = ["name", "phone", "message"]
+    if not isinstance(data, dict) or not all(isinstance(data.get(field), str) for field in required_fields):
+        return None, "Не все обязательные поля заполнены"
+
+    # Валидация и форматирование данных
+    if not PhoneNumberHelper.is_valid_phone(data['phone']):
+        return None, "Некорректный формат номера телефона"
+
+    # Форматируем данные
+    return {
+        "name": TextHelper.clean_text(data['name']),
+        "phone": PhoneNumberHelper.format_phone(data['phone']),
+        "task": TextHelper.clean_text(data['message']),
+        "source": "website"
+    }, None
+
 async def handle_form_submission(request):
     """Обработка заявок с сайта"""
     try:
         data = await request.json()
         
-        # Проверка обязательных полей
-        required_fields = ["name", "phone", "message"]
-        if not all(field in data for field in required_fields):
-            return web.json_response(
-                {"error": "Не все обязательные поля заполнены"}, 
-                status=400
-            )
+        formatted_data, error = validate_submission(data)
+        if error:
+            return web.json_response({"error": error}, status=400)
 
-        # Валидация и форматирование данных
-        if not PhoneNumberHelper.is_valid_phone(data['phone']):
-            return web.json_response(
-                {"error": "Некорректный формат номера телефона"}, 
-                status=400
+        # Асинхронный режим: заявка сохраняется фоновым обработчиком очереди
+        if INGEST_CONFIG['enabled']:
+            token = await ingest_queue.enqueue(
+                {
+                    "user_id": "website",
+                    "name": formatted_data['name'],
+                    "phone": formatted_data['phone'],
+                    "task": formatted_data['task']
+                },
+                idempotency_key=request.get('idempotency_key')
             )
-
-        # Форматируем данные
-        formatted_data = {
-            "name": TextHelper.clean_text(data['name']),
-            "phone": PhoneNumberHelper.format_phone(data['phone']),
-            "task": TextHelper.clean_text(data['message']),
-            "source": "website"
-        }
+            return web.json_response({
+                "success": True,
+                "status": "queued",
+                "token": token,
+                "status_url": f"/submit/status/{token}"
+            }, status=202)
 
         # Создаем заявку
         order_id = await storage.create_order(
             user_id="website",
             name=formatted_data['name'],
             phone=formatted_data['phone'],
-            task=formatted_data['task']
+            task=formatted_data['task'],
+            idempotency_key=request.get('idempotency_key'),
+            idempotency_ttl=IDEMPOTENCY_CONFIG['ttl']
         )
 
         return web.json_response({
@@ -73,34 +154,278 @@ async def handle_form_submission(request):
         })
 
     except Exception as e:
-        logger.error(f"Ошибка обработки формы: {e}")
+        ERRORS_TOTAL.labels("web_submit").inc()
+        logger.error("Ошибка обработки формы: %s", e)
+        return web.json_response(
+            {"error": "Внутренняя ошибка сервера"}, 
+            status=500
+        )
+
+async def handle_batch_submission(request):
+    """
+    Пакетная обработка заявок с сайта
+    
+    Принимает массив заявок (или объект {"items": [...]}), проверяет каждую
+    и сохраняет все корректные одной транзакцией. В ответе - результат
+    по каждому элементу в исходном порядке; created - число новых заявок,
+    replayed - число элементов, вернувших уже созданную заявку.
+
+    Ключ идемпотентности заявки - ее поле idempotency_key, а без него -
+    Idempotency-Key запроса с номером элемента ("<ключ>:<индекс>"): повтор
+    пакета не создает дублей и после перезапуска.
+    """
+    if request.content_length and request.content_length > BATCH_CONFIG['max_body_bytes']:
+        return web.json_response({"error": "Слишком большой запрос"}, status=413)
+
+    try:
+        data = await request.json()
+    except web.HTTPRequestEntityTooLarge:
+        return web.json_response({"error": "Слишком большой запрос"}, status=413)
+    except ValueError:
+        return web.json_response({"error": "Некорректный JSON"}, status=400)
+
+    items = data.get("items") if isinstance(data, dict) else data
+    if not isinstance(items, list) or not items:
+        return web.json_response({"error": "Ожидается непустой массив заявок"}, status=400)
+    if len(items) > BATCH_CONFIG['max_items']:
+        return web.json_response(
+            {"error": f"Не более {BATCH_CONFIG['max_items']} заявок в одном запросе"},
+            status=413
+        )
+
+    try:
+        request_key = request.get('idempotency_key')
+        results: List[Dict[str, Any]] = []
+        valid_orders = []
+        valid_indexes = []
+        for index, item in enumerate(items):
+            formatted_data, error = validate_submission(item)
+            item_key = item.get('idempotency_key') if isinstance(item, dict) else None
+            if not error and item_key is not None and (
+                not isinstance(item_key, str) or not 0 < len(item_key) <= MAX_IDEMPOTENCY_KEY_LENGTH
+            ):
+                error = "Некорректный idempotency_key"
+            if error:
+                results.append({"index": index, "success": False, "error": error})
+                continue
+            if item_key is None and request_key:
+                item_key = f"{request_key}:{index}"
+            results.append({"index": index, "success": True})
+            valid_indexes.append(index)
+            valid_orders.append({
+                "user_id": "website",
+                "name": formatted_data['name'],
+                "phone": formatted_data['phone'],
+                "task": formatted_data['task'],
+                "idempotency_key": item_key
+            })
+
+        # Все корректные заявки сохраняются одной транзакцией
+        batch = await storage.create_orders_batch(valid_orders, idempotency_ttl=IDEMPOTENCY_CONFIG['ttl'])
+        for index, order_id, replayed in zip(valid_indexes, batch.order_ids, batch.replayed):
+            results[index]["order_id"] = order_id
+            results[index]["replayed"] = replayed
+
+        # Повторы по ключу идемпотентности считаются отдельно от новых заявок
+        return web.json_response({
+            "success": len(valid_orders) == len(items),
+            "created": batch.created,
+            "replayed": len(valid_orders) - batch.created,
+            "failed": len(items) - len(valid_orders),
+            "results": results
+        })
+
+    except Exception as e:
+        ERRORS_TOTAL.labels("web_submit_batch").inc()
+        logger.error("Ошибка пакетной обработки заявок: %s", e, exc_info=True)
         return web.json_response(
             {"error": "Внутренняя ошибка сервера"}, 
             status=500
         )
 
+async def handle_submission_status(request):
+    """Статус заявки, принятой в асинхронном режиме"""
+    status = await ingest_queue.get_status(request.match_info['token'])
+    if not status:
+        return web.json_response({"error": "Заявка не найдена"}, status=404)
+    return web.json_response(status)
+
 async def handle_health_check(request):
     """Проверка работоспособности сервиса"""
     return web.Response(text="Service is running", status=200)
 
+async def handle_liveness(request):
+    """Liveness: процесс жив и цикл событий отвечает"""
+    if worker_board is None:
+        return web.json_response({"status": "ok"})
+    # В режиме веб-воркеров - еще и состояние всех процессов (справочно)
+    return web.json_response({
+        "status": "ok",
+        "worker": worker_slot,
+        "pid": os.getpid(),
+        "processes": worker_board.snapshot()
+    })
+
+async def handle_readiness(request):
+    """Readiness: база, LongPoll, очередь уведомлений и приемники в порядке"""
+    report = await health_service.check()
+    return web.json_response(report, status=200 if report["ready"] else 503)
+
+async def handle_metrics(request):
+    """
+    Метрики в текстовом формате Prometheus
+
+    Метрики - свои у каждого процесса. В режиме веб-воркеров метрики бота,
+    доставки уведомлений и фоновых задач отдает основной процесс на
+    METRICS_PORT (run_service_app), а воркер на APP_PORT - только свои
+    (HTTP-запросы, лимиты, кэш идемпотентности, вызовы базы из API).
+    """
+    # Размеры очередей считаются только при сборе метрик
+    try:
+        QUEUE_DEPTH.labels("outbox_pending").set(await storage.count_outbox('pending'))
+        QUEUE_DEPTH.labels("outbox_dead").set(await storage.count_outbox('dead'))
+        QUEUE_DEPTH.labels("ingest_queued").set(await ingest_queue.count('queued'))
+    except Exception as e:
+        logger.error("Ошибка получения размеров очередей: %s", e)
+    return web.Response(
+        body=metrics.render().encode('utf-8'),
+        headers={"Content-Type": metrics.CONTENT_TYPE}
+    )
+
+async def cleanup_idempotency_keys(app):
+    """Периодическое удаление просроченных ключей идемпотентности"""
+    async def cleanup_loop():
+        while True:
+            try:
+                deleted = await storage.cleanup_idempotency_keys(IDEMPOTENCY_CONFIG['ttl'])
+                if deleted:
+                    logger.info("Удалено просроченных ключей идемпотентности: %s", deleted)
+            except Exception as e:
+                logger.error("Ошибка очистки ключей идемпотентности: %s", e)
+            await asyncio.sleep(3600)
+
+    task = asyncio.create_task(cleanup_loop())
+    yield
+    task.cancel()
+    try:
+        await task
+    except asyncio.CancelledError:
+        pass
+
 async def init_app():
     """Инициализация веб-приложения"""
-    app = web.Application()
+    submit_paths = ('/submit', '/submit/batch')
+    limiter = KeyedRateLimiter(
+        rate=RATE_LIMIT_CONFIG['rate'],
+        burst=RATE_LIMIT_CONFIG['burst'],
+        max_keys=RATE_LIMIT_CONFIG['max_clients']
+    )
+    idempotency_cache = IdempotencyCache(ttl=IDEMPOTENCY_CONFIG['ttl'], max_size=IDEMPOTENCY_CONFIG['cache_size'])
+
+    # Счетчики middleware читаются при сборе метрик, без затрат на запрос
+    CACHE_REQUESTS_TOTAL.labels("idempotency", "hit").set_function(lambda: idempotency_cache.hits)
+    CACHE_REQUESTS_TOTAL.labels("idempotency", "miss").set_function(lambda: idempotency_cache.misses)
+    rate_limit_total = metrics.counter("vkbot_submit_rate_limit_total", "Проверки лимита заявок по IP", ["result"])
+    rate_limit_total.labels("allowed").set_function(lambda: limiter.allowed)
+    rate_limit_total.labels("limited").set_function(lambda: limiter.limited)
+
+    # Ограничение частоты проверяется первым, до разбора тела запроса
+    middlewares = [
+        create_rate_limit_middleware(
+            limiter,
+            submit_paths,
+            trust_proxy=RATE_LIMIT_CONFIG['trust_proxy']
+        ),
+        create_idempotency_middleware(idempotency_cache, submit_paths)
+    ]
+    app = web.Application(middlewares=middlewares, client_max_size=BATCH_CONFIG['max_body_bytes'])
+    app.cleanup_ctx.append(cleanup_idempotency_keys)
     app.router.add_get('/', handle_health_check)
+    app.router.add_get('/healthz', handle_liveness)
+    app.router.add_get('/readyz', handle_readiness)
     app.router.add_post('/submit', handle_form_submission)
+    app.router.add_post('/submit/batch', handle_batch_submission)
+    app.router.add_get('/submit/status/{token}', handle_submission_status)
+    app.router.add_get('/metrics', handle_metrics)
+    OrdersApi(storage).register(app)
+    OrderFeed(storage).register(app)
     return app
 
-async def run_web_app():
+async def run_web_app(reuse_port: bool = False) -> web.AppRunner:
     """Запуск веб-приложения"""
     app = await init_app()
     runner = web.AppRunner(app)
     await runner.setup()
-    site = web.TCPSite(runner, APP_HOST, APP_PORT)
+    site = web.TCPSite(runner, APP_HOST, APP_PORT, reuse_port=reuse_port)
     await site.start()
-    logger.info(f"Веб-сервер запущен на {APP_HOST}:{APP_PORT}")
+    logger.info("Веб-сервер запущен на %s:%s", APP_HOST, APP_PORT)
+    return runner
+
+async def run_service_app() -> web.AppRunner:
+    """
+    Служебный веб-сервер основного процесса в режиме веб-воркеров
+
+    Запросы к APP_PORT распределяются между воркерами, а бот, доставка
+    уведомлений и фоновые задачи работают в основном процессе - их
+    метрики и проверки готовности доступны на отдельном порту.
+    """
+    app = web.Application()
+    app.router.add_get('/healthz', handle_liveness)
+    app.router.add_get('/readyz', handle_readiness)
+    app.router.add_get('/metrics', handle_metrics)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, APP_HOST, WEB_WORKERS_CONFIG["metrics_port"])
+    await site.start()
+    logger.info("Метрики основного процесса: %s:%s/metrics", APP_HOST, WEB_WORKERS_CONFIG["metrics_port"])
+    return runner
+
+async def serve_web_worker(slot: int, board: WorkerBoard) -> None:
+    """Веб-сервер в процессе воркера: работает до SIGTERM/SIGINT"""
+    stop_event = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for signum in (signal.SIGTERM, signal.SIGINT):
+        loop.add_signal_handler(signum, stop_event.set)
+
+    board.mark_started(slot)
+    runner = await run_web_app(reuse_port=True)
+    try:
+        while not stop_event.is_set():
+            board.beat(slot)
+            try:
+                await asyncio.wait_for(stop_event.wait(), timeout=WEB_WORKERS_CONFIG['heartbeat_interval'])
+            except asyncio.TimeoutError:
+                pass
+    finally:
+        logger.info("Остановка веб-воркера %s...", slot)
+        await runner.cleanup()
+        await telegram.close()
+
+def run_web_worker(slot: int, board: WorkerBoard) -> None:
+    """
+    Точка входа процесса веб-воркера
+
+    Процесс запускается через spawn и заново импортирует этот модуль,
+    поэтому у каждого воркера свои StorageService и подключения к базе.
+    Фоновые задачи (outbox, обработчик очереди, резервное копирование)
+    и VK бот работают только в основном процессе.
+    """
+    global worker_board, worker_slot
+    worker_board, worker_slot = board, slot
+    health_service.board = board
+    asyncio.run(serve_web_worker(slot, board))
+
+def longpoll_age() -> Optional[float]:
+    """Секунд с последнего успешного опроса LongPoll в этом процессе"""
+    if vk_service is None or vk_service.last_poll_at is None:
+        return None
+    return time.monotonic() - vk_service.last_poll_at
 
 async def main():
     """Основная функция запуска"""
+    global vk_service, worker_board
+    supervisor = None
+    service_runner = None
     try:
         logger.info("Запуск приложения...")
         
@@ -109,29 +434,67 @@ async def main():
             logger.error("Не установлен токен VK API (VK_TOKEN)")
             raise ValueError("VK_TOKEN is not set")
             
-        # Запускаем веб-сервер
-        logger.info(f"Запуск веб-сервера на {APP_HOST}:{APP_PORT}...")
-        await run_web_app()
-        logger.info("Веб-сервер успешно запущен")
+        # Запускаем веб-сервер: в этом процессе или в отдельных воркерах
+        workers = WEB_WORKERS_CONFIG['workers']
+        if workers > 0:
+            logger.info("Запуск %s веб-воркеров на %s:%s...", workers, APP_HOST, APP_PORT)
+            supervisor = WorkerSupervisor(
+                run_web_worker,
+                workers,
+                longpoll_age_getter=longpoll_age,
+                check_interval=WEB_WORKERS_CONFIG['heartbeat_interval'],
+                max_restart_delay=WEB_WORKERS_CONFIG['max_restart_delay']
+            )
+            supervisor.start()
+            worker_board = supervisor.board
+            service_runner = await run_service_app()
+        else:
+            logger.info("Запуск веб-сервера на %s:%s...", APP_HOST, APP_PORT)
+            await run_web_app()
+            logger.info("Веб-сервер успешно запущен")
+        
+        # Запускаем резервное копирование по расписанию
+        backup_service.start()
+        
+        # Запускаем фоновую доставку уведомлений
+        telegram.start()
+        outbox_service.start()
+        
+        # Обработчик очереди запускается всегда: он дообработает
+        # заявки, оставшиеся после работы в асинхронном режиме
+        ingest_queue.start()
         
         # Запускаем VK бота
         logger.info("Инициализация VK бота...")
         try:
+            # Инициализация обращается к VK API синхронно - выполняем ее в пуле потоков
+            vk_service = await asyncio.get_running_loop().run_in_executor(
+                None, VKService, storage, telegram
+            )
             # Запускаем бота и ждем его завершения
             await vk_service.run()
         except Exception as e:
-            logger.error(f"Ошибка при запуске VK бота: {e}", exc_info=True)
+            logger.error("Ошибка при запуске VK бота: %s", e, exc_info=True)
             raise
         
     except KeyboardInterrupt:
         logger.info("Получен сигнал завершения работы...")
     except Exception as e:
-        logger.error(f"Критическая ошибка при запуске приложения: {e}", exc_info=True)
+        logger.error("Критическая ошибка при запуске приложения: %s", e, exc_info=True)
         raise
     finally:
         # Останавливаем бота при выходе
         logger.info("Остановка приложения...")
-        await vk_service.stop()
+        if supervisor:
+            await supervisor.stop(WEB_WORKERS_CONFIG['shutdown_timeout'])
+        if service_runner:
+            await service_runner.cleanup()
+        if vk_service:
+            await vk_service.stop()
+        await ingest_queue.stop()
+        await outbox_service.stop()
+        await backup_service.stop()
+        await telegram.close()
 
 if __name__ == "__main__":
     try:
@@ -140,6 +503,6 @@ if __name__ == "__main__":
     except KeyboardInterrupt:
         logger.info("Получен сигнал завершения работы...")
     except Exception as e:
-        logger.error(f"Неожиданная ошибка при запуске: {e}", exc_info=True)
+        logger.error("Неожиданная ошибка при запуске: %s", e, exc_info=True)
     finally:
         logger.info("Приложение остановлено")
\ No newline at end of file
@@ -1,3 +1,3 @@
-from .schemas import Order, UserState, UserOrderInput
+from .schemas import Order, UserState, UserOrderInput, OutboxEvent, OutboxEntry
 
-__all__ = ['Order', 'UserState', 'UserOrderInput']
\ No newline at end of file
+__all__ = ['Order', 'UserState', 'UserOrderInput', 'OutboxEvent', 'OutboxEntry']
\ No newline at end of file
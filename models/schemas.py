@@ -1,5 +1,6 @@
+from enum import Enum
 from pydantic import BaseModel, Field
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List
 from datetime import datetime
 
 class Order(BaseModel):
@@ -56,4 +57,21 @@ class UserOrderInput(BaseModel):
     task: Optional[str] = None
     phone: Optional[str] = None
     name: str
-    user_id: str
\ No newline at end of file
+    user_id: str
+
+class OutboxEvent(str, Enum):
+    """Типы событий в outbox"""
+    ORDER_CREATED = "order_created"
+    ORDER_UPDATED = "order_updated"
+    ORDER_DELETED = "order_deleted"
+
+class OutboxEntry(BaseModel):
+    """Модель записи outbox для фоновой доставки уведомлений"""
+    id: int
+    event_type: str
+    payload: Dict[str, Any] = Field(default_factory=dict)
+    status: str = Field(default="pending")
+    attempts: int = 0
+    last_error: Optional[str] = None
+    created_at: datetime = Field(default_factory=datetime.now)
+    delivered_sinks: List[str] = Field(default_factory=list)
@@ -1,5 +1,14 @@
 from .vk_service import VKService
 from .telegram_service import TelegramService
-from .storage_service import StorageService
+from .storage_service import BatchResult, StorageService
+from .backup_service import BackupService
+from .outbox_service import OutboxService
+from .ingest_queue import IngestQueueService
+from .health_service import HealthService
+from .localization_service import LocalizationService
+from .worker_supervisor import WorkerBoard, WorkerSupervisor
+from .pipeline import MessageContext, Pipeline
 
-__all__ = ['VKService', 'TelegramService', 'StorageService']
\ No newline at end of file
+__all__ = ['VKService', 'TelegramService', 'StorageService', 'BatchResult', 'BackupService', 'OutboxService',
+           'IngestQueueService', 'HealthService', 'LocalizationService', 'WorkerBoard', 'WorkerSupervisor',
+           'MessageContext', 'Pipeline']
\ No newline at end of file
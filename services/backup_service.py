@@ -0,0 +1,309 @@
+import argparse
+import asyncio
+import gzip
+import logging
+import shutil
+import sqlite3
+import tempfile
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+from config.config import DATABASE_PATH, BACKUP_DIR, BACKUP_CONFIG, DB_CONFIG
+
+logger = logging.getLogger(__name__)
+
+class _BackupRestarted(Exception):
+    """Постраничное копирование начиналось заново слишком много раз"""
+
+class BackupService:
+    """
+    Сервис онлайн-резервного копирования базы заявок.
+
+    Копия снимается через SQLite Online Backup API небольшими порциями
+    страниц с паузой между шагами, поэтому бот продолжает принимать
+    заявки во время копирования.
+
+    Если база изменяется другим соединением, SQLite начинает постраничное
+    копирование заново; после max_restarts перезапусков копия снимается
+    за один шаг. В режиме WAL это одно чтение снимка базы, писатели при
+    этом не блокируются.
+    """
+
+    FILE_PREFIX = "orders-"
+
+    def __init__(self, db_path: Path = DATABASE_PATH, backup_dir: Path = BACKUP_DIR,
+                 config: Optional[Dict[str, Any]] = None):
+        config = config or BACKUP_CONFIG
+        self.db_path = Path(db_path)
+        self.backup_dir = Path(backup_dir)
+        self.interval_hours = config['interval_hours']
+        self.keep = config['keep']
+        self.compress = config['compress']
+        self.pages_per_step = max(1, config['pages_per_step'])
+        self.step_pause = config['step_pause']
+        self.max_restarts = config.get('max_restarts', 3)
+        self.backup_task = None
+
+    def _copy_database(self, source_path: Path, target_path: Path) -> int:
+        """
+        Постраничное копирование базы через Online Backup API
+
+        Между шагами соединение с исходной базой не удерживает блокировку,
+        а пауза дает время писателям завершить свои транзакции. Запись в
+        базу во время копирования начинает его заново; после max_restarts
+        перезапусков оставшаяся копия снимается за один шаг.
+
+        Returns:
+            int: Количество скопированных страниц
+        """
+        pages_total = 0
+        restarts = 0
+        last_remaining = None
+
+        def progress(status, remaining, total):
+            nonlocal pages_total, restarts, last_remaining
+            pages_total = total
+            # После перезапуска число оставшихся страниц не уменьшается
+            if last_remaining is not None and remaining >= last_remaining:
+                restarts += 1
+                if restarts > self.max_restarts:
+                    raise _BackupRestarted()
+            last_remaining = remaining
+            if remaining and self.step_pause:
+                time.sleep(self.step_pause)
+
+        source = sqlite3.connect(str(source_path), timeout=30)
+        target = sqlite3.connect(str(target_path))
+        try:
+            if source_path == self.db_path:
+                # Режим журнала задает StorageService; копия его только проверяет:
+                # без WAL чтение копии блокирует запись в рабочую базу
+                journal_mode = source.execute("PRAGMA journal_mode").fetchone()[0]
+                expected = DB_CONFIG['pragmas']['journal_mode']
+                if journal_mode.lower() != expected.lower():
+                    logger.warning(
+                        "База %s в режиме журнала %s вместо %s, копирование может задерживать запись",
+                        source_path.name, journal_mode, expected
+                    )
+            try:
+                source.backup(target, pages=self.pages_per_step, progress=progress)
+            except _BackupRestarted:
+                logger.warning(
+                    "Копирование %s перезапускалось %s раз из-за записи в базу, копируем за один шаг",
+                    source_path.name, restarts
+                )
+                source.backup(target)
+                pages_total = source.execute("PRAGMA page_count").fetchone()[0]
+        finally:
+            target.close()
+            source.close()
+        return pages_total
+
+    def _create_backup_sync(self, rotate: bool = True) -> Path:
+        """Создание резервной копии (выполняется в отдельном потоке)"""
+        self.backup_dir.mkdir(parents=True, exist_ok=True)
+        started = time.monotonic()
+
+        name = f"{self.FILE_PREFIX}{datetime.now().strftime('%Y%m%d-%H%M%S-%f')}.db"
+        final_path = self.backup_dir / (name + ".gz" if self.compress else name)
+        raw_path = self.backup_dir / (name + ".tmp")
+
+        try:
+            pages = self._copy_database(self.db_path, raw_path)
+
+            # Копия должна быть самодостаточным файлом без -wal/-shm
+            conn = sqlite3.connect(str(raw_path))
+            try:
+                conn.execute("PRAGMA journal_mode = DELETE")
+            finally:
+                conn.close()
+
+            if self.compress:
+                gz_tmp = final_path.with_name(final_path.name + ".tmp")
+                with open(raw_path, 'rb') as src, gzip.open(gz_tmp, 'wb', compresslevel=6) as dst:
+                    shutil.copyfileobj(src, dst, 1024 * 1024)
+                raw_path.unlink()
+                gz_tmp.replace(final_path)
+            else:
+                raw_path.replace(final_path)
+        finally:
+            for leftover in (raw_path, final_path.with_name(final_path.name + ".tmp")):
+                if leftover.exists():
+                    leftover.unlink()
+
+        logger.info(
+            "Резервная копия создана: %s (%s стр., %.2f с)",
+            final_path.name, pages, time.monotonic() - started
+        )
+        if rotate:
+            self._rotate()
+        return final_path
+
+    def list_backups(self) -> List[Path]:
+        """Список резервных копий, от новых к старым"""
+        if not self.backup_dir.exists():
+            return []
+        backups = [
+            path for path in self.backup_dir.iterdir()
+            if path.name.startswith(self.FILE_PREFIX) and path.name.endswith((".db", ".db.gz"))
+        ]
+        return sorted(backups, key=lambda path: path.name, reverse=True)
+
+    def _rotate(self) -> int:
+        """Удаление копий сверх лимита хранения"""
+        if self.keep <= 0:
+            return 0
+        removed = 0
+        for path in self.list_backups()[self.keep:]:
+            try:
+                path.unlink()
+                removed += 1
+            except OSError as e:
+                logger.error("Не удалось удалить старую резервную копию %s: %s", path.name, e)
+        if removed:
+            logger.info("Удалено устаревших резервных копий: %s", removed)
+        return removed
+
+    @contextmanager
+    def _open_backup(self, backup_path: Path) -> Iterator[Path]:
+        """Подготовка копии к чтению: распаковка gzip во временный каталог"""
+        if backup_path.suffix != ".gz":
+            yield backup_path
+            return
+        with tempfile.TemporaryDirectory(dir=str(backup_path.parent)) as tmp_dir:
+            plain_path = Path(tmp_dir) / backup_path.stem
+            with gzip.open(backup_path, 'rb') as src, open(plain_path, 'wb') as dst:
+                shutil.copyfileobj(src, dst, 1024 * 1024)
+            yield plain_path
+
+    def verify_backup(self, backup_path: Path) -> Dict[str, Any]:
+        """
+        Проверка целостности резервной копии
+
+        Returns:
+            Dict[str, Any]: Результат проверки (ok, integrity, orders)
+        """
+        backup_path = Path(backup_path)
+        try:
+            with self._open_backup(backup_path) as plain_path:
+                conn = sqlite3.connect(f"file:{plain_path}?mode=ro", uri=True)
+                try:
+                    integrity = conn.execute("PRAGMA integrity_check").fetchone()[0]
+                    orders = conn.execute("SELECT COUNT(*) FROM orders").fetchone()[0]
+                finally:
+                    conn.close()
+            return {"ok": integrity == "ok", "integrity": integrity, "orders": orders}
+        except (sqlite3.DatabaseError, OSError, EOFError) as e:
+            return {"ok": False, "integrity": str(e), "orders": 0}
+
+    def restore_backup(self, backup_path: Path, force: bool = False) -> Path:
+        """
+        Восстановление базы из резервной копии
+
+        Восстановление поверх работающего бота перезаписывает базу под
+        открытыми соединениями, поэтому бот нужно остановить, а вызов
+        подтвердить флагом force (--force в командной строке). Перед
+        восстановлением копия проверяется, а текущая база сохраняется
+        отдельной резервной копией.
+
+        Returns:
+            Path: Путь к копии базы, сделанной перед восстановлением
+
+        Raises:
+            RuntimeError: Если восстановление не подтверждено флагом force
+            ValueError: Если резервная копия повреждена
+        """
+        if not force:
+            raise RuntimeError(
+                "Восстановление перезаписывает рабочую базу: остановите бота и повторите с --force"
+            )
+        backup_path = Path(backup_path)
+        result = self.verify_backup(backup_path)
+        if not result["ok"]:
+            raise ValueError(f"Резервная копия повреждена: {result['integrity']}")
+
+        # Без ротации, чтобы не удалить восстанавливаемую копию
+        safety_copy = self._create_backup_sync(rotate=False)
+
+        with self._open_backup(backup_path) as plain_path:
+            self._copy_database(plain_path, self.db_path)
+
+        logger.info("База восстановлена из %s, предыдущая версия: %s", backup_path.name, safety_copy.name)
+        return safety_copy
+
+    async def create_backup(self) -> Path:
+        """Асинхронное создание резервной копии без блокировки цикла событий"""
+        return await asyncio.get_event_loop().run_in_executor(None, self._create_backup_sync)
+
+    async def run(self) -> None:
+        """Периодическое резервное копирование по расписанию"""
+        if self.interval_hours <= 0:
+            logger.info("Резервное копирование по расписанию отключено")
+            return
+
+        while True:
+            try:
+                await asyncio.sleep(self.interval_hours * 3600)
+                await self.create_backup()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error("Ошибка при создании резервной копии: %s", e, exc_info=True)
+                await asyncio.sleep(60)  # При ошибке ждем минуту перед повторной попыткой
+
+    def start(self) -> None:
+        """Запуск фоновой задачи резервного копирования"""
+        if not self.backup_task:
+            self.backup_task = asyncio.create_task(self.run())
+
+    async def stop(self) -> None:
+        """Остановка фоновой задачи"""
+        if self.backup_task:
+            self.backup_task.cancel()
+            try:
+                await self.backup_task
+            except asyncio.CancelledError:
+                pass
+            self.backup_task = None
+
+
+def main() -> None:
+    """Командная строка: python -m services.backup_service <команда>"""
+    parser = argparse.ArgumentParser(description="Резервное копирование базы заявок")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("backup", help="Создать резервную копию")
+    commands.add_parser("list", help="Показать резервные копии")
+    verify = commands.add_parser("verify", help="Проверить резервную копию")
+    verify.add_argument("path", nargs="?", help="Путь к копии (по умолчанию последняя)")
+    restore = commands.add_parser("restore", help="Восстановить базу из копии")
+    restore.add_argument("path", help="Путь к копии")
+    restore.add_argument("--force", action="store_true", help="Подтверждение: бот остановлен")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    service = BackupService()
+
+    if args.command == "backup":
+        print(service._create_backup_sync())
+    elif args.command == "list":
+        for path in service.list_backups():
+            print(f"{path.name}\t{path.stat().st_size} байт")
+    elif args.command == "verify":
+        backups = service.list_backups()
+        path = Path(args.path) if args.path else (backups[0] if backups else None)
+        if not path:
+            raise SystemExit("Резервные копии не найдены")
+        result = service.verify_backup(path)
+        print(f"{path.name}: {result}")
+        raise SystemExit(0 if result["ok"] else 1)
+    elif args.command == "restore":
+        if not args.force:
+            raise SystemExit("Восстановление перезаписывает рабочую базу: остановите бота и повторите с --force")
+        print(f"Предыдущая версия сохранена в {service.restore_backup(Path(args.path), force=True)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,157 @@
+import hashlib
+import re
+import time
+from collections import OrderedDict, deque
+from typing import Any, Dict, List, Optional, Tuple
+
+class _FingerprintState:
+    """Состояние одного отпечатка ошибки"""
+
+    __slots__ = ("error_type", "sample", "sent", "suppressed", "total", "last_summary")
+
+    def __init__(self, error_type: str, sample: str, now: float):
+        self.error_type = error_type
+        self.sample = sample
+        self.sent = deque()          # Время отправленных уведомлений в пределах окна
+        self.suppressed = 0          # Подавлено с момента последнего уведомления
+        self.total = 0               # Всего повторов
+        self.last_summary = now
+
+class ErrorThrottle:
+    """
+    Подавление лавины одинаковых уведомлений об ошибках
+
+    Ошибки группируются по отпечатку (тип + нормализованный текст,
+    в котором числа, идентификаторы и адреса заменены на заглушки).
+    Для каждого отпечатка в скользящем окне пропускается не больше
+    limit уведомлений, остальные только подсчитываются и позже
+    отправляются одной сводкой "еще N повторов".
+    """
+
+    _NORMALIZE_PATTERNS = [
+        (re.compile(r'[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}'), '<uuid>'),
+        (re.compile(r'0x[0-9a-f]+'), '<hex>'),
+        (re.compile(r'\d+(\.\d+)?'), '<n>'),
+        (re.compile(r"'[^']*'"), "'<s>'"),
+        (re.compile(r'\s+'), ' ')
+    ]
+
+    def __init__(self, limit: int = 3, window: float = 300, max_fingerprints: int = 1000):
+        self.limit = max(1, limit)
+        self.window = window
+        self.max_fingerprints = max_fingerprints
+        self._states: "OrderedDict[str, _FingerprintState]" = OrderedDict()
+
+        # Общие счетчики для мониторинга
+        self.total = 0
+        self.allowed = 0
+        self.suppressed = 0
+
+    def __len__(self) -> int:
+        """Отпечатков ошибок в памяти"""
+        return len(self._states)
+
+    @classmethod
+    def normalize(cls, message: str) -> str:
+        """Нормализация текста ошибки для группировки"""
+        text = message.lower()
+        for pattern, replacement in cls._NORMALIZE_PATTERNS:
+            text = pattern.sub(replacement, text)
+        return text.strip()[:300]
+
+    @classmethod
+    def fingerprint(cls, error_type: str, message: str) -> str:
+        """Отпечаток ошибки по типу и нормализованному тексту"""
+        key = f"{error_type}|{cls.normalize(message)}"
+        return hashlib.sha1(key.encode('utf-8')).hexdigest()[:12]
+
+    def check(self, error_type: str, message: str,
+              now: Optional[float] = None) -> Tuple[bool, int]:
+        """
+        Проверка, можно ли отправить уведомление об ошибке
+
+        Args:
+            error_type: Тип ошибки
+            message: Текст ошибки
+            now: Текущее время (time.monotonic), для тестов
+
+        Returns:
+            Tuple[bool, int]:
+            - Можно ли отправлять уведомление
+            - Сколько повторов было подавлено с прошлого уведомления
+        """
+        now = time.monotonic() if now is None else now
+        key = self.fingerprint(error_type, message)
+        state = self._states.get(key)
+        if state is None:
+            state = _FingerprintState(error_type, message, now)
+            self._states[key] = state
+            if len(self._states) > self.max_fingerprints:
+                self._states.popitem(last=False)
+        else:
+            self._states.move_to_end(key)
+
+        self.total += 1
+        state.total += 1
+
+        # Сдвигаем скользящее окно
+        while state.sent and now - state.sent[0] > self.window:
+            state.sent.popleft()
+
+        if len(state.sent) < self.limit:
+            state.sent.append(now)
+            suppressed = state.suppressed
+            state.suppressed = 0
+            state.last_summary = now
+            self.allowed += 1
+            return True, suppressed
+
+        state.suppressed += 1
+        self.suppressed += 1
+        return False, 0
+
+    def pop_summaries(self, now: Optional[float] = None) -> List[Dict[str, Any]]:
+        """
+        Сводки по подавленным ошибкам, для которых прошло окно
+
+        Returns:
+            List[Dict[str, Any]]: Тип, пример текста и количество повторов
+        """
+        now = time.monotonic() if now is None else now
+        summaries = []
+        for key, state in self._states.items():
+            if state.suppressed and now - state.last_summary >= self.window:
+                summaries.append({
+                    "fingerprint": key,
+                    "error_type": state.error_type,
+                    "sample": state.sample,
+                    "count": state.suppressed,
+                    "period": now - state.last_summary
+                })
+                state.suppressed = 0
+                state.last_summary = now
+        return summaries
+
+    def get_stats(self, top: int = 10) -> Dict[str, Any]:
+        """
+        Счетчики для мониторинга
+
+        Returns:
+            Dict[str, Any]: Общие счетчики и самые частые отпечатки
+        """
+        frequent = sorted(self._states.items(), key=lambda item: item[1].total, reverse=True)[:top]
+        return {
+            "total": self.total,
+            "allowed": self.allowed,
+            "suppressed": self.suppressed,
+            "fingerprints": len(self),
+            "top": [
+                {
+                    "fingerprint": key,
+                    "error_type": state.error_type,
+                    "total": state.total,
+                    "pending": state.suppressed
+                }
+                for key, state in frequent
+            ]
+        }
@@ -0,0 +1,205 @@
+"""
+Защита бота от потока сообщений одного пользователя
+
+- FloodControl: ведро токенов на пользователя перед DialogHandler;
+  сообщения сверх лимита отбрасываются, после mute_after отброшенных
+  подряд пользователь на время замолкает для бота (одно уведомление).
+- MessageCoalescer: быстрые серии свободного текста на шагах описания
+  задачи склеиваются в одно сообщение и обрабатываются одним вызовом.
+"""
+
+import asyncio
+import logging
+import time
+from enum import Enum
+from typing import Awaitable, Callable, Dict, Hashable, List, Optional
+
+from utils.metrics import metrics
+from utils.rate_limit import KeyedRateLimiter
+
+logger = logging.getLogger(__name__)
+
+FLOOD_DECISIONS_TOTAL = metrics.counter(
+    "vkbot_flood_decisions_total", "Проверки частоты сообщений пользователей", ["decision"]
+)
+COALESCED_MESSAGES_TOTAL = metrics.counter(
+    "vkbot_coalesced_messages_total", "Сообщения, склеенные с предыдущими"
+)
+
+class FloodDecision(Enum):
+    """Решение по входящему сообщению"""
+    ALLOW = "allow"     # Обрабатывать
+    DROP = "drop"       # Превышен лимит, отбросить
+    MUTE = "mute"       # Пользователь только что заглушен: отбросить и уведомить
+    MUTED = "muted"     # Пользователь заглушен: отбросить молча
+
+_DECISION_COUNTERS = {decision: FLOOD_DECISIONS_TOTAL.labels(decision.value) for decision in FloodDecision}
+
+class FloodControl:
+    """
+    Ограничение частоты сообщений на пользователя
+
+    Пример:
+    ```python
+    flood = FloodControl(rate=1, burst=8, mute_after=10, mute_seconds=300)
+    decision = flood.check(user_id)
+    if decision is FloodDecision.MUTE:
+        await send_notice(user_id)
+    if decision is not FloodDecision.ALLOW:
+        return
+    ```
+    """
+
+    def __init__(self, rate: float, burst: float, mute_after: int, mute_seconds: float,
+                 max_users: int = 10000):
+        """
+        Args:
+            rate: Сообщений в секунду на пользователя
+            burst: Допустимая серия сообщений
+            mute_after: Отброшенных подряд сообщений до заглушения (0 - не глушить)
+            mute_seconds: Длительность заглушения, сек
+            max_users: Пользователей с отдельным ведром (давно молчавшие вытесняются)
+        """
+        self.limiter = KeyedRateLimiter(rate, burst, max_users)
+        self.mute_after = mute_after
+        self.mute_seconds = mute_seconds
+        # Только нарушители: отброшенные подряд и время окончания заглушения
+        self._strikes: Dict[Hashable, int] = {}
+        self._muted_until: Dict[Hashable, float] = {}
+
+    def check(self, user_id: Hashable, now: Optional[float] = None) -> FloodDecision:
+        now = time.monotonic() if now is None else now
+        decision = self._decide(user_id, now)
+        _DECISION_COUNTERS[decision].inc()
+        return decision
+
+    def _decide(self, user_id: Hashable, now: float) -> FloodDecision:
+        muted_until = self._muted_until.get(user_id)
+        if muted_until is not None:
+            if now < muted_until:
+                return FloodDecision.MUTED
+            del self._muted_until[user_id]
+
+        allowed, _ = self.limiter.allow(user_id, now=now)
+        if allowed:
+            self._strikes.pop(user_id, None)
+            return FloodDecision.ALLOW
+
+        strikes = self._strikes.get(user_id, 0) + 1
+        if self.mute_after and strikes >= self.mute_after:
+            self._strikes.pop(user_id, None)
+            self._muted_until[user_id] = now + self.mute_seconds
+            logger.warning("Пользователь %s заглушен на %.0f с за поток сообщений", user_id, self.mute_seconds)
+            return FloodDecision.MUTE
+        self._strikes[user_id] = strikes
+        return FloodDecision.DROP
+
+    def is_muted(self, user_id: Hashable, now: Optional[float] = None) -> bool:
+        now = time.monotonic() if now is None else now
+        return self._muted_until.get(user_id, 0) > now
+
+    def get_stats(self) -> Dict[str, int]:
+        return {
+            "tracked": len(self.limiter),
+            "muted": len(self._muted_until),
+            "allowed": self.limiter.allowed,
+            "limited": self.limiter.limited
+        }
+
+class _Pending:
+    __slots__ = ("parts", "started", "timer", "args")
+
+    def __init__(self, started: float, args: tuple):
+        self.parts: List[str] = []
+        self.started = started
+        self.timer: Optional[asyncio.TimerHandle] = None
+        self.args = args
+
+class MessageCoalescer:
+    """
+    Склейка серий сообщений пользователя
+
+    Сообщение откладывается на window секунд; каждое следующее сообщение
+    в этом окне добавляется к нему и продлевает ожидание, но не дольше
+    max_wait от первого. Затем handler вызывается один раз с текстом
+    частей через перевод строки и аргументами первого сообщения.
+    """
+
+    def __init__(self, handler: Callable[..., Awaitable[None]], window: float, max_wait: float):
+        """
+        Args:
+            handler: Корутина handler(user_id, text, *args)
+            window: Пауза, после которой серия считается законченной, сек
+            max_wait: Максимальная задержка первого сообщения серии, сек
+        """
+        self.handler = handler
+        self.window = window
+        self.max_wait = max_wait
+        self._pending: Dict[Hashable, _Pending] = {}
+        # Серии, которые сейчас обрабатываются (по одной на пользователя)
+        self._inflight: Dict[Hashable, asyncio.Task] = {}
+
+    def __contains__(self, user_id: Hashable) -> bool:
+        return user_id in self._pending or user_id in self._inflight
+
+    def add(self, user_id: Hashable, text: str, *args) -> None:
+        """Добавить сообщение к серии пользователя (или начать серию)"""
+        loop = asyncio.get_running_loop()
+        now = loop.time()
+        pending = self._pending.get(user_id)
+        if pending is None:
+            pending = self._pending[user_id] = _Pending(now, args)
+        else:
+            COALESCED_MESSAGES_TOTAL.inc()
+            pending.timer.cancel()
+        pending.parts.append(text)
+        delay = min(self.window, pending.started + self.max_wait - now)
+        pending.timer = loop.call_later(max(delay, 0), self._fire, user_id)
+
+    def _fire(self, user_id: Hashable) -> None:
+        pending = self._pending.pop(user_id, None)
+        if pending is None:
+            return
+        self._start(user_id, pending)
+
+    def _start(self, user_id: Hashable, pending: _Pending) -> asyncio.Task:
+        # Предыдущая серия пользователя еще может обрабатываться - новая ждет ее
+        task = asyncio.ensure_future(self._run(user_id, pending, self._inflight.get(user_id)))
+        self._inflight[user_id] = task
+        task.add_done_callback(lambda done: self._forget(user_id, done))
+        return task
+
+    def _forget(self, user_id: Hashable, task: asyncio.Task) -> None:
+        if self._inflight.get(user_id) is task:
+            del self._inflight[user_id]
+
+    async def _run(self, user_id: Hashable, pending: _Pending, previous: Optional[asyncio.Task]) -> None:
+        if previous is not None:
+            await asyncio.gather(previous, return_exceptions=True)
+        await self.handler(user_id, "\n".join(pending.parts), *pending.args)
+
+    async def flush(self, user_id: Hashable) -> None:
+        """
+        Обработать серию пользователя сразу и дождаться обработки
+
+        Вызывается перед любым другим сообщением пользователя (кнопка,
+        команда), чтобы сообщения обрабатывались по порядку. Накопленная
+        серия снимается с таймера до ожидания, поэтому не может сработать
+        повторно, и обрабатывается после уже выполняющейся серии.
+        """
+        pending = self._pending.pop(user_id, None)
+        if pending is not None:
+            pending.timer.cancel()
+            task = self._start(user_id, pending)
+        else:
+            task = self._inflight.get(user_id)
+        if task is not None:
+            await asyncio.gather(task, return_exceptions=True)
+
+    async def close(self) -> None:
+        """Обработать все накопленные серии"""
+        for user_id in list(self._pending):
+            self._pending[user_id].timer.cancel()
+            self._fire(user_id)
+        if self._inflight:
+            await asyncio.gather(*self._inflight.values(), return_exceptions=True)
@@ -0,0 +1,138 @@
+import asyncio
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from config.config import READINESS_CONFIG
+from services.storage_service import StorageService
+from services.telegram_service import TelegramService
+
+logger = logging.getLogger(__name__)
+
+class HealthService:
+    """
+    Проверка готовности приложения принимать трафик (/readyz)
+
+    Все проверки выполняются одновременно, у каждой свой короткий таймаут.
+    Результат кэшируется на cache_ttl секунд, а одновременные запросы
+    во время проверки ждут один общий результат, поэтому частые пробы
+    оркестратора почти ничего не стоят.
+
+    Проверки:
+    - database: база доступна на запись
+    - longpoll: VK бот инициализирован и недавно успешно опрашивал LongPoll
+      (в веб-воркере - по данным WorkerBoard, бот работает в другом процессе)
+    - outbox: очередь неотправленных уведомлений не превышает порог
+    - notifications: хотя бы у одного приемника уведомлений замкнута цепь
+      (только в основном процессе: веб-воркеры уведомления не доставляют)
+    """
+
+    def __init__(self, storage: StorageService, telegram: TelegramService,
+                 vk_service_getter: Callable[[], Any],
+                 config: Optional[Dict[str, Any]] = None, board=None):
+        config = config or READINESS_CONFIG
+        self.storage = storage
+        self.telegram = telegram
+        self.vk_service_getter = vk_service_getter
+        self.board = board
+        self.check_timeout = config['check_timeout']
+        self.cache_ttl = config['cache_ttl']
+        self.longpoll_max_age = config['longpoll_max_age']
+        self.outbox_max_backlog = config['outbox_max_backlog']
+
+        self._cached: Optional[Tuple[float, Dict[str, Any]]] = None
+        self._in_flight: Optional[asyncio.Future] = None
+
+    async def check_database(self) -> str:
+        await self.storage.check_writable()
+        return "доступна на запись"
+
+    def _longpoll_age(self) -> Optional[float]:
+        vk_service = self.vk_service_getter()
+        if vk_service is None and self.board is not None:
+            return self.board.longpoll_age()
+        if vk_service is None:
+            raise RuntimeError("VK бот еще инициализируется")
+        if vk_service.last_poll_at is None:
+            return None
+        return time.monotonic() - vk_service.last_poll_at
+
+    async def check_longpoll(self) -> str:
+        age = self._longpoll_age()
+        if age is None:
+            raise RuntimeError("LongPoll еще не опрашивался")
+        if age > self.longpoll_max_age:
+            raise RuntimeError(f"последний успешный опрос {age:.0f} с назад")
+        return f"последний опрос {age:.1f} с назад"
+
+    async def check_outbox(self) -> str:
+        pending = await self.storage.count_outbox('pending')
+        if pending > self.outbox_max_backlog:
+            raise RuntimeError(f"в очереди {pending} уведомлений (порог {self.outbox_max_backlog})")
+        return f"в очереди {pending}"
+
+    async def check_notifications(self) -> str:
+        sinks = self.telegram.router.sinks
+        states = {name: sink.circuit_state for name, sink in sinks.items()}
+        if sinks and all(state == "open" for state in states.values()):
+            raise RuntimeError(f"все приемники отключены: {states}")
+        return ", ".join(f"{name}: {state}" for name, state in states.items()) or "приемники не настроены"
+
+    async def _run_check(self, check: Callable[[], Awaitable[str]]) -> Dict[str, Any]:
+        started = time.perf_counter()
+        try:
+            detail = await asyncio.wait_for(check(), timeout=self.check_timeout)
+            ok = True
+        except asyncio.TimeoutError:
+            detail, ok = f"превышен таймаут {self.check_timeout} с", False
+        except Exception as e:
+            detail, ok = str(e) or type(e).__name__, False
+        return {
+            "ok": ok,
+            "detail": detail,
+            "latency_ms": round((time.perf_counter() - started) * 1000, 1)
+        }
+
+    async def _check_all(self) -> Dict[str, Any]:
+        checks = {
+            "database": self.check_database,
+            "longpoll": self.check_longpoll,
+            "outbox": self.check_outbox
+        }
+        # Приемники используются только основным процессом (доставка outbox),
+        # в веб-воркере их состояние ничего не говорит
+        if self.board is None:
+            checks["notifications"] = self.check_notifications
+        results = await asyncio.gather(*(self._run_check(check) for check in checks.values()))
+        report = dict(zip(checks, results))
+        failed = [name for name, result in report.items() if not result["ok"]]
+        if failed:
+            logger.warning("Приложение не готово: %s", ", ".join(failed))
+        return {"ready": not failed, "checks": report}
+
+    async def check(self) -> Dict[str, Any]:
+        """
+        Результат проверки готовности
+
+        Returns:
+            Dict[str, Any]: {"ready": bool, "checks": {имя: {"ok", "detail", "latency_ms"}}}
+        """
+        now = time.monotonic()
+        if self._cached and now - self._cached[0] < self.cache_ttl:
+            return self._cached[1]
+
+        # Проверка уже выполняется - ждем ее результат
+        if self._in_flight:
+            return await asyncio.shield(self._in_flight)
+
+        future = asyncio.get_running_loop().create_future()
+        self._in_flight = future
+        try:
+            report = await self._check_all()
+            self._cached = (time.monotonic(), report)
+            future.set_result(report)
+            return report
+        finally:
+            if not future.done():
+                future.cancel()
+            self._in_flight = None
@@ -0,0 +1,272 @@
+import asyncio
+import json
+import logging
+import sqlite3
+import uuid
+import aiosqlite
+from contextlib import closing
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from config.config import IDEMPOTENCY_CONFIG, INGEST_CONFIG, INGEST_QUEUE_PATH
+from services.storage_service import StorageService
+
+logger = logging.getLogger(__name__)
+
+class IngestQueueService:
+    """
+    Очередь приема заявок с сайта
+
+    В асинхронном режиме /submit только проверяет данные, записывает
+    заявку в отдельную базу очереди (короткая транзакция без блокировки
+    основной базы) и сразу отвечает 202 с токеном. Фоновый обработчик
+    забирает заявки пачками и сохраняет их в orders одной транзакцией
+    через StorageService.create_orders_batch; уведомления отправляются
+    через outbox как обычно.
+
+    Токен заявки используется как ключ идемпотентности в основной базе,
+    поэтому повторная обработка после сбоя не создает дубликатов.
+
+    Если пачка не сохраняется, она делится пополам до отдельных заявок:
+    корректные сохраняются, а попытка засчитывается только заявкам,
+    которые не удалось сохранить.
+
+    Статусы: queued - ожидает обработки, done - заявка создана,
+    failed - не удалось сохранить после max_attempts попыток.
+    """
+
+    def __init__(self, storage: StorageService, db_path: Optional[Path] = None,
+                 config: Optional[Dict[str, Any]] = None):
+        config = config or INGEST_CONFIG
+        self.storage = storage
+        self.db_path = Path(db_path or INGEST_QUEUE_PATH)
+        self.batch_size = config['batch_size']
+        self.poll_interval = config['poll_interval']
+        self.max_attempts = config['max_attempts']
+        self.retention_hours = config['retention_hours']
+
+        # Сигнал обработчику о новых заявках в очереди
+        self.queue_event = asyncio.Event()
+        self.consumer_task = None
+        self._ensure_db_exists()
+
+    def _ensure_db_exists(self) -> None:
+        """Создание базы очереди"""
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        # Контекст соединения sqlite3 только фиксирует транзакцию, закрывает его closing
+        with closing(sqlite3.connect(self.db_path)) as db, db:
+            db.execute("PRAGMA journal_mode = WAL")
+            db.execute('''
+                CREATE TABLE IF NOT EXISTS ingest_queue (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    token TEXT NOT NULL UNIQUE,
+                    idempotency_key TEXT UNIQUE,
+                    payload TEXT NOT NULL,
+                    status TEXT NOT NULL DEFAULT 'queued',
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    order_id INTEGER,
+                    last_error TEXT,
+                    created_at TIMESTAMP NOT NULL,
+                    processed_at TIMESTAMP
+                )
+            ''')
+            db.execute('CREATE INDEX IF NOT EXISTS idx_ingest_status ON ingest_queue(status, id)')
+
+    async def _connect(self) -> aiosqlite.Connection:
+        """Подключение к базе очереди (WAL: запись не блокирует чтение статусов)"""
+        return await aiosqlite.connect(self.db_path)
+
+    async def enqueue(self, order: Dict[str, Any], idempotency_key: Optional[str] = None) -> str:
+        """
+        Добавление заявки в очередь
+
+        Args:
+            order: Проверенные данные заявки (user_id, name, phone, task)
+            idempotency_key: Ключ идемпотентности клиента
+
+        Returns:
+            str: Токен для проверки статуса (для повторного ключа - токен первой заявки)
+        """
+        token = uuid.uuid4().hex
+        db = await self._connect()
+        try:
+            cursor = await db.execute('''
+                INSERT INTO ingest_queue (token, idempotency_key, payload, created_at)
+                VALUES (?, ?, ?, ?)
+                ON CONFLICT(idempotency_key) DO NOTHING
+            ''', (token, idempotency_key, json.dumps(order, ensure_ascii=False), datetime.now().isoformat()))
+            inserted = cursor.rowcount
+            await db.commit()
+
+            if not inserted:
+                cursor = await db.execute(
+                    'SELECT token FROM ingest_queue WHERE idempotency_key = ?', (idempotency_key,)
+                )
+                token = (await cursor.fetchone())[0]
+        finally:
+            await db.close()
+
+        if inserted:
+            self.queue_event.set()
+        return token
+
+    async def get_status(self, token: str) -> Optional[Dict[str, Any]]:
+        """Статус заявки по токену или None, если токен неизвестен"""
+        db = await self._connect()
+        try:
+            db.row_factory = aiosqlite.Row
+            cursor = await db.execute('''
+                SELECT token, status, order_id, last_error, created_at, processed_at
+                FROM ingest_queue WHERE token = ?
+            ''', (token,))
+            row = await cursor.fetchone()
+        finally:
+            await db.close()
+
+        if not row:
+            return None
+        return {
+            "token": row['token'],
+            "status": row['status'],
+            "order_id": row['order_id'],
+            "error": row['last_error'] if row['status'] == 'failed' else None,
+            "created_at": row['created_at'],
+            "processed_at": row['processed_at']
+        }
+
+    async def count(self, status: str = 'queued') -> int:
+        """Количество заявок в указанном статусе"""
+        db = await self._connect()
+        try:
+            cursor = await db.execute('SELECT COUNT(*) FROM ingest_queue WHERE status = ?', (status,))
+            return (await cursor.fetchone())[0]
+        finally:
+            await db.close()
+
+    async def _save(self, entries: List[Tuple]) -> Tuple[List[Tuple[int, int]], List[Tuple[Tuple, str]]]:
+        """
+        Сохранение заявок одной транзакцией, при ошибке - по половинам
+
+        Returns:
+            Tuple: Сохраненные (ID записи очереди, ID заявки) и несохраненные (запись, ошибка)
+        """
+        try:
+            orders = [
+                {**json.loads(payload), "idempotency_key": f"ingest:{token}"}
+                for _, token, payload, _ in entries
+            ]
+            batch = await self.storage.create_orders_batch(orders, idempotency_ttl=IDEMPOTENCY_CONFIG['ttl'])
+            return [(entry[0], order_id) for entry, order_id in zip(entries, batch.order_ids)], []
+        except Exception as e:
+            if len(entries) == 1:
+                logger.error("Ошибка сохранения заявки %s из очереди: %s", entries[0][1], e, exc_info=True)
+                return [], [(entries[0], str(e) or type(e).__name__)]
+            logger.warning("Пачка из %s заявок не сохранена, сохраняем по частям: %s", len(entries), e)
+
+        middle = len(entries) // 2
+        saved, failed = await self._save(entries[:middle])
+        more_saved, more_failed = await self._save(entries[middle:])
+        return saved + more_saved, failed + more_failed
+
+    async def process_once(self) -> int:
+        """
+        Обработка одной пачки заявок из очереди
+
+        Returns:
+            int: Количество сохраненных заявок
+        """
+        db = await self._connect()
+        try:
+            cursor = await db.execute('''
+                SELECT id, token, payload, attempts FROM ingest_queue
+                WHERE status = 'queued' ORDER BY id LIMIT ?
+            ''', (self.batch_size,))
+            entries = await cursor.fetchall()
+            if not entries:
+                return 0
+
+            saved, failed = await self._save(entries)
+            now = datetime.now().isoformat()
+            await db.executemany('''
+                UPDATE ingest_queue SET status = 'done', order_id = ?, processed_at = ?, last_error = NULL
+                WHERE id = ?
+            ''', [(order_id, now, entry_id) for entry_id, order_id in saved])
+            # Попытка засчитывается только заявкам, которые не удалось сохранить
+            await db.executemany('''
+                UPDATE ingest_queue
+                SET attempts = ?, last_error = ?,
+                    status = CASE WHEN ? >= ? THEN 'failed' ELSE status END,
+                    processed_at = CASE WHEN ? >= ? THEN ? ELSE processed_at END
+                WHERE id = ?
+            ''', [
+                (attempts + 1, error, attempts + 1, self.max_attempts,
+                 attempts + 1, self.max_attempts, now, entry_id)
+                for (entry_id, _, _, attempts), error in failed
+            ])
+            await db.commit()
+            return len(saved)
+        finally:
+            await db.close()
+
+    async def cleanup(self, hours: Optional[int] = None) -> int:
+        """Удаление обработанных заявок старше указанного срока"""
+        hours = self.retention_hours if hours is None else hours
+        db = await self._connect()
+        try:
+            cutoff = (datetime.now() - timedelta(hours=hours)).isoformat()
+            cursor = await db.execute('''
+                DELETE FROM ingest_queue WHERE status != 'queued' AND processed_at < ?
+            ''', (cutoff,))
+            deleted = cursor.rowcount
+            await db.commit()
+            return deleted
+        finally:
+            await db.close()
+
+    async def run(self) -> None:
+        """Основной цикл обработчика очереди"""
+        logger.info("Запуск обработчика очереди заявок")
+        next_cleanup = 0.0
+        loop = asyncio.get_running_loop()
+
+        while True:
+            try:
+                self.queue_event.clear()
+                processed = await self.process_once()
+
+                # Полная пачка - вероятно, в очереди есть еще заявки
+                if processed >= self.batch_size:
+                    continue
+
+                if loop.time() >= next_cleanup:
+                    next_cleanup = loop.time() + 3600
+                    deleted = await self.cleanup()
+                    if deleted:
+                        logger.info("Удалено обработанных заявок из очереди: %s", deleted)
+
+                try:
+                    await asyncio.wait_for(self.queue_event.wait(), timeout=self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error("Ошибка обработчика очереди заявок: %s", e, exc_info=True)
+                await asyncio.sleep(self.poll_interval)
+
+    def start(self) -> None:
+        """Запуск фонового обработчика"""
+        if not self.consumer_task:
+            self.consumer_task = asyncio.create_task(self.run())
+
+    async def stop(self) -> None:
+        """Остановка фонового обработчика"""
+        if self.consumer_task:
+            self.consumer_task.cancel()
+            try:
+                await self.consumer_task
+            except asyncio.CancelledError:
+                pass
+            self.consumer_task = None
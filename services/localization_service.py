@@ -1,82 +1,221 @@
+import asyncio
 import json
+import logging
 import os
-from typing import Dict, Optional
+import time
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Tuple
+
+from dialogs.templates import flatten_section
+from utils.metrics import LOCALE_RELOAD_SECONDS, ERRORS_TOTAL
+
+logger = logging.getLogger(__name__)
+
+class _Snapshot(NamedTuple):
+    """Загруженные локализации; заменяется целиком при перезагрузке"""
+    trees: Dict[str, Dict]                  # Исходные деревья по языкам
+    texts: Dict[Tuple[str, str], str]       # (язык, ключ) -> текст, с учетом запасного языка
+    signature: Tuple[Tuple[str, int, int], ...]  # (файл, mtime_ns, размер) для отслеживания изменений
 
 class LocalizationService:
-    """Сервис для работы с локализацией"""
-    
-    def __init__(self, locales_dir: str = "locales"):
+    """
+    Сервис для работы с локализацией
+
+    Деревья locales/*.json при загрузке разворачиваются в один словарь
+    (язык, ключ) -> текст. Ключи языка по умолчанию заранее добавлены к
+    остальным языкам, поэтому цепочка "язык пользователя -> ru -> ключ"
+    сводится к одному поиску в словаре. Директория отслеживается по mtime
+    файлов (watch), новая версия загружается целиком и подменяет старую
+    одним присваиванием - читатели видят либо старые, либо новые тексты.
+    """
+
+    def __init__(self, locales_dir: str = "locales", reload_interval: float = 0):
         """
         Инициализация сервиса локализации
-        
+
         Args:
             locales_dir (str): Путь к директории с файлами локализации
+            reload_interval (float): Период проверки изменений файлов, сек (0 - без отслеживания)
         """
         self.locales_dir = locales_dir
-        self.locales: Dict[str, Dict] = {}
         self.default_locale = "ru"
-        self._load_locales()
-    
-    def _load_locales(self) -> None:
-        """Загрузка всех доступных локализаций"""
-        for file in os.listdir(self.locales_dir):
-            if file.endswith(".json"):
-                locale = file.split(".")[0]
-                with open(os.path.join(self.locales_dir, file), 'r', encoding='utf-8') as f:
-                    self.locales[locale] = json.load(f)
-    
+        self.reload_interval = reload_interval
+        self.watch_task = None
+        self.last_reload: Dict[str, Any] = {}
+        self._listeners: List[Callable[["LocalizationService"], None]] = []
+        self._failed_signature: Optional[Tuple[Tuple[str, int, int], ...]] = None
+        self._snapshot = self._load_locales(self._signature())
+
+    @property
+    def locales(self) -> Dict[str, Dict]:
+        """Исходные деревья локализаций по языкам"""
+        return self._snapshot.trees
+
+    def _signature(self) -> Tuple[Tuple[str, int, int], ...]:
+        """Отпечаток директории: имена, mtime и размеры файлов *.json"""
+        entries = []
+        with os.scandir(self.locales_dir) as files:
+            for entry in files:
+                if entry.name.endswith(".json") and entry.is_file():
+                    stat = entry.stat()
+                    entries.append((entry.name, stat.st_mtime_ns, stat.st_size))
+        return tuple(sorted(entries))
+
+    def _load_locales(self, signature: Tuple[Tuple[str, int, int], ...]) -> _Snapshot:
+        """
+        Загрузка всех доступных локализаций
+
+        Raises:
+            ValueError, OSError: Если файл не читается или содержит некорректный JSON
+        """
+        started = time.perf_counter()
+        trees: Dict[str, Dict] = {}
+        for name, _, _ in signature:
+            locale = name.split(".")[0]
+            with open(os.path.join(self.locales_dir, name), 'r', encoding='utf-8') as f:
+                trees[locale] = json.load(f)
+
+        flat = {locale: flatten_section(tree) for locale, tree in trees.items()}
+        fallback = flat.get(self.default_locale, {})
+        texts: Dict[Tuple[str, str], str] = {}
+        for locale, locale_texts in flat.items():
+            for key, text in fallback.items():
+                texts[(locale, key)] = text
+            for key, text in locale_texts.items():
+                texts[(locale, key)] = text
+
+        duration = time.perf_counter() - started
+        LOCALE_RELOAD_SECONDS.observe(duration)
+        self.last_reload = {
+            "at": time.time(),
+            "duration": duration,
+            "locales": sorted(trees),
+            "keys": len(texts)
+        }
+        logger.info(
+            "Локализации загружены за %.1f мс: %s (%s ключей)",
+            duration * 1000, ", ".join(sorted(trees)), len(texts)
+        )
+        return _Snapshot(trees, texts, signature)
+
     def get_text(self, key: str, locale: str = None, **kwargs) -> str:
         """
         Получение локализованного текста по ключу
-        
+
         Args:
             key (str): Ключ текста (например, "common.welcome")
             locale (str, optional): Код языка. По умолчанию используется русский
             **kwargs: Параметры для форматирования строки
-        
+
         Returns:
             str: Локализованный текст
         """
-        locale = locale or self.default_locale
-        if locale not in self.locales:
-            locale = self.default_locale
-            
-        # Разбиваем ключ на части (например, "common.welcome" -> ["common", "welcome"])
-        parts = key.split(".")
-        
-        # Ищем текст в словаре локализации
-        current = self.locales[locale]
-        for part in parts:
-            if isinstance(current, dict) and part in current:
-                current = current[part]
-            else:
-                # Если ключ не найден, возвращаем ключ
+        texts = self._snapshot.texts
+        text = texts.get((locale or self.default_locale, key))
+        if text is None:
+            # Неизвестный язык - русский текст, неизвестный ключ - сам ключ
+            text = texts.get((self.default_locale, key))
+            if text is None:
                 return key
-        
+
         # Форматируем строку с переданными параметрами
-        if isinstance(current, str):
+        if kwargs:
             try:
-                return current.format(**kwargs)
+                return text.format(**kwargs)
             except KeyError:
-                return current
-        
-        return key
-    
+                return text
+        return text
+
+    def add_listener(self, callback: Callable[["LocalizationService"], None]) -> None:
+        """Функция, вызываемая после каждой успешной перезагрузки"""
+        self._listeners.append(callback)
+
+    def _read_changes(self) -> Optional[_Snapshot]:
+        """Новый снимок, если файлы изменились, иначе None"""
+        signature = self._signature()
+        if signature == self._snapshot.signature or signature == self._failed_signature:
+            return None
+        try:
+            return self._load_locales(signature)
+        except (OSError, ValueError):
+            # Ошибка сообщается один раз до следующего изменения файлов
+            self._failed_signature = signature
+            raise
+
+    def _swap(self, snapshot: _Snapshot) -> None:
+        """Подмена снимка и уведомление подписчиков"""
+        self._snapshot = snapshot
+        for callback in self._listeners:
+            try:
+                callback(self)
+            except Exception as e:
+                logger.error("Ошибка обработчика перезагрузки локализаций: %s", e, exc_info=True)
+
+    def reload_if_changed(self) -> bool:
+        """
+        Перезагрузка, если файлы локализации изменились
+
+        При ошибке чтения остаются прежние тексты.
+
+        Returns:
+            bool: Тексты перезагружены
+        """
+        try:
+            snapshot = self._read_changes()
+        except (OSError, ValueError) as e:
+            ERRORS_TOTAL.labels("localization").inc()
+            logger.error("Ошибка перезагрузки локализаций, используются прежние тексты: %s", e)
+            return False
+        if snapshot is None:
+            return False
+        self._swap(snapshot)
+        return True
+
+    async def watch(self) -> None:
+        """Периодическая проверка изменений файлов локализации"""
+        loop = asyncio.get_running_loop()
+        while True:
+            await asyncio.sleep(self.reload_interval)
+            # Чтение файлов - в пуле потоков, подмена снимка - в цикле событий
+            try:
+                snapshot = await loop.run_in_executor(None, self._read_changes)
+            except (OSError, ValueError) as e:
+                ERRORS_TOTAL.labels("localization").inc()
+                logger.error("Ошибка перезагрузки локализаций, используются прежние тексты: %s", e)
+                continue
+            if snapshot is not None:
+                self._swap(snapshot)
+
+    def start(self) -> None:
+        """Запуск отслеживания изменений (если задан reload_interval)"""
+        if self.reload_interval > 0 and not self.watch_task:
+            self.watch_task = asyncio.create_task(self.watch())
+
+    async def stop(self) -> None:
+        """Остановка отслеживания"""
+        if self.watch_task:
+            self.watch_task.cancel()
+            try:
+                await self.watch_task
+            except asyncio.CancelledError:
+                pass
+            self.watch_task = None
+
     def get_available_locales(self) -> list:
         """
         Получение списка доступных языков
-        
+
         Returns:
             list: Список кодов доступных языков
         """
-        return list(self.locales.keys())
-    
+        return list(self._snapshot.trees.keys())
+
     def set_default_locale(self, locale: str) -> None:
         """
         Установка языка по умолчанию
-        
+
         Args:
             locale (str): Код языка
         """
-        if locale in self.locales:
-            self.default_locale = locale 
\ No newline at end of file
+        if locale in self._snapshot.trees:
+            self.default_locale = locale
+            self._snapshot = self._load_locales(self._snapshot.signature)
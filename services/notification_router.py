@@ -0,0 +1,293 @@
+import aiohttp
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Any, Collection, Dict, Iterable, List, Optional
+
+from utils.deadline import DeadlineExceeded, within
+from utils.metrics import NOTIFY_SECONDS, ERRORS_TOTAL
+
+logger = logging.getLogger(__name__)
+
+class NotificationSink:
+    """
+    Базовый приемник уведомлений
+
+    У каждого приемника свой таймаут и свой лимит одновременных
+    запросов, поэтому медленный приемник не задерживает остальные.
+
+    После failure_threshold ошибок подряд цепь размыкается: в течение
+    reset_timeout секунд отправки завершаются отказом сразу, без запроса.
+    Затем пропускается одна пробная отправка (half_open), и при успехе
+    цепь снова замыкается.
+
+    Необязательный приемник (required=False) получает уведомление по
+    возможности: событие считается доставленным и без него.
+    """
+
+    def __init__(self, name: str, timeout: float = 10.0, concurrency: int = 4,
+                 failure_threshold: int = 5, reset_timeout: float = 30.0, required: bool = True):
+        self.name = name
+        self.timeout = timeout
+        self.required = required
+        self._semaphore = asyncio.Semaphore(max(1, concurrency))
+
+        # Состояние предохранителя
+        self.failure_threshold = max(1, failure_threshold)
+        self.reset_timeout = reset_timeout
+        self.consecutive_failures = 0
+        self._opened_at: Optional[float] = None
+        self._probe_in_flight = False
+
+        # Метрики приемника
+        self.requests_total = 0
+        self.requests_failed = 0
+        self._latencies = deque(maxlen=500)
+        self._histogram = NOTIFY_SECONDS.labels(name)
+
+    async def send(self, session: aiohttp.ClientSession, event_type: str,
+                   message: str, payload: Optional[Dict[str, Any]]) -> bool:
+        """Отправка уведомления, реализуется в наследниках"""
+        raise NotImplementedError
+
+    @property
+    def circuit_state(self) -> str:
+        """Состояние предохранителя: closed, open или half_open"""
+        if self._opened_at is None:
+            return "closed"
+        if time.monotonic() - self._opened_at >= self.reset_timeout:
+            return "half_open"
+        return "open"
+
+    def _record_result(self, ok: bool) -> None:
+        if ok:
+            if self._opened_at is not None:
+                logger.info("Приемник уведомлений %s снова доступен", self.name)
+            self.consecutive_failures = 0
+            self._opened_at = None
+            return
+
+        self.consecutive_failures += 1
+        if self._opened_at is not None or self.consecutive_failures >= self.failure_threshold:
+            if self._opened_at is None:
+                logger.warning(
+                    "Приемник уведомлений %s отключен на %s с после %s ошибок подряд",
+                    self.name, self.reset_timeout, self.consecutive_failures
+                )
+            self._opened_at = time.monotonic()
+
+    async def deliver(self, session: aiohttp.ClientSession, event_type: str,
+                      message: str, payload: Optional[Dict[str, Any]] = None) -> bool:
+        """Отправка с ограничением параллельности, таймаутом и учетом метрик"""
+        state = self.circuit_state
+        if state == "open" or (state == "half_open" and self._probe_in_flight):
+            self.requests_failed += 1
+            return False
+
+        self._probe_in_flight = state == "half_open"
+        try:
+            return await self._deliver(session, event_type, message, payload)
+        finally:
+            self._probe_in_flight = False
+
+    async def _deliver(self, session: aiohttp.ClientSession, event_type: str,
+                       message: str, payload: Optional[Dict[str, Any]]) -> bool:
+        async with self._semaphore:
+            self.requests_total += 1
+            started = time.perf_counter()
+            try:
+                # Не дольше таймаута приемника и остатка срока сообщения (если задан)
+                ok = await within(self.send(session, event_type, message, payload), timeout=self.timeout)
+            except DeadlineExceeded:
+                # Истек срок вызывающего, а не приемника: на автомат отключения не влияет
+                raise
+            except asyncio.TimeoutError:
+                logger.error("Приемник уведомлений %s: превышен таймаут %s с", self.name, self.timeout)
+                ok = False
+            except Exception as e:
+                logger.error("Приемник уведомлений %s: %s", self.name, str(e) or type(e).__name__)
+                ok = False
+            finally:
+                elapsed = time.perf_counter() - started
+                self._latencies.append(elapsed * 1000)
+                self._histogram.observe(elapsed)
+
+            if not ok:
+                self.requests_failed += 1
+                ERRORS_TOTAL.labels(f"notify:{self.name}").inc()
+            self._record_result(ok)
+            return ok
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Количество запросов, ошибок и задержки в миллисекундах"""
+        latencies = sorted(self._latencies)
+
+        def percentile(p: float) -> float:
+            if not latencies:
+                return 0.0
+            return round(latencies[min(len(latencies) - 1, int(len(latencies) * p))], 1)
+
+        return {
+            "circuit": self.circuit_state,
+            "requests_total": self.requests_total,
+            "requests_failed": self.requests_failed,
+            "latency_ms_p50": percentile(0.5),
+            "latency_ms_p95": percentile(0.95),
+            "latency_ms_max": round(latencies[-1], 1) if latencies else 0.0
+        }
+
+class TelegramWebhookSink(NotificationSink):
+    """Webhook формы Telegram: принимает текст в поле message"""
+
+    def __init__(self, name: str, url: str, **kwargs):
+        super().__init__(name, **kwargs)
+        self.url = url
+
+    async def send(self, session, event_type, message, payload) -> bool:
+        async with session.post(
+            self.url,
+            json={
+                "name": "VK Bot",
+                "phone": "System",
+                "message": message
+            }
+        ) as response:
+            if response.status == 200:
+                return True
+            error_text = await response.text()
+            logger.error("Ошибка отправки в %s: %s", self.name, error_text)
+            return False
+
+class HttpJsonSink(NotificationSink):
+    """Произвольный HTTP-приемник (например, CRM): получает событие целиком в JSON"""
+
+    def __init__(self, name: str, url: str, headers: Optional[Dict[str, str]] = None, **kwargs):
+        super().__init__(name, **kwargs)
+        self.url = url
+        self.headers = headers or {}
+
+    async def send(self, session, event_type, message, payload) -> bool:
+        async with session.post(
+            self.url,
+            json={
+                "event": event_type,
+                "message": message,
+                "payload": payload or {}
+            },
+            headers=self.headers
+        ) as response:
+            if 200 <= response.status < 300:
+                return True
+            error_text = await response.text()
+            logger.error("Ошибка отправки в %s: %s %s", self.name, response.status, error_text[:200])
+            return False
+
+class NotificationRouter:
+    """
+    Маршрутизатор уведомлений
+
+    Для каждого типа события выбирает приемники по правилам маршрутизации
+    и отправляет уведомление во все приемники одновременно.
+    Правило "*" применяется ко всем типам событий.
+    """
+
+    SINK_TYPES = {
+        "telegram": TelegramWebhookSink,
+        "http": HttpJsonSink
+    }
+
+    def __init__(self, sinks: List[NotificationSink], routes: Dict[str, List[str]]):
+        self.sinks = {sink.name: sink for sink in sinks}
+        self.routes = routes
+        self._cache: Dict[str, List[NotificationSink]] = {}
+
+    @classmethod
+    def from_config(cls, config: List[Dict[str, Any]]) -> 'NotificationRouter':
+        """
+        Создание маршрутизатора из конфигурации
+
+        Args:
+            config: Список описаний приемников вида
+                {"name": "ops", "type": "telegram", "url": "...",
+                 "events": ["order_created"], "timeout": 5, "concurrency": 2,
+                 "failure_threshold": 5, "reset_timeout": 30, "required": true}
+        """
+        sinks = []
+        routes: Dict[str, List[str]] = {}
+        for item in config:
+            if not item.get("url"):
+                logger.warning("Приемник уведомлений %s пропущен: не указан url", item.get("name"))
+                continue
+            sink_class = cls.SINK_TYPES.get(item.get("type", "telegram"))
+            if not sink_class:
+                raise ValueError(f"Неизвестный тип приемника уведомлений: {item.get('type')}")
+
+            options = {
+                "timeout": float(item.get("timeout", 10)),
+                "concurrency": int(item.get("concurrency", 4)),
+                "failure_threshold": int(item.get("failure_threshold", 5)),
+                "reset_timeout": float(item.get("reset_timeout", 30)),
+                "required": bool(item.get("required", True))
+            }
+            if sink_class is HttpJsonSink and item.get("headers"):
+                options["headers"] = item["headers"]
+            sink = sink_class(item["name"], item["url"], **options)
+            sinks.append(sink)
+
+            for event_type in item.get("events", ["*"]):
+                routes.setdefault(event_type, []).append(sink.name)
+
+        return cls(sinks, routes)
+
+    def sinks_for(self, event_type: str) -> List[NotificationSink]:
+        """Приемники для типа события (результат кэшируется)"""
+        sinks = self._cache.get(event_type)
+        if sinks is None:
+            names = self.routes.get(event_type, []) + [
+                name for name in self.routes.get("*", []) if name not in self.routes.get(event_type, [])
+            ]
+            sinks = [self.sinks[name] for name in names if name in self.sinks]
+            self._cache[event_type] = sinks
+        return sinks
+
+    async def dispatch(self, session: aiohttp.ClientSession, event_type: str,
+                       message: str, payload: Optional[Dict[str, Any]] = None,
+                       skip: Iterable[str] = ()) -> Dict[str, bool]:
+        """
+        Одновременная отправка во все приемники события
+
+        Args:
+            skip: Приемники, уже получившие это уведомление (при повторной попытке)
+
+        Returns:
+            Dict[str, bool]: Результат по каждому приемнику, которому выполнялась отправка
+        """
+        skip = set(skip)
+        sinks = [sink for sink in self.sinks_for(event_type) if sink.name not in skip]
+        if not sinks:
+            if not skip:
+                logger.warning("Нет приемников для уведомлений типа %s", event_type)
+            return {}
+
+        results = await asyncio.gather(*(
+            sink.deliver(session, event_type, message, payload) for sink in sinks
+        ))
+        return {sink.name: ok for sink, ok in zip(sinks, results)}
+
+    def is_complete(self, event_type: str, delivered: Collection[str]) -> bool:
+        """
+        Событие доставлено: его получили все обязательные приемники
+
+        Если не получили только необязательные, повторять отправку не нужно.
+        Без приемников для типа события доставка не считается выполненной.
+        """
+        sinks = self.sinks_for(event_type)
+        if not sinks:
+            return False
+        return all(sink.name in delivered or not sink.required for sink in sinks)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Метрики по каждому приемнику"""
+        return {name: sink.get_stats() for name, sink in self.sinks.items()}
+
@@ -0,0 +1,228 @@
+import asyncio
+import logging
+import random
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from config.config import OUTBOX_CONFIG, NOTIFICATION_DIGEST
+from models.schemas import Order, OutboxEvent, OutboxEntry
+from services.storage_service import StorageService
+from services.telegram_service import TelegramService
+
+logger = logging.getLogger(__name__)
+
+class OutboxService:
+    """
+    Фоновая доставка уведомлений из outbox
+
+    События пишутся в таблицу outbox в одной транзакции с изменением заявки,
+    а этот сервис доставляет их в Telegram с повторными попытками
+    и экспоненциальной задержкой. После исчерпания попыток событие
+    переводится в статус dead и больше не отправляется.
+
+    Для каждого события запоминаются приемники, которые его уже получили
+    (outbox.delivered_sinks): повторная попытка уходит только в остальные,
+    а событие считается доставленным, когда его получили все обязательные
+    приемники.
+
+    В режиме сводок события остаются в outbox, пока не наберется
+    max_events или не истечет window с момента самого старого,
+    и затем уходят одним сообщением. Срочные типы событий
+    отправляются сразу.
+    """
+
+    def __init__(self, storage: StorageService, telegram: TelegramService,
+                 config: Optional[Dict[str, Any]] = None,
+                 digest: Optional[Dict[str, Any]] = None):
+        config = config or OUTBOX_CONFIG
+        digest = digest or NOTIFICATION_DIGEST
+        self.storage = storage
+        self.telegram = telegram
+        self.poll_interval = config['poll_interval']
+        self.batch_size = config['batch_size']
+        self.max_attempts = config['max_attempts']
+        self.backoff_base = config['backoff_base']
+        self.backoff_max = config['backoff_max']
+        self.retention_days = config['retention_days']
+        self.digest_enabled = digest['enabled']
+        self.digest_window = digest['window']
+        self.digest_max_events = max(1, digest['max_events'])
+        self.urgent_events = set(digest['urgent_events'])
+        self.drain_task = None
+        # Через сколько секунд истечет окно накопления текущей сводки
+        self._digest_due_in: Optional[float] = None
+
+    def _retry_delay(self, attempts: int) -> float:
+        """Экспоненциальная задержка с небольшим случайным разбросом"""
+        delay = min(self.backoff_max, self.backoff_base * (2 ** (attempts - 1)))
+        return delay * random.uniform(0.8, 1.2)
+
+    async def _deliver(self, entry: OutboxEntry, sinks: Set[str]) -> bool:
+        """
+        Доставка одного события
+
+        Args:
+            sinks: Приемники, уже получившие событие; дополняется принявшими сейчас
+        """
+        order = Order.from_dict(dict(entry.payload["order"]))
+
+        if entry.event_type == OutboxEvent.ORDER_CREATED.value:
+            return await self.telegram.notify_new_order(order, delivered=sinks)
+        elif entry.event_type == OutboxEvent.ORDER_UPDATED.value:
+            return await self.telegram.notify_order_update(
+                order, entry.payload.get("old_task", ""), delivered=sinks
+            )
+        elif entry.event_type == OutboxEvent.ORDER_DELETED.value:
+            return await self.telegram.notify_order_delete(order, delivered=sinks)
+
+        raise ValueError(f"Неизвестный тип события outbox: {entry.event_type}")
+
+    async def _handle_failure(self, entry: OutboxEntry, error: str,
+                              sinks: Optional[Set[str]] = None) -> None:
+        """
+        Планирование повторной попытки или перевод в dead
+
+        Args:
+            sinks: Приемники, получившие событие (сохраняются, чтобы не повторять им отправку)
+        """
+        attempts = entry.attempts + 1
+        delivered_sinks = sorted(sinks) if sinks is not None else None
+        if attempts >= self.max_attempts:
+            logger.error("Событие outbox %s (%s) не доставлено после %s попыток: %s",
+                         entry.id, entry.event_type, attempts, error)
+            await self.storage.mark_outbox_failed(
+                entry.id, attempts, error, retry_in=None, delivered_sinks=delivered_sinks
+            )
+        else:
+            retry_in = self._retry_delay(attempts)
+            logger.warning("Событие outbox %s не доставлено (попытка %s), повтор через %.0f с: %s",
+                           entry.id, attempts, retry_in, error)
+            await self.storage.mark_outbox_failed(
+                entry.id, attempts, error, retry_in=retry_in, delivered_sinks=delivered_sinks
+            )
+
+    async def _deliver_each(self, entries: List[OutboxEntry]) -> List[int]:
+        """Доставка событий по одному, возвращает ID доставленных"""
+        delivered = []
+        for entry in entries:
+            sinks = set(entry.delivered_sinks)
+            try:
+                if await self._deliver(entry, sinks):
+                    delivered.append(entry.id)
+                else:
+                    await self._handle_failure(entry, "уведомление не принято", sinks)
+            except Exception as e:
+                await self._handle_failure(entry, str(e), sinks)
+        return delivered
+
+    async def _deliver_digest(self, entries: List[OutboxEntry]) -> List[int]:
+        """
+        Доставка событий сводками по digest_max_events, возвращает ID доставленных
+
+        В одну сводку попадают события с одинаковым набором приемников,
+        уже получивших их, чтобы повтор не дублировал сводку этим приемникам.
+        """
+        groups: Dict[Tuple[str, ...], List[OutboxEntry]] = {}
+        for entry in entries:
+            groups.setdefault(tuple(sorted(entry.delivered_sinks)), []).append(entry)
+
+        delivered = []
+        for received, group in groups.items():
+            for start in range(0, len(group), self.digest_max_events):
+                chunk = group[start:start + self.digest_max_events]
+                sinks = set(received)
+                try:
+                    ok = await self.telegram.notify_digest(chunk, delivered=sinks)
+                    error = "сводка не принята"
+                except Exception as e:
+                    ok, error = False, str(e)
+
+                if ok:
+                    delivered.extend(entry.id for entry in chunk)
+                else:
+                    for entry in chunk:
+                        await self._handle_failure(entry, error, sinks)
+        return delivered
+
+    async def drain_once(self) -> int:
+        """
+        Один проход доставки
+
+        Returns:
+            int: Количество обработанных событий
+        """
+        limit = max(self.batch_size, self.digest_max_events) if self.digest_enabled else self.batch_size
+        entries = await self.storage.get_due_outbox_entries(limit)
+        self._digest_due_in = None
+
+        if not self.digest_enabled:
+            delivered = await self._deliver_each(entries)
+            await self.storage.mark_outbox_delivered(delivered)
+            return len(entries)
+
+        urgent = [entry for entry in entries if entry.event_type in self.urgent_events]
+        regular = [entry for entry in entries if entry.event_type not in self.urgent_events]
+        delivered = await self._deliver_each(urgent)
+        processed = len(urgent)
+
+        if regular:
+            waited = (datetime.now() - regular[0].created_at).total_seconds()
+            if len(regular) >= self.digest_max_events or waited >= self.digest_window:
+                delivered.extend(await self._deliver_digest(regular))
+                processed += len(regular)
+            else:
+                self._digest_due_in = self.digest_window - waited
+
+        await self.storage.mark_outbox_delivered(delivered)
+        return processed
+
+    async def run(self) -> None:
+        """Основной цикл доставки"""
+        logger.info("Запуск фоновой доставки уведомлений")
+        next_cleanup = time.monotonic() + 3600
+
+        while True:
+            try:
+                self.storage.outbox_event.clear()
+                processed = await self.drain_once()
+
+                # Полная пачка - вероятно, есть еще события, продолжаем сразу
+                if processed >= self.batch_size:
+                    continue
+
+                # Периодически удаляем старые доставленные события
+                if time.monotonic() >= next_cleanup:
+                    next_cleanup = time.monotonic() + 3600
+                    deleted = await self.storage.cleanup_outbox(self.retention_days)
+                    if deleted:
+                        logger.info("Удалено доставленных событий outbox: %s", deleted)
+
+                timeout = self.poll_interval
+                if self._digest_due_in is not None:
+                    timeout = min(timeout, max(self._digest_due_in, 0.1))
+                try:
+                    await asyncio.wait_for(self.storage.outbox_event.wait(), timeout=timeout)
+                except asyncio.TimeoutError:
+                    pass
+
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error("Ошибка при доставке уведомлений: %s", e, exc_info=True)
+                await asyncio.sleep(self.poll_interval)
+
+    def start(self) -> None:
+        """Запуск фоновой задачи доставки"""
+        if not self.drain_task:
+            self.drain_task = asyncio.create_task(self.run())
+
+    async def stop(self) -> None:
+        """Остановка фоновой задачи"""
+        if self.drain_task:
+            self.drain_task.cancel()
+            try:
+                await self.drain_task
+            except asyncio.CancelledError:
+                pass
+            self.drain_task = None
@@ -0,0 +1,181 @@
+"""
+Конвейер обработки входящих сообщений бота
+
+Обработка сообщения разбита на этапы - корутины stage(ctx), которые
+по очереди заполняют общий MessageContext. Этап может остановить
+обработку (ctx.stop), например для дубля или при превышении частоты.
+Длительность каждого этапа автоматически пишется в vkbot_stage_seconds
+с меткой stage=<имя этапа>.
+
+Этапы можно отключать по имени (PIPELINE_SKIP) и добавлять свои:
+```python
+async def audit(ctx: MessageContext) -> None:
+    logger.info("%s: %s -> %s", ctx.user_id, ctx.state_name, ctx.new_state)
+
+vk_service.pipeline.insert("audit", audit, after="handle")
+```
+"""
+
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict, Hashable, Iterable, List, Optional, Tuple
+
+from utils.metrics import metrics, STAGE_SECONDS
+
+logger = logging.getLogger(__name__)
+
+PIPELINE_STOPS_TOTAL = metrics.counter(
+    "vkbot_pipeline_stops_total", "Сообщения, обработка которых остановлена этапом", ["stage"]
+)
+
+class MessageContext:
+    """Входящее сообщение и результаты этапов обработки"""
+
+    __slots__ = (
+        "user_id", "text", "payload", "callback_supported", "source", "event", "event_key",
+        "user_state", "new_state", "response_text", "keyboard_data", "keyboard", "sent",
+        "stopped", "failed_stage", "timings"
+    )
+
+    def __init__(self, user_id: int, text: str = "", payload: Any = None, callback_supported: bool = False,
+                 source: str = "message", event: Any = None, event_key: Optional[Hashable] = None):
+        """
+        Args:
+            user_id: ID пользователя ВК
+            text: Текст сообщения
+            payload: Полезная нагрузка кнопки
+            callback_supported: Клиент поддерживает callback-кнопки
+            source: Источник: message, callback или coalesced (склеенная серия)
+            event: Исходное событие LongPoll
+            event_key: Ключ события для отсева повторной доставки (None - не проверять)
+        """
+        self.user_id = user_id
+        self.text = text
+        self.payload = payload
+        self.callback_supported = callback_supported
+        self.source = source
+        self.event = event
+        self.event_key = event_key
+        # Заполняются этапами
+        self.user_state = None
+        self.new_state = None
+        self.response_text: Optional[str] = None
+        self.keyboard_data: Optional[Dict[str, Any]] = None
+        self.keyboard: Optional[str] = None
+        self.sent = False
+        # Служебное
+        self.stopped: Optional[str] = None          # Причина остановки
+        self.failed_stage: Optional[str] = None     # Этап, на котором возникло исключение
+        self.timings: Dict[str, float] = {}         # Длительность этапов, сек
+
+    @property
+    def state_name(self) -> Optional[str]:
+        return self.user_state.state if self.user_state is not None else None
+
+    def stop(self, reason: str) -> None:
+        """Остановить обработку после текущего этапа"""
+        self.stopped = reason
+
+Stage = Callable[[MessageContext], Awaitable[None]]
+
+class Pipeline:
+    """
+    Упорядоченная цепочка этапов обработки
+
+    Отключенные этапы остаются в списке (их можно вставлять относительно
+    них), но не выполняются. Исключение этапа прерывает обработку и
+    передается вызывающему с ctx.failed_stage.
+    """
+
+    def __init__(self, stages: Iterable[Tuple[str, Stage]] = (), skip: Iterable[str] = ()):
+        """
+        Args:
+            stages: Этапы (имя, корутина) в порядке выполнения
+            skip: Имена отключенных этапов
+        """
+        self._stages: List[Tuple[str, Stage]] = []
+        self._skip = set(skip)
+        self._chain: Tuple[Tuple[str, Stage, Any], ...] = ()
+        for name, stage in stages:
+            self.insert(name, stage)
+        unknown = self._skip - set(self.names)
+        if unknown:
+            logger.warning("Отключены неизвестные этапы обработки: %s", ", ".join(sorted(unknown)))
+
+    @property
+    def names(self) -> List[str]:
+        """Все этапы по порядку"""
+        return [name for name, _ in self._stages]
+
+    @property
+    def active(self) -> List[str]:
+        """Выполняемые этапы по порядку"""
+        return [name for name, _, _ in self._chain]
+
+    def _index(self, name: str) -> int:
+        for index, (stage_name, _) in enumerate(self._stages):
+            if stage_name == name:
+                return index
+        raise KeyError(f"Нет этапа обработки {name}")
+
+    def _rebuild(self) -> None:
+        # Дочерние метрики создаются при изменении цепочки, а не на каждое сообщение
+        self._chain = tuple(
+            (name, stage, STAGE_SECONDS.labels(name))
+            for name, stage in self._stages if name not in self._skip
+        )
+
+    def insert(self, name: str, stage: Stage, before: Optional[str] = None, after: Optional[str] = None) -> None:
+        """
+        Добавить этап (по умолчанию - в конец)
+
+        Raises:
+            ValueError: Этап с таким именем уже есть
+            KeyError: Нет этапа before/after
+        """
+        if any(stage_name == name for stage_name, _ in self._stages):
+            raise ValueError(f"Этап обработки {name} уже есть")
+        if before is not None:
+            index = self._index(before)
+        elif after is not None:
+            index = self._index(after) + 1
+        else:
+            index = len(self._stages)
+        self._stages.insert(index, (name, stage))
+        self._rebuild()
+
+    def replace(self, name: str, stage: Stage) -> None:
+        """Заменить реализацию этапа"""
+        self._stages[self._index(name)] = (name, stage)
+        self._rebuild()
+
+    def remove(self, name: str) -> None:
+        del self._stages[self._index(name)]
+        self._rebuild()
+
+    def skip(self, name: str, skipped: bool = True) -> None:
+        """Отключить (или снова включить) этап"""
+        if skipped:
+            self._skip.add(name)
+        else:
+            self._skip.discard(name)
+        self._rebuild()
+
+    async def run(self, ctx: MessageContext) -> MessageContext:
+        """Выполнить этапы по порядку до конца цепочки или остановки"""
+        for name, stage, histogram in self._chain:
+            started = time.perf_counter()
+            try:
+                await stage(ctx)
+            except BaseException:
+                # В том числе отмена по истечении срока обработки
+                ctx.failed_stage = name
+                raise
+            finally:
+                duration = time.perf_counter() - started
+                histogram.observe(duration)
+                ctx.timings[name] = duration
+            if ctx.stopped is not None:
+                PIPELINE_STOPS_TOTAL.labels(name).inc()
+                break
+        return ctx
@@ -1,19 +1,48 @@
 import json
+import asyncio
 import logging
 import aiosqlite
-from datetime import datetime
-from typing import List, Optional, Dict, Any
+from datetime import datetime, timedelta
+from typing import AsyncIterator, List, NamedTuple, Optional, Dict, Any, Sequence, Tuple
 from pathlib import Path
 
 from config.config import DATABASE_PATH, DB_CONFIG
-from models.schemas import Order, UserState
+from models.schemas import Order, UserState, OutboxEvent, OutboxEntry
 from utils.helpers import PhoneNumberHelper, TextHelper, DateTimeHelper
+from utils.deadline import bounded
+from utils.metrics import STORAGE_SECONDS
 
 logger = logging.getLogger(__name__)
 
+class BatchResult(NamedTuple):
+    """Результат StorageService.create_orders_batch (списки в порядке входных данных)"""
+    order_ids: List[int]
+    replayed: List[bool]    # Заявка не создана: ключ уже известен или повторяется в пакете
+
+    @property
+    def created(self) -> int:
+        """Число новых заявок"""
+        return self.replayed.count(False)
+
 class StorageService:
+    """
+    Хранилище заявок, состояний пользователей и outbox (SQLite)
+
+    Методы, вызываемые при обработке сообщения бота, помечены bounded:
+    внутри deadline_scope они ждут не дольше остатка срока, а при
+    отмене соединение закрывается и незафиксированная транзакция
+    откатывается.
+    """
+
+    # Ключей идемпотентности в одном запросе IN (...), ниже лимита параметров SQLite
+    KEY_LOOKUP_CHUNK = 500
+
     def __init__(self):
         self.db_path = DATABASE_PATH
+        # Сигнал для фоновой доставки о новых записях в outbox
+        self.outbox_event = asyncio.Event()
+        # Сигналы для других читателей outbox (например, ленты событий)
+        self._outbox_subscribers: List[asyncio.Event] = []
         self._ensure_db_exists()
 
     def _ensure_db_exists(self):
@@ -23,7 +52,8 @@ class StorageService:
 
         async def init_db():
             async with aiosqlite.connect(self.db_path) as db:
-                # Применяем pragma настройки
+                # Применяем pragma настройки; journal_mode (WAL) сохраняется в файле базы,
+                # на него опирается BackupService при копировании без блокировки записи
                 for pragma, value in DB_CONFIG['pragmas'].items():
                     await db.execute(f"PRAGMA {pragma} = {value}")
 
@@ -53,35 +83,202 @@ class StorageService:
                     )
                 ''')
 
+                # Таблица исходящих уведомлений (transactional outbox)
+                await db.execute('''
+                    CREATE TABLE IF NOT EXISTS outbox (
+                        id INTEGER PRIMARY KEY AUTOINCREMENT,
+                        event_type TEXT NOT NULL,
+                        payload TEXT NOT NULL,
+                        status TEXT NOT NULL DEFAULT 'pending',
+                        attempts INTEGER NOT NULL DEFAULT 0,
+                        next_attempt_at TIMESTAMP NOT NULL,
+                        last_error TEXT,
+                        created_at TIMESTAMP NOT NULL,
+                        delivered_at TIMESTAMP,
+                        delivered_sinks TEXT
+                    )
+                ''')
+
+                # Базы, созданные до учета доставки по приемникам
+                cursor = await db.execute('PRAGMA table_info(outbox)')
+                columns = {row[1] for row in await cursor.fetchall()}
+                if 'delivered_sinks' not in columns:
+                    await db.execute('ALTER TABLE outbox ADD COLUMN delivered_sinks TEXT')
+
+                # Ключи идемпотентности заявок с сайта
+                await db.execute('''
+                    CREATE TABLE IF NOT EXISTS idempotency_keys (
+                        key TEXT PRIMARY KEY,
+                        order_id INTEGER NOT NULL,
+                        created_at TIMESTAMP NOT NULL
+                    )
+                ''')
+
                 # Индексы для оптимизации
                 await db.execute('CREATE INDEX IF NOT EXISTS idx_orders_user_id ON orders(user_id)')
                 await db.execute('CREATE INDEX IF NOT EXISTS idx_orders_status ON orders(status)')
+                await db.execute('CREATE INDEX IF NOT EXISTS idx_outbox_due ON outbox(status, next_attempt_at)')
                 
                 await db.commit()
 
         import asyncio
         asyncio.run(init_db())
 
+    @bounded
+    @STORAGE_SECONDS.timed("create_order")
     async def create_order(self, user_id: str, name: str, phone: str, task: str, 
-                          business_type: Optional[str] = None) -> int:
-        """Создание новой заявки"""
+                          business_type: Optional[str] = None,
+                          idempotency_key: Optional[str] = None,
+                          idempotency_ttl: int = 24 * 3600) -> int:
+        """
+        Создание новой заявки
+
+        Если передан ключ идемпотентности и заявка с ним уже создана
+        в пределах idempotency_ttl секунд, возвращается ID существующей заявки.
+        """
         phone = PhoneNumberHelper.format_phone(phone)
         task = TextHelper.clean_text(task)
-        
+
         async with aiosqlite.connect(self.db_path) as db:
             db.row_factory = aiosqlite.Row
             now = datetime.now().isoformat()
-            
+
+            if idempotency_key:
+                # Проверка и запись ключа в одной транзакции с блокировкой на запись
+                await db.execute('BEGIN IMMEDIATE')
+                cutoff = (datetime.now() - timedelta(seconds=idempotency_ttl)).isoformat()
+                cursor = await db.execute('''
+                    SELECT order_id FROM idempotency_keys WHERE key = ? AND created_at >= ?
+                ''', (idempotency_key, cutoff))
+                existing = await cursor.fetchone()
+                await cursor.close()
+                if existing:
+                    await db.rollback()
+                    logger.info("Повторный запрос с ключом идемпотентности, заявка %s", existing["order_id"])
+                    return existing["order_id"]
+
             cursor = await db.execute('''
                 INSERT INTO orders (user_id, name, phone, business_type, task, status, created_at)
                 VALUES (?, ?, ?, ?, ?, ?, ?)
-                RETURNING id
+                RETURNING *
             ''', (user_id, name, phone, business_type, task, 'new', now))
-            
+
             row = await cursor.fetchone()
+            await cursor.close()
+            if idempotency_key:
+                await db.execute('''
+                    INSERT OR REPLACE INTO idempotency_keys (key, order_id, created_at)
+                    VALUES (?, ?, ?)
+                ''', (idempotency_key, row['id'], now))
+            # Уведомление пишется в той же транзакции, что и заявка
+            await self._add_outbox_event(db, OutboxEvent.ORDER_CREATED, {"order": dict(row)})
             await db.commit()
+            self._signal_outbox()
             return row['id']
 
+    @STORAGE_SECONDS.timed("create_orders_batch")
+    async def create_orders_batch(self, orders: List[Dict[str, Any]],
+                                  idempotency_ttl: int = 24 * 3600) -> BatchResult:
+        """
+        Создание нескольких заявок одной транзакцией
+        
+        Args:
+            orders: Данные заявок (user_id, name, phone, task, business_type,
+                необязательный idempotency_key). Заявка с ключом, уже известным
+                в пределах idempotency_ttl секунд или встречавшимся раньше в этом
+                же пакете, не создается повторно - вместо нее возвращается ID
+                существующей.
+            idempotency_ttl: Срок действия ключей идемпотентности, сек
+            
+        Returns:
+            BatchResult: ID заявок и признаки повторов в порядке входных данных
+        """
+        if not orders:
+            return BatchResult([], [])
+            
+        now = datetime.now().isoformat()
+        cutoff = (datetime.now() - timedelta(seconds=idempotency_ttl)).isoformat()
+        keys = [order.get('idempotency_key') for order in orders]
+        
+        async with aiosqlite.connect(self.db_path) as db:
+            # Блокировка на запись с начала транзакции гарантирует,
+            # что ID новых заявок идут подряд
+            await db.execute('BEGIN IMMEDIATE')
+            
+            # Уникальные ключи пакета; поиск - частями, чтобы не упереться
+            # в лимит параметров запроса SQLite
+            unique_keys = list(dict.fromkeys(key for key in keys if key))
+            existing: Dict[str, int] = {}
+            for start in range(0, len(unique_keys), self.KEY_LOOKUP_CHUNK):
+                chunk = unique_keys[start:start + self.KEY_LOOKUP_CHUNK]
+                cursor = await db.execute(
+                    f"SELECT key, order_id FROM idempotency_keys "
+                    f"WHERE key IN ({','.join('?' * len(chunk))}) AND created_at >= ?",
+                    (*chunk, cutoff)
+                )
+                existing.update(await cursor.fetchall())
+                await cursor.close()
+            
+            # Повтор ключа внутри пакета получает ID первой заявки с этим ключом
+            new_indexes = []
+            first_index: Dict[str, int] = {}
+            for index, key in enumerate(keys):
+                if not key:
+                    new_indexes.append(index)
+                elif key not in existing and key not in first_index:
+                    first_index[key] = index
+                    new_indexes.append(index)
+            rows = [
+                (
+                    orders[index]['user_id'],
+                    orders[index]['name'],
+                    PhoneNumberHelper.format_phone(orders[index]['phone']),
+                    orders[index].get('business_type'),
+                    TextHelper.clean_text(orders[index]['task']),
+                    'new',
+                    now
+                )
+                for index in new_indexes
+            ]
+            
+            order_ids = [existing.get(key) for key in keys]
+            if rows:
+                await db.executemany('''
+                    INSERT INTO orders (user_id, name, phone, business_type, task, status, created_at)
+                    VALUES (?, ?, ?, ?, ?, ?, ?)
+                ''', rows)
+                
+                cursor = await db.execute('SELECT last_insert_rowid()')
+                last_id = (await cursor.fetchone())[0]
+                new_ids = list(range(last_id - len(rows) + 1, last_id + 1))
+                for index, order_id in zip(new_indexes, new_ids):
+                    order_ids[index] = order_id
+                for index, key in enumerate(keys):
+                    if order_ids[index] is None:
+                        order_ids[index] = order_ids[first_index[key]]
+                
+                await db.executemany('''
+                    INSERT OR REPLACE INTO idempotency_keys (key, order_id, created_at)
+                    VALUES (?, ?, ?)
+                ''', [
+                    (keys[index], order_id, now)
+                    for index, order_id in zip(new_indexes, new_ids) if keys[index]
+                ])
+                
+                columns = ('user_id', 'name', 'phone', 'business_type', 'task', 'status', 'created_at')
+                await self._add_outbox_events(db, OutboxEvent.ORDER_CREATED, [
+                    {"order": {"id": order_id, **dict(zip(columns, row)), "updated_at": None}}
+                    for order_id, row in zip(new_ids, rows)
+                ])
+            await db.commit()
+            
+        if rows:
+            self._signal_outbox()
+        created = set(new_indexes)
+        return BatchResult(order_ids, [index not in created for index in range(len(orders))])
+
+    @bounded
+    @STORAGE_SECONDS.timed("get_user_orders")
     async def get_user_orders(self, user_id: str, limit: int = 5) -> List[Order]:
         """Получение активных заявок пользователя"""
         async with aiosqlite.connect(self.db_path) as db:
@@ -96,18 +293,90 @@ class StorageService:
             rows = await cursor.fetchall()
             return [Order.from_dict(dict(row)) for row in rows]
 
-    async def get_order(self, order_id: int) -> Optional[Order]:
+    @bounded
+    @STORAGE_SECONDS.timed("get_order")
+    async def get_order(self, order_id: int, include_deleted: bool = False) -> Optional[Order]:
         """Получение заявки по ID"""
         async with aiosqlite.connect(self.db_path) as db:
             db.row_factory = aiosqlite.Row
             
-            cursor = await db.execute('''
-                SELECT * FROM orders WHERE id = ? AND status != 'deleted'
+            cursor = await db.execute(f'''
+                SELECT * FROM orders WHERE id = ? {"" if include_deleted else "AND status != 'deleted'"}
             ''', (order_id,))
             
             row = await cursor.fetchone()
             return Order.from_dict(dict(row)) if row else None
 
+    @staticmethod
+    def _order_filters(filters: Dict[str, Any], before_id: Optional[int]) -> Tuple[str, List[Any]]:
+        """
+        Условие WHERE для выборки заявок
+
+        Args:
+            filters: status, source ("website" или "vk"), created_from,
+                created_to (ISO-строки), query (поиск по имени, телефону и тексту)
+            before_id: Курсор - выбираются заявки с меньшим ID
+        """
+        conditions, params = [], []
+        if before_id is not None:
+            conditions.append("id < ?")
+            params.append(before_id)
+        if filters.get("status"):
+            conditions.append("status = ?")
+            params.append(filters["status"])
+        if filters.get("source") == "website":
+            conditions.append("user_id = 'website'")
+        elif filters.get("source") == "vk":
+            conditions.append("user_id != 'website'")
+        if filters.get("created_from"):
+            conditions.append("created_at >= ?")
+            params.append(filters["created_from"])
+        if filters.get("created_to"):
+            conditions.append("created_at < ?")
+            params.append(filters["created_to"])
+        if filters.get("query"):
+            pattern = "%" + filters["query"].replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+            conditions.append("(name LIKE ? ESCAPE '\\' OR phone LIKE ? ESCAPE '\\' OR task LIKE ? ESCAPE '\\')")
+            params.extend([pattern] * 3)
+        return ("WHERE " + " AND ".join(conditions)) if conditions else "", params
+
+    @STORAGE_SECONDS.timed("get_order_versions")
+    async def get_order_versions(self, filters: Dict[str, Any], before_id: Optional[int],
+                                 limit: int) -> List[Tuple[int, str]]:
+        """
+        ID и версии (время последнего изменения) заявок страницы
+
+        Выбираются только два столбца, поэтому запрос дешевый и подходит
+        для расчета ETag до выборки самих заявок.
+        """
+        where, params = self._order_filters(filters, before_id)
+        async with aiosqlite.connect(self.db_path) as db:
+            cursor = await db.execute(
+                f"SELECT id, COALESCE(updated_at, created_at) FROM orders {where} ORDER BY id DESC LIMIT ?",
+                params + [limit]
+            )
+            return [(row[0], row[1]) for row in await cursor.fetchall()]
+
+    async def iter_orders(self, filters: Dict[str, Any], before_id: Optional[int],
+                          limit: int) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Потоковая выборка заявок от новых к старым
+
+        Строки читаются из курсора порциями, вся страница
+        в памяти не собирается.
+        """
+        where, params = self._order_filters(filters, before_id)
+        async with aiosqlite.connect(self.db_path, iter_chunk_size=256) as db:
+            db.row_factory = aiosqlite.Row
+            cursor = await db.execute(
+                f"SELECT * FROM orders {where} ORDER BY id DESC LIMIT ?",
+                params + [limit]
+            )
+            async for row in cursor:
+                yield dict(row)
+
+    @bounded
+    @STORAGE_SECONDS.timed("update_order")
     async def update_order(self, order_id: int, task: str) -> Optional[Order]:
         """Обновление заявки"""
         task = TextHelper.clean_text(task)
@@ -115,6 +384,16 @@ class StorageService:
         
         async with aiosqlite.connect(self.db_path) as db:
             db.row_factory = aiosqlite.Row
+            await db.execute('BEGIN IMMEDIATE')
+            
+            # Старый текст нужен для уведомления об изменении
+            cursor = await db.execute('''
+                SELECT task FROM orders WHERE id = ? AND status != 'deleted'
+            ''', (order_id,))
+            old = await cursor.fetchone()
+            if not old:
+                await db.rollback()
+                return None
             
             cursor = await db.execute('''
                 UPDATE orders 
@@ -124,21 +403,30 @@ class StorageService:
             ''', (task, now, order_id))
             
             row = await cursor.fetchone()
+            await cursor.close()
+            await self._add_outbox_event(
+                db, OutboxEvent.ORDER_UPDATED, {"order": dict(row), "old_task": old['task']}
+            )
             await db.commit()
-            return Order.from_dict(dict(row)) if row else None
+            self._signal_outbox()
+            return Order.from_dict(dict(row))
 
+    @bounded
+    @STORAGE_SECONDS.timed("delete_order")
     async def delete_order(self, order_id: int) -> Optional[Order]:
         """Мягкое удаление заявки"""
         now = datetime.now().isoformat()
         
         async with aiosqlite.connect(self.db_path) as db:
             db.row_factory = aiosqlite.Row
+            await db.execute('BEGIN IMMEDIATE')
             
             # Получаем заявку перед удалением
             cursor = await db.execute('SELECT * FROM orders WHERE id = ?', (order_id,))
             order = await cursor.fetchone()
             
             if not order:
+                await db.rollback()
                 return None
                 
             await db.execute('''
@@ -147,9 +435,13 @@ class StorageService:
                 WHERE id = ?
             ''', (now, order_id))
             
+            await self._add_outbox_event(db, OutboxEvent.ORDER_DELETED, {"order": dict(order)})
             await db.commit()
+            self._signal_outbox()
             return Order.from_dict(dict(order))
 
+    @bounded
+    @STORAGE_SECONDS.timed("set_user_state")
     async def set_user_state(self, user_id: str, state: str, 
                             context: Dict[str, Any], temp_data: Optional[Dict[str, Any]] = None) -> None:
         """Сохранение состояния пользователя"""
@@ -170,6 +462,32 @@ class StorageService:
             
             await db.commit()
 
+    @bounded
+    @STORAGE_SECONDS.timed("reset_stale_user_state")
+    async def reset_stale_user_state(self, user_id: str, states: Sequence[str], new_state: str,
+                                     updated_before: datetime) -> bool:
+        """
+        Сброс состояния пользователя, если оно не менялось с updated_before
+
+        Состояние меняется на new_state, temp_data очищается. Проверка и
+        запись выполняются одним UPDATE, поэтому состояние, сохраненное
+        обработкой нового сообщения, не перезаписывается.
+
+        Returns:
+            bool: True, если состояние сброшено
+        """
+        if not states:
+            return False
+        async with aiosqlite.connect(self.db_path) as db:
+            cursor = await db.execute(f'''
+                UPDATE user_states SET state = ?, temp_data = NULL, updated_at = ?
+                WHERE user_id = ? AND state IN ({", ".join("?" * len(states))}) AND updated_at <= ?
+            ''', (new_state, datetime.now().isoformat(), user_id, *states, updated_before.isoformat()))
+            await db.commit()
+            return cursor.rowcount > 0
+
+    @bounded
+    @STORAGE_SECONDS.timed("get_user_state")
     async def get_user_state(self, user_id: str) -> Optional[UserState]:
         """Получение состояния пользователя"""
         async with aiosqlite.connect(self.db_path) as db:
@@ -189,6 +507,7 @@ class StorageService:
                 )
             return None
 
+    @STORAGE_SECONDS.timed("cleanup_old_states")
     async def cleanup_old_states(self, hours: int = 24) -> int:
         """Очистка старых состояний пользователей"""
         async with aiosqlite.connect(self.db_path) as db:
@@ -199,4 +518,194 @@ class StorageService:
             
             deleted = cursor.rowcount
             await db.commit()
-            return deleted
\ No newline at end of file
+            return deleted
+
+    @STORAGE_SECONDS.timed("get_users_in_states")
+    async def get_users_in_states(self, states: Sequence[str]) -> List[Tuple[str, datetime]]:
+        """Пользователи в указанных состояниях и время последнего изменения состояния"""
+        if not states:
+            return []
+        async with aiosqlite.connect(self.db_path) as db:
+            cursor = await db.execute(f'''
+                SELECT user_id, updated_at FROM user_states
+                WHERE state IN ({", ".join("?" * len(states))})
+            ''', tuple(states))
+            return [
+                (user_id, datetime.fromisoformat(updated_at))
+                for user_id, updated_at in await cursor.fetchall()
+            ]
+
+    @STORAGE_SECONDS.timed("check_writable")
+    async def check_writable(self) -> None:
+        """
+        Проверка доступности базы на запись
+
+        Берет блокировку на запись и сразу откатывает транзакцию.
+        Выбрасывает исключение, если база недоступна или только для чтения.
+        """
+        async with aiosqlite.connect(self.db_path) as db:
+            await db.execute('BEGIN IMMEDIATE')
+            await db.rollback()
+
+    @STORAGE_SECONDS.timed("cleanup_idempotency_keys")
+    async def cleanup_idempotency_keys(self, ttl: int = 24 * 3600) -> int:
+        """Удаление просроченных ключей идемпотентности"""
+        async with aiosqlite.connect(self.db_path) as db:
+            cutoff = (datetime.now() - timedelta(seconds=ttl)).isoformat()
+            cursor = await db.execute('DELETE FROM idempotency_keys WHERE created_at < ?', (cutoff,))
+            deleted = cursor.rowcount
+            await db.commit()
+            return deleted
+
+    def subscribe_outbox(self) -> asyncio.Event:
+        """
+        Отдельный сигнал о новых событиях outbox
+
+        У каждого читателя свой Event, поэтому сброс сигнала одним
+        читателем не мешает другому.
+        """
+        event = asyncio.Event()
+        self._outbox_subscribers.append(event)
+        return event
+
+    def unsubscribe_outbox(self, event: asyncio.Event) -> None:
+        """Отписка от сигнала о новых событиях outbox"""
+        if event in self._outbox_subscribers:
+            self._outbox_subscribers.remove(event)
+
+    def _signal_outbox(self) -> None:
+        """Оповещение читателей outbox о новых событиях после коммита"""
+        self.outbox_event.set()
+        for event in self._outbox_subscribers:
+            event.set()
+
+    async def _add_outbox_event(self, db: aiosqlite.Connection, event_type: OutboxEvent,
+                                payload: Dict[str, Any]) -> None:
+        """Добавление события в outbox в рамках текущей транзакции"""
+        await self._add_outbox_events(db, event_type, [payload])
+
+    async def _add_outbox_events(self, db: aiosqlite.Connection, event_type: OutboxEvent,
+                                 payloads: List[Dict[str, Any]]) -> None:
+        """Добавление нескольких событий в outbox в рамках текущей транзакции"""
+        now = datetime.now().isoformat()
+        await db.executemany('''
+            INSERT INTO outbox (event_type, payload, status, next_attempt_at, created_at)
+            VALUES (?, ?, 'pending', ?, ?)
+        ''', [
+            (event_type.value, json.dumps(payload, ensure_ascii=False, default=str), now, now)
+            for payload in payloads
+        ])
+
+    @staticmethod
+    def _outbox_entry(row: aiosqlite.Row) -> OutboxEntry:
+        """Запись outbox из строки таблицы"""
+        return OutboxEntry(
+            id=row['id'],
+            event_type=row['event_type'],
+            payload=json.loads(row['payload']),
+            status=row['status'],
+            attempts=row['attempts'],
+            last_error=row['last_error'],
+            created_at=datetime.fromisoformat(row['created_at']),
+            delivered_sinks=json.loads(row['delivered_sinks']) if row['delivered_sinks'] else []
+        )
+
+    @STORAGE_SECONDS.timed("get_due_outbox_entries")
+    async def get_due_outbox_entries(self, limit: int = 50) -> List[OutboxEntry]:
+        """Получение событий outbox, готовых к доставке"""
+        async with aiosqlite.connect(self.db_path) as db:
+            db.row_factory = aiosqlite.Row
+            
+            cursor = await db.execute('''
+                SELECT * FROM outbox
+                WHERE status = 'pending' AND next_attempt_at <= ?
+                ORDER BY id LIMIT ?
+            ''', (datetime.now().isoformat(), limit))
+            
+            rows = await cursor.fetchall()
+            return [self._outbox_entry(row) for row in rows]
+
+    @STORAGE_SECONDS.timed("get_outbox_since")
+    async def get_outbox_since(self, after_id: int, limit: int = 500) -> List[OutboxEntry]:
+        """События outbox с ID больше after_id в порядке возрастания, независимо от статуса"""
+        async with aiosqlite.connect(self.db_path) as db:
+            db.row_factory = aiosqlite.Row
+            
+            cursor = await db.execute('''
+                SELECT * FROM outbox WHERE id > ? ORDER BY id LIMIT ?
+            ''', (after_id, limit))
+            
+            rows = await cursor.fetchall()
+            return [self._outbox_entry(row) for row in rows]
+
+    @STORAGE_SECONDS.timed("get_last_outbox_id")
+    async def get_last_outbox_id(self) -> int:
+        """ID последнего события outbox (0, если событий нет)"""
+        async with aiosqlite.connect(self.db_path) as db:
+            cursor = await db.execute('SELECT COALESCE(MAX(id), 0) FROM outbox')
+            row = await cursor.fetchone()
+            return row[0]
+
+    @STORAGE_SECONDS.timed("mark_outbox_delivered")
+    async def mark_outbox_delivered(self, entry_ids: List[int]) -> None:
+        """Отметка событий outbox как доставленных"""
+        if not entry_ids:
+            return
+        async with aiosqlite.connect(self.db_path) as db:
+            now = datetime.now().isoformat()
+            await db.executemany('''
+                UPDATE outbox SET status = 'delivered', delivered_at = ?, last_error = NULL
+                WHERE id = ?
+            ''', [(now, entry_id) for entry_id in entry_ids])
+            await db.commit()
+
+    @STORAGE_SECONDS.timed("mark_outbox_failed")
+    async def mark_outbox_failed(self, entry_id: int, attempts: int, error: str,
+                                 retry_in: Optional[float],
+                                 delivered_sinks: Optional[List[str]] = None) -> None:
+        """
+        Отметка неудачной попытки доставки
+
+        Args:
+            entry_id: ID записи outbox
+            attempts: Количество выполненных попыток
+            error: Текст ошибки
+            retry_in: Задержка до следующей попытки в секундах, None - перевести в dead
+            delivered_sinks: Приемники, уже получившие событие (None - не менять)
+        """
+        sinks = json.dumps(sorted(delivered_sinks)) if delivered_sinks is not None else None
+        async with aiosqlite.connect(self.db_path) as db:
+            if retry_in is None:
+                await db.execute('''
+                    UPDATE outbox SET status = 'dead', attempts = ?, last_error = ?,
+                        delivered_sinks = COALESCE(?, delivered_sinks)
+                    WHERE id = ?
+                ''', (attempts, error, sinks, entry_id))
+            else:
+                next_attempt_at = (datetime.now() + timedelta(seconds=retry_in)).isoformat()
+                await db.execute('''
+                    UPDATE outbox SET attempts = ?, last_error = ?, next_attempt_at = ?,
+                        delivered_sinks = COALESCE(?, delivered_sinks)
+                    WHERE id = ?
+                ''', (attempts, error, next_attempt_at, sinks, entry_id))
+            await db.commit()
+
+    @STORAGE_SECONDS.timed("count_outbox")
+    async def count_outbox(self, status: str = 'pending') -> int:
+        """Количество событий outbox в указанном статусе"""
+        async with aiosqlite.connect(self.db_path) as db:
+            cursor = await db.execute('SELECT COUNT(*) FROM outbox WHERE status = ?', (status,))
+            row = await cursor.fetchone()
+            return row[0]
+
+    @STORAGE_SECONDS.timed("cleanup_outbox")
+    async def cleanup_outbox(self, days: int = 7) -> int:
+        """Удаление доставленных событий outbox старше указанного срока"""
+        async with aiosqlite.connect(self.db_path) as db:
+            cutoff = (datetime.now() - timedelta(days=days)).isoformat()
+            cursor = await db.execute('''
+                DELETE FROM outbox WHERE status = 'delivered' AND delivered_at < ?
+            ''', (cutoff,))
+            deleted = cursor.rowcount
+            await db.commit()
+            return deleted
@@ -1,46 +1,126 @@
 import aiohttp
+import asyncio
 import logging
-import os
 from datetime import datetime
-from typing import Optional, Any, Dict
-from models.schemas import Order
+from typing import Optional, Any, Dict, List, Set
+from config.config import TELEGRAM_WEBHOOK, TELEGRAM_HTTP_CONFIG, ERROR_THROTTLE_CONFIG, NOTIFICATION_SINKS
+from models.schemas import Order, OutboxEvent, OutboxEntry
+from services.error_throttle import ErrorThrottle
+from services.notification_router import NotificationRouter
 from utils.helpers import OrderHelper, PhoneNumberHelper, TextHelper, DateTimeHelper
+from utils.metrics import STAGE_SECONDS
 
 logger = logging.getLogger(__name__)
 
 class TelegramService:
-    """Сервис для отправки уведомлений в Telegram"""
-    
-    WEBHOOK_URL = os.getenv("TELEGRAM_WEBHOOK", "https://telegram-form.creatmanick-850.workers.dev")
-    
-    @staticmethod
-    async def notify_new_order(order: Order) -> bool:
-        """Уведомление о новой заявке"""
-        if not TelegramService.WEBHOOK_URL:
-            logger.warning("TELEGRAM_WEBHOOK не настроен, уведомления отключены")
-            return False
-            
+    """
+    Сервис для отправки уведомлений в Telegram
+
+    Все запросы идут через одну долгоживущую HTTP-сессию с пулом
+    keep-alive соединений, поэтому DNS, TCP и TLS не повторяются
+    для каждого уведомления. Сессию нужно закрыть через close().
+
+    Уведомления об ошибках проходят через ErrorThrottle: одинаковые
+    ошибки не заваливают чат, а раз в окно приходит сводка о повторах.
+
+    Доставка выполняется через NotificationRouter: одно уведомление
+    может уйти одновременно в несколько приемников (NOTIFICATION_SINKS).
+    """
+
+    WEBHOOK_URL = TELEGRAM_WEBHOOK
+
+    def __init__(self, webhook_url: Optional[str] = None, config: Optional[Dict[str, Any]] = None,
+                 sinks: Optional[List[Dict[str, Any]]] = None):
+        self.config = config or TELEGRAM_HTTP_CONFIG
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._session_lock = asyncio.Lock()
+
+        # Явно переданный webhook заменяет настройку приемников
+        if webhook_url is not None:
+            sinks = [{"name": "telegram", "type": "telegram", "url": webhook_url, "events": ["*"]}]
+        self.router = NotificationRouter.from_config(sinks or NOTIFICATION_SINKS)
+
+        # Подавление повторяющихся ошибок
+        self.error_throttle = ErrorThrottle(
+            limit=ERROR_THROTTLE_CONFIG['limit'],
+            window=ERROR_THROTTLE_CONFIG['window']
+        )
+        self.summary_task = None
+
+    async def _get_session(self) -> aiohttp.ClientSession:
+        """Получение общей HTTP-сессии (создается при первом обращении)"""
+        if self._session and not self._session.closed:
+            return self._session
+
+        async with self._session_lock:
+            if not self._session or self._session.closed:
+                connector = aiohttp.TCPConnector(
+                    limit=self.config['pool_limit'],
+                    ttl_dns_cache=self.config['dns_cache_ttl'],
+                    keepalive_timeout=self.config['keepalive_timeout']
+                )
+                timeout = aiohttp.ClientTimeout(
+                    total=self.config['connect_timeout'] + self.config['read_timeout'],
+                    connect=self.config['connect_timeout'],
+                    sock_read=self.config['read_timeout']
+                )
+                self._session = aiohttp.ClientSession(connector=connector, timeout=timeout)
+        return self._session
+
+    def start(self) -> None:
+        """Запуск фоновой отправки сводок о подавленных ошибках"""
+        if not self.summary_task:
+            self.summary_task = asyncio.create_task(self._error_summary_loop())
+
+    async def close(self) -> None:
+        """Закрытие HTTP-сессии при остановке приложения"""
+        if self.summary_task:
+            self.summary_task.cancel()
+            try:
+                await self.summary_task
+            except asyncio.CancelledError:
+                pass
+            self.summary_task = None
+        if self._session and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Статистика уведомлений
+
+        Returns:
+            Dict[str, Any]: Метрики приемников и счетчики подавленных ошибок
+        """
+        return {
+            "sinks": self.router.get_stats(),
+            "errors": self.error_throttle.get_stats()
+        }
+
+    async def notify_new_order(self, order: Order, delivered: Optional[Set[str]] = None) -> bool:
+        """Уведомление о новой заявке (delivered - см. _send_notification)"""
         order_number = OrderHelper.generate_order_number(order.id)
         status_emoji = OrderHelper.get_status_emoji('new')
-        
+
         business_type_text = f"Тип бизнеса: {order.business_type}\n" if order.business_type else ""
-        
+        source = "Сайт" if order.user_id == "website" else "ВК"
+
         message = (
-            f"{status_emoji} [ВК] Новая заявка {order_number}\n"
+            f"{status_emoji} [{source}] Новая заявка {order_number}\n"
             f"От: {order.name}\n"
             f"Телефон: {PhoneNumberHelper.format_phone(order.phone)}\n"
             f"{business_type_text}"
             f"Задача: {TextHelper.clean_text(order.task)}\n"
             f"Дата: {DateTimeHelper.format_datetime(order.created_at)}"
         )
-        return await TelegramService._send_notification(message)
+        return await self._send_notification(message, OutboxEvent.ORDER_CREATED.value, order.to_dict(), delivered)
 
-    @staticmethod
-    async def notify_order_update(order: Order, old_task: str) -> bool:
+    async def notify_order_update(self, order: Order, old_task: str,
+                                  delivered: Optional[Set[str]] = None) -> bool:
         """Уведомление об изменении заявки"""
         order_number = OrderHelper.generate_order_number(order.id)
         status_emoji = OrderHelper.get_status_emoji('updated')
-        
+
         message = (
             f"{status_emoji} [ВК] Изменение заявки {order_number}\n"
             f"От: {order.name}\n"
@@ -48,57 +128,121 @@ class TelegramService:
             f"Новый текст: {TextHelper.truncate(order.task, 100)}\n"
             f"Дата изменения: {DateTimeHelper.format_datetime(datetime.now())}"
         )
-        return await TelegramService._send_notification(message)
+        return await self._send_notification(
+            message, OutboxEvent.ORDER_UPDATED.value, {**order.to_dict(), "old_task": old_task}, delivered
+        )
 
-    @staticmethod
-    async def notify_order_delete(order: Order) -> bool:
+    async def notify_order_delete(self, order: Order, delivered: Optional[Set[str]] = None) -> bool:
         """Уведомление об удалении заявки"""
         order_number = OrderHelper.generate_order_number(order.id)
         status_emoji = OrderHelper.get_status_emoji('deleted')
-        
+
         message = (
             f"{status_emoji} [ВК] Удаление заявки {order_number}\n"
             f"От: {order.name}\n"
             f"Описание: {TextHelper.truncate(order.task, 100)}\n"
             f"Дата удаления: {DateTimeHelper.format_datetime(datetime.now())}"
         )
-        return await TelegramService._send_notification(message)
+        return await self._send_notification(message, OutboxEvent.ORDER_DELETED.value, order.to_dict(), delivered)
+
+    async def notify_digest(self, entries: List[OutboxEntry], delivered: Optional[Set[str]] = None) -> bool:
+        """
+        Сводное уведомление о нескольких событиях
+
+        События группируются по типу, каждое занимает одну строку.
+        """
+        sections = [
+            (OutboxEvent.ORDER_CREATED.value, OrderHelper.get_status_emoji('new'), "Новые заявки"),
+            (OutboxEvent.ORDER_UPDATED.value, OrderHelper.get_status_emoji('updated'), "Изменения заявок"),
+            (OutboxEvent.ORDER_DELETED.value, OrderHelper.get_status_emoji('deleted'), "Удаления заявок")
+        ]
+
+        parts = [f"📋 Сводка уведомлений: {len(entries)}"]
+        for event_type, emoji, title in sections:
+            lines = []
+            for entry in entries:
+                if entry.event_type != event_type:
+                    continue
+                order = Order.from_dict(dict(entry.payload["order"]))
+                source = "Сайт" if order.user_id == "website" else "ВК"
+                line = f"• [{source}] {OrderHelper.generate_order_number(order.id)} — {order.name}"
+                if event_type == OutboxEvent.ORDER_CREATED.value:
+                    line += f", {PhoneNumberHelper.format_phone(order.phone)}"
+                lines.append(f"{line}: {TextHelper.truncate(TextHelper.clean_text(order.task), 80)}")
+            if lines:
+                parts.append(f"\n{emoji} {title} ({len(lines)}):\n" + "\n".join(lines))
+
+        return await self._send_notification(
+            "\n".join(parts), "digest", {"events": [entry.payload for entry in entries]}, delivered
+        )
 
-    @staticmethod
-    async def notify_error(error_type: str, details: Dict[str, Any]) -> bool:
+    async def notify_error(self, error_type: str, details: Dict[str, Any]) -> bool:
         """Уведомление об ошибке в работе бота"""
+        allowed, repeated = self.error_throttle.check(error_type, str(details.get("error", details)))
+        if not allowed:
+            logger.debug("Уведомление об ошибке %s подавлено как повторяющееся", error_type)
+            return False
+
         message = (
             "⚠️ [ВК] Ошибка в работе бота\n"
             f"Тип: {error_type}\n"
             f"Детали: {details}\n"
             f"Время: {DateTimeHelper.format_datetime(datetime.now())}"
         )
-        return await TelegramService._send_notification(message)
+        if repeated:
+            message += f"\nПовторов с прошлого уведомления: {repeated}"
+        return await self._send_notification(
+            message, "error", {"error_type": error_type, "details": details, "repeated": repeated}
+        )
+
+    async def _error_summary_loop(self) -> None:
+        """Периодическая отправка сводок "еще N повторов" по подавленным ошибкам"""
+        interval = max(10.0, self.error_throttle.window / 5)
+        while True:
+            try:
+                await asyncio.sleep(interval)
+                for summary in self.error_throttle.pop_summaries():
+                    minutes = max(1, round(summary["period"] / 60))
+                    await self._send_notification(
+                        "⚠️ [ВК] Повторяющаяся ошибка\n"
+                        f"Тип: {summary['error_type']}\n"
+                        f"Еще {summary['count']} повторов за {minutes} мин.\n"
+                        f"Пример: {TextHelper.truncate(summary['sample'], 200)}",
+                        "error", summary
+                    )
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error("Ошибка при отправке сводки об ошибках: %s", e)
 
-    @staticmethod
-    async def _send_notification(message: str) -> bool:
-        """Отправка уведомления в Telegram"""
-        if not TelegramService.WEBHOOK_URL:
-            logger.warning("TELEGRAM_WEBHOOK не настроен, уведомления отключены")
+    async def _send_notification(self, message: str, event_type: str,
+                                 payload: Optional[Dict[str, Any]] = None,
+                                 delivered: Optional[Set[str]] = None) -> bool:
+        """
+        Отправка уведомления во все приемники, настроенные для типа события
+
+        Args:
+            delivered: Приемники, уже получившие уведомление. Им отправка не
+                повторяется; принявшие уведомление сейчас добавляются в множество
+
+        Returns:
+            bool: True, если уведомление получили все обязательные приемники
+        """
+        if not self.router.sinks:
+            logger.warning("Приемники уведомлений не настроены, уведомления отключены")
             return False
-            
-        try:
-            async with aiohttp.ClientSession() as session:
-                async with session.post(
-                    TelegramService.WEBHOOK_URL,
-                    json={
-                        "name": "VK Bot",
-                        "phone": "System",
-                        "message": message
-                    }
-                ) as response:
-                    if response.status == 200:
-                        logger.info("Уведомление успешно отправлено в Telegram")
-                        return True
-                    else:
-                        error_text = await response.text()
-                        logger.error(f"Ошибка отправки в Telegram: {error_text}")
-                        return False
-        except Exception as e:
-            logger.error(f"Ошибка при отправке в Telegram: {str(e)}")
-            return False
\ No newline at end of file
+
+        if delivered is None:
+            delivered = set()
+        session = await self._get_session()
+        with STAGE_SECONDS.labels("telegram_notify").time():
+            results = await self.router.dispatch(session, event_type, message, payload, skip=delivered)
+        delivered.update(name for name, ok in results.items() if ok)
+
+        if self.router.is_complete(event_type, delivered):
+            logger.info("Уведомление %s успешно отправлено", event_type)
+            return True
+        failed = sorted(name for name, ok in results.items() if not ok)
+        if failed:
+            logger.warning("Уведомление %s не доставлено в приемники: %s", event_type, ", ".join(failed))
+        return False
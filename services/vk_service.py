@@ -1,23 +1,59 @@
 import json
+import itertools
 import logging
 import asyncio
+import time
 import vk_api
 from vk_api.bot_longpoll import VkBotLongPoll, VkBotEventType
-from datetime import datetime
-from typing import Optional, Dict, Any
+from collections import Counter, OrderedDict
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from typing import Hashable, Iterator, Optional, Dict, Any, Union
 
-from config.config import VK_TOKEN, VK_GROUP_ID
+from config.config import (
+    VK_TOKEN, VK_GROUP_ID, LOCALES_DIR, LOCALIZATION_CONFIG, DRAFT_CONFIG, FLOOD_CONFIG,
+    PIPELINE_CONFIG, DEADLINE_CONFIG
+)
 from models.schemas import UserState, Order
 from services.storage_service import StorageService
 from services.telegram_service import TelegramService
-from dialogs.states import DialogState
+from services.localization_service import LocalizationService
+from services.flood_control import FloodControl, FloodDecision, MessageCoalescer
+from services.pipeline import MessageContext, Pipeline
+from dialogs.states import DialogState, DRAFT_STATES, GLOBAL_COMMANDS
+from dialogs.intents import normalize_text
 from dialogs.handlers import DialogHandler
+from dialogs.keyboard import DEFAULT_LOCALE, KEYBOARDS, KeyboardBuilder, catalog_translator
+from dialogs.templates import TemplateCatalog
 from utils.helpers import PhoneNumberHelper, TextHelper, DateTimeHelper, OrderHelper
+from utils.metrics import (
+    STAGE_SECONDS, DIALOG_STATE_SECONDS, ERRORS_TOTAL, VK_API_ERRORS_TOTAL, QUEUE_DEPTH,
+    DEADLINE_EXCEEDED_TOTAL
+)
+from utils.deadline import DeadlineExceeded, deadline_scope, within
+from utils.timer_wheel import TimerWheel
 
 logger = logging.getLogger(__name__)
 
+# Метрики горячего пути (дочерние метрики создаются один раз)
+_INGEST_SECONDS = STAGE_SECONDS.labels("vk_ingest")
+_VK_SEND_SECONDS = STAGE_SECONDS.labels("vk_send")
+_SEND_QUEUE_DEPTH = QUEUE_DEPTH.labels("vk_send")
+
+# Приоритеты очереди фоновых сообщений (меньше - раньше); ответы на
+# сообщения пользователей отправляются сразу, минуя очередь
+PRIORITY_NORMAL = 0
+PRIORITY_LOW = 10
+
+# Шаги со свободным описанием задачи: серии сообщений склеиваются
+COALESCE_STATES = frozenset({DialogState.PERSONAL_TASK_INPUT, DialogState.BUSINESS_TASK_INPUT})
+
+# Клавиатура на случай ошибки сборки
+FALLBACK_KEYBOARD = KeyboardBuilder.create_keyboard(["В главное меню"], one_time=False)
+
 class VKService:
-    def __init__(self):
+    def __init__(self, storage: Optional[StorageService] = None,
+                 telegram: Optional[TelegramService] = None):
         try:
             logger.info("Инициализация VK сервиса...")
             # Инициализация VK API
@@ -26,7 +62,7 @@ class VKService:
             
             # Проверяем подключение и получаем информацию о группе
             group_info = self.vk.groups.getById()[0]
-            logger.info(f"VK API успешно инициализирован. Группа: {group_info['name']} (ID: {group_info['id']})")
+            logger.info("VK API успешно инициализирован. Группа: %s (ID: %s)", group_info['name'], group_info['id'])
             
             # Проверяем возможность отправки сообщений
             try:
@@ -47,388 +83,503 @@ class VKService:
                 self.longpoll = VkBotLongPoll(self.vk_session, VK_GROUP_ID)
                 logger.info("LongPoll успешно инициализирован")
             except Exception as e:
-                logger.error(f"Ошибка инициализации LongPoll: {e}")
+                logger.error("Ошибка инициализации LongPoll: %s", e)
                 raise
 
             # Инициализация сервисов
-            self.storage = StorageService()
-            self.dialog_handler = DialogHandler(self.storage)
+            self.storage = storage or StorageService()
+            self.telegram = telegram or TelegramService()
+            self.localization = LocalizationService(
+                str(LOCALES_DIR), reload_interval=LOCALIZATION_CONFIG['reload_interval']
+            )
+            self.dialog_handler = DialogHandler(
+                self.storage,
+                TemplateCatalog.from_locales(self.localization.locales)
+            )
+            # После правки файлов локализации каталог шаблонов собирается заново
+            self.localization.add_listener(self._rebuild_templates)
+            
+            # Готовые клавиатуры ответов; подписи переводятся по каталогу шаблонов
+            self.keyboards = KEYBOARDS
+            self._translate_keyboards(self.dialog_handler.templates)
+            
+            # Ограничение частоты сообщений и склейка серий текста
+            self.flood = FloodControl(
+                FLOOD_CONFIG['rate'],
+                FLOOD_CONFIG['burst'],
+                FLOOD_CONFIG['mute_after'],
+                FLOOD_CONFIG['mute_seconds'],
+                FLOOD_CONFIG['max_users']
+            )
+            self.coalescer = MessageCoalescer(
+                self._process_coalesced, FLOOD_CONFIG['coalesce_window'], FLOOD_CONFIG['coalesce_max_wait']
+            )
+            # Пользователи на шагах COALESCE_STATES (по последнему ответу бота)
+            self.text_input_users = set()
+            
+            # Таймеры незаконченных заявок: один на пользователя с черновиком
+            self.drafts = TimerWheel(tick=DRAFT_CONFIG['tick'])
+            self.draft_task = None
+            
+            # Фоновые сообщения (напоминания) уходят, когда бот не занят входящими
+            self.send_queue: asyncio.PriorityQueue = asyncio.PriorityQueue(DRAFT_CONFIG['send_queue_size'])
+            self.send_queue_task = None
+            self._send_seq = itertools.count()
+            self._active_inputs = 0
+            # Пользователи, чьи сообщения сейчас проходят конвейер
+            self._active_users: Counter = Counter()
+            self._inputs_idle = asyncio.Event()
+            self._inputs_idle.set()
             
-            # Кэш состояний пользователей для оптимизации
-            self.user_states_cache: Dict[int, UserState] = {}
-            self.cache_cleanup_task = None
+            # Конвейер обработки входящих сообщений и последние события для отсева повторов
+            self.pipeline = Pipeline([
+                ("ingest", self._stage_ingest),
+                ("dedupe", self._stage_dedupe),
+                ("throttle", self._stage_throttle),
+                ("state_load", self._stage_state_load),
+                ("handle", self._stage_handle),
+                ("persist", self._stage_persist),
+                ("render", self._stage_render),
+                ("send", self._stage_send)
+            ], skip=PIPELINE_CONFIG['skip'])
+            self.recent_events: "OrderedDict[Hashable, None]" = OrderedDict()
+            
+            # Время последнего успешного запроса к LongPoll (time.monotonic)
+            self.last_poll_at: Optional[float] = None
             
         except vk_api.exceptions.ApiError as e:
-            logger.error(f"Ошибка API VK: {e}")
+            logger.error("Ошибка API VK: %s", e)
             raise
         except Exception as e:
-            logger.error(f"Ошибка при инициализации VK сервиса: {e}")
+            logger.error("Ошибка при инициализации VK сервиса: %s", e)
             raise
 
-    async def send_message(self, user_id: int, message: str, keyboard: Optional[dict] = None) -> bool:
+    def _rebuild_templates(self, localization: LocalizationService) -> None:
+        """Новый каталог шаблонов и подписи кнопок после перезагрузки локализаций"""
+        self.dialog_handler.templates = TemplateCatalog.from_locales(localization.locales)
+        self._translate_keyboards(self.dialog_handler.templates)
+
+    def _translate_keyboards(self, templates: TemplateCatalog) -> None:
+        """Перевод подписей клавиатур по каталогу и сборка клавиатур всех языков"""
+        self.keyboards.set_translate(catalog_translator(templates))
+        self.keyboards.warm(templates.locales)
+
+    async def send_message(self, user_id: int, message: str, keyboard: Optional[Union[str, dict]] = None) -> bool:
         """
         Отправка сообщения пользователю
         
         Args:
             user_id: ID пользователя ВК
             message: Текст сообщения
-            keyboard: Клавиатура в формате словаря
+            keyboard: Готовый JSON клавиатуры или словарь
             
         Returns:
             bool: Успешность отправки
         """
         try:
             # Подготовка клавиатуры
-            keyboard_json = json.dumps(keyboard, ensure_ascii=False) if keyboard else None
+            if isinstance(keyboard, str):
+                keyboard_json = keyboard
+            else:
+                keyboard_json = json.dumps(keyboard, ensure_ascii=False) if keyboard else None
             
             # Генерация random_id на основе времени и user_id для уникальности
             random_id = int((datetime.now().timestamp() * 1000) + user_id)
             
-            # Отправка сообщения
-            await asyncio.get_event_loop().run_in_executor(
-                None,
-                lambda: self.vk.messages.send(
-                    user_id=user_id,
-                    message=message,
-                    random_id=random_id,
-                    keyboard=keyboard_json
-                )
-            )
+            # Отправка сообщения (не дольше остатка срока обработки)
+            with _VK_SEND_SECONDS.time():
+                await within(asyncio.get_event_loop().run_in_executor(
+                    None,
+                    lambda: self.vk.messages.send(
+                        user_id=user_id,
+                        message=message,
+                        random_id=random_id,
+                        keyboard=keyboard_json
+                    )
+                ))
             
-            logger.info(f"Сообщение отправлено пользователю {user_id}")
+            logger.info("Сообщение отправлено пользователю %s", user_id)
             return True
             
+        except DeadlineExceeded:
+            raise
+        except vk_api.exceptions.ApiError as e:
+            VK_API_ERRORS_TOTAL.labels(e.code).inc()
+            logger.error("Ошибка API VK при отправке сообщения пользователю %s: %s", user_id, e)
+            return False
         except Exception as e:
-            logger.error(f"Ошибка при отправке сообщения пользователю {user_id}: {e}")
+            ERRORS_TOTAL.labels("vk_send").inc()
+            logger.error("Ошибка при отправке сообщения пользователю %s: %s", user_id, e)
             return False
 
     async def get_user_info(self, user_id: int) -> Dict[str, Any]:
         """Получение информации о пользователе"""
         try:
-            user_info = await asyncio.get_event_loop().run_in_executor(
+            user_info = await within(asyncio.get_event_loop().run_in_executor(
                 None,
                 lambda: self.vk.users.get(user_ids=user_id)[0]
-            )
+            ))
             return user_info
+        except DeadlineExceeded:
+            raise
         except Exception as e:
-            logger.error(f"Ошибка при получении информации о пользователе {user_id}: {e}")
+            logger.error("Ошибка при получении информации о пользователе %s: %s", user_id, e)
             return {"first_name": "Пользователь", "last_name": ""}
 
     async def get_or_create_user_state(self, user_id: int) -> UserState:
         """
-        Получение или создание состояния пользователя
-        
-        Args:
-            user_id: ID пользователя ВК
-            
-        Returns:
-            UserState: Объект состояния пользователя
+        Получение состояния пользователя из базы или создание начального
+
+        Профиль ВК (users.get) запрашивается только для нового пользователя -
+        имя нужно лишь для приветствия.
         """
-        # Проверяем кэш
-        if user_id in self.user_states_cache:
-            return self.user_states_cache[user_id]
-        
-        # Пытаемся получить из БД
-        state = await self.storage.get_user_state(str(user_id))
-        
-        if not state:
-            # Получаем информацию о пользователе
-            user_info = await self.get_user_info(user_id)
-            
-            # Создаем новое состояние
-            state = UserState(
-                user_id=str(user_id),
-                state=DialogState.START.name,
-                context={
-                    "name": user_info["first_name"],
-                    "full_name": f"{user_info['first_name']} {user_info.get('last_name', '')}"
-                }
-            )
-            
-            # Сохраняем в БД
-            await self.storage.set_user_state(
-                str(user_id),
-                state.state,
-                state.context
-            )
-        
-        # Сохраняем в кэш
-        self.user_states_cache[user_id] = state
-        return state
-        
+        user_state = await self.storage.get_user_state(str(user_id))
+        if user_state:
+            return user_state
+
+        user_info = await self.get_user_info(user_id)
+        logger.info("Создаем новое состояние для пользователя %s", user_id)
+        await self.storage.set_user_state(
+            user_id=str(user_id),
+            state=DialogState.START.name,
+            context={"name": f"{user_info.get('first_name', '')} {user_info.get('last_name', '')}".strip()},
+            temp_data={}
+        )
+        return await self.storage.get_user_state(str(user_id))
+
     async def process_new_message(self, event) -> None:
         """Обработка нового сообщения"""
+        message = event.message
+        client_info = event.object.get("client_info") or {}
+        conversation_message_id = message.get("conversation_message_id")
+        await self._run_pipeline(MessageContext(
+            message.from_id,
+            message.text,
+            payload=message.get("payload"),
+            callback_supported="callback" in client_info.get("button_actions", ()),
+            event=event,
+            event_key=(
+                ("message", message.peer_id, conversation_message_id)
+                if conversation_message_id else None
+            )
+        ))
+
+    async def process_message_event(self, event) -> None:
+        """
+        Нажатие callback-кнопки (message_event)
+
+        Нажатие подтверждается на этапе ingest, чтобы у пользователя пропал
+        индикатор загрузки, затем обрабатывается как сообщение с полезной нагрузкой.
+        """
+        await self._run_pipeline(MessageContext(
+            event.object.user_id,
+            payload=event.object.payload,
+            callback_supported=True,
+            source="callback",
+            event=event,
+            event_key=("event", event.object.event_id)
+        ))
+
+    async def _process_coalesced(self, user_id: int, text: str, callback_supported: bool) -> None:
+        """Обработка склеенной серии сообщений"""
+        await self._run_pipeline(MessageContext(
+            user_id, text, callback_supported=callback_supported, source="coalesced"
+        ))
+
+    @contextmanager
+    def _interactive(self, user_id: int) -> Iterator[None]:
+        """Обработка входящего сообщения: фоновые отправки ждут ее окончания"""
+        self._active_inputs += 1
+        self._active_users[user_id] += 1
+        self._inputs_idle.clear()
         try:
-            # Получаем ID пользователя и текст сообщения
-            user_id = event.message.from_id
-            message_text = event.message.text
-            logger.info(f"Получено новое сообщение от пользователя {user_id}: {message_text}")
-
-            # Получаем информацию о пользователе
-            user_info = await self.get_user_info(user_id)
-            if not user_info:
-                logger.error(f"Не удалось получить информацию о пользователе {user_id}")
-                return
-
-            logger.info(f"Информация о пользователе {user_id}: {user_info}")
-
-            # Получаем текущее состояние пользователя
-            user_state = await self.storage.get_user_state(str(user_id))
-            if not user_state:
-                logger.info(f"Создаем новое состояние для пользователя {user_id}")
-                await self.storage.set_user_state(
-                    user_id=str(user_id),
-                    state=DialogState.START.name,
-                    context={"name": f"{user_info.get('first_name', '')} {user_info.get('last_name', '')}".strip()},
-                    temp_data={}
+            yield
+        finally:
+            self._active_inputs -= 1
+            self._active_users[user_id] -= 1
+            if not self._active_users[user_id]:
+                del self._active_users[user_id]
+            if not self._active_inputs:
+                self._inputs_idle.set()
+
+    async def _run_pipeline(self, ctx: MessageContext) -> None:
+        """
+        Прогон сообщения через конвейер
+
+        Обработка ограничена сроком DEADLINE_CONFIG['message_budget']: по его
+        истечении незавершенный этап отменяется, а пользователю уходит ответ
+        error.timeout. Ошибка любого этапа уходит в лог и Telegram.
+        """
+        with _INGEST_SECONDS.time(), self._interactive(ctx.user_id):
+            try:
+                async with deadline_scope(DEADLINE_CONFIG['message_budget']):
+                    await self.pipeline.run(ctx)
+            except DeadlineExceeded:
+                DEADLINE_EXCEEDED_TOTAL.labels(ctx.failed_stage or "unknown").inc()
+                logger.warning(
+                    "Сообщение пользователя %s не обработано за %g с, этап %s: %s",
+                    ctx.user_id, DEADLINE_CONFIG['message_budget'], ctx.failed_stage,
+                    ", ".join(f"{name} {seconds:.2f} с" for name, seconds in ctx.timings.items())
                 )
-                user_state = await self.storage.get_user_state(str(user_id))
+                await self._send_timeout_reply(ctx)
+            except Exception as e:
+                ERRORS_TOTAL.labels("message_processing").inc()
+                logger.error("Ошибка при обработке сообщения на этапе %s: %s", ctx.failed_stage, e, exc_info=True)
+                await self.telegram.notify_error("message_processing", {
+                    "user_id": ctx.user_id,
+                    "stage": ctx.failed_stage,
+                    "error": str(e)
+                })
 
-            logger.info(f"Текущее состояние пользователя {user_id}: {user_state.state}")
+    async def _send_timeout_reply(self, ctx: MessageContext) -> None:
+        """Короткий ответ пользователю, если сообщение не обработано в срок"""
+        if ctx.sent:
+            return
+        locale = ctx.user_state.context.get("locale") if ctx.user_state is not None else None
+        try:
+            async with deadline_scope(DEADLINE_CONFIG['fallback_timeout']):
+                await self.send_message(ctx.user_id, self.dialog_handler.templates.render("error.timeout", locale))
+        except DeadlineExceeded:
+            logger.error("Не удалось отправить ответ об ошибке пользователю %s: истек срок", ctx.user_id)
 
-            # Обрабатываем сообщение через DialogHandler
-            new_state, response_text, keyboard_data = await self.dialog_handler.handle_state(
-                user_state=user_state,
-                message=message_text
+    async def _stage_ingest(self, ctx: MessageContext) -> None:
+        """Прием события: подтверждение нажатия callback-кнопки"""
+        if ctx.source == "callback":
+            event = ctx.event
+            try:
+                await within(asyncio.get_running_loop().run_in_executor(
+                    None,
+                    lambda: self.vk.messages.sendMessageEventAnswer(
+                        event_id=event.object.event_id,
+                        user_id=ctx.user_id,
+                        peer_id=event.object.peer_id
+                    )
+                ))
+            except DeadlineExceeded:
+                raise
+            except Exception as e:
+                logger.error("Ошибка подтверждения нажатия кнопки пользователем %s: %s", ctx.user_id, e)
+        logger.info("Получено новое сообщение от пользователя %s: %s", ctx.user_id, ctx.text)
+
+    async def _stage_dedupe(self, ctx: MessageContext) -> None:
+        """Отсев повторно доставленных событий LongPoll"""
+        key = ctx.event_key
+        if key is None:
+            return
+        if key in self.recent_events:
+            self.recent_events.move_to_end(key)
+            logger.info("Повторное событие от пользователя %s пропущено", ctx.user_id)
+            ctx.stop("duplicate")
+            return
+        self.recent_events[key] = None
+        if len(self.recent_events) > PIPELINE_CONFIG['dedupe_size']:
+            self.recent_events.popitem(last=False)
+
+    async def _stage_throttle(self, ctx: MessageContext) -> None:
+        """Ограничение частоты и склейка серий свободного текста"""
+        if ctx.source == "coalesced":
+            # Серия уже прошла проверку частоты по частям
+            return
+        user_id = ctx.user_id
+        if not await self._admit(user_id):
+            ctx.stop("flood")
+            return
+        
+        # Описание задачи, присланное несколькими сообщениями подряд, обрабатывается одним вызовом
+        if (ctx.source == "message" and FLOOD_CONFIG['coalesce_window'] > 0 and user_id in self.text_input_users
+                and ctx.text and not ctx.payload and normalize_text(ctx.text) not in GLOBAL_COMMANDS):
+            self.coalescer.add(user_id, ctx.text, ctx.callback_supported)
+            ctx.stop("coalesced")
+            return
+        if user_id in self.coalescer:
+            await self.coalescer.flush(user_id)
+
+    async def _admit(self, user_id: int) -> bool:
+        """Проверка частоты сообщений пользователя; при заглушении - одно уведомление"""
+        decision = self.flood.check(user_id)
+        if decision is FloodDecision.ALLOW:
+            return True
+        if decision is FloodDecision.MUTE:
+            await self.send_message(
+                user_id,
+                self.dialog_handler.templates.render(
+                    "flood.muted", minutes=max(1, round(FLOOD_CONFIG['mute_seconds'] / 60))
+                )
             )
+        else:
+            logger.debug("Сообщение пользователя %s отброшено ограничением частоты (%s)", user_id, decision.value)
+        return False
 
-            logger.info(f"Новое состояние пользователя {user_id}: {new_state}")
-            logger.info(f"Подготовлен ответ для пользователя {user_id}: {response_text}")
+    async def _stage_state_load(self, ctx: MessageContext) -> None:
+        """Загрузка состояния пользователя"""
+        ctx.user_state = await self.get_or_create_user_state(ctx.user_id)
+        logger.info("Текущее состояние пользователя %s: %s", ctx.user_id, ctx.user_state.state)
 
-            # Обновляем состояние пользователя
-            await self.storage.set_user_state(
-                user_id=str(user_id),
-                state=new_state.name,
-                context=user_state.context,
-                temp_data=user_state.temp_data
+    async def _stage_handle(self, ctx: MessageContext) -> None:
+        """Обработка сообщения через DialogHandler"""
+        user_state = ctx.user_state
+        if user_state is None:
+            return
+        with DIALOG_STATE_SECONDS.labels(user_state.state).time():
+            ctx.new_state, ctx.response_text, ctx.keyboard_data = await self.dialog_handler.handle_state(
+                user_state=user_state,
+                message=ctx.text,
+                payload=ctx.payload
             )
+        logger.info("Новое состояние пользователя %s: %s", ctx.user_id, ctx.new_state)
+
+    async def _stage_persist(self, ctx: MessageContext) -> None:
+        """Сохранение нового состояния и таймеров пользователя"""
+        new_state = ctx.new_state
+        if new_state is None:
+            return
+        user_id = ctx.user_id
+        await self.storage.set_user_state(
+            user_id=str(user_id),
+            state=new_state.name,
+            context=ctx.user_state.context,
+            temp_data=ctx.user_state.temp_data
+        )
+        self._track_draft(user_id, new_state)
+        if new_state in COALESCE_STATES:
+            self.text_input_users.add(user_id)
+        else:
+            self.text_input_users.discard(user_id)
 
-            # Отправляем ответ пользователю
-            keyboard = await self.build_keyboard(new_state, keyboard_data)
-            await self.send_message(user_id, response_text, keyboard)
-            logger.info(f"Ответ успешно отправлен пользователю {user_id}")
+    async def _stage_render(self, ctx: MessageContext) -> None:
+        """Клавиатура ответа"""
+        if ctx.new_state is None:
+            return
+        ctx.keyboard = await self.build_keyboard(
+            ctx.new_state, ctx.keyboard_data, callback=ctx.callback_supported,
+            locale=ctx.user_state.context.get("locale")
+        )
 
-        except Exception as e:
-            logger.error(f"Ошибка при обработке сообщения: {str(e)}", exc_info=True)
-            if 'user_id' in locals():
-                await TelegramService.notify_error("message_processing", {
-                    "user_id": user_id,
-                    "error": str(e)
-                })
+    async def _stage_send(self, ctx: MessageContext) -> None:
+        """Отправка ответа пользователю"""
+        if ctx.response_text is None:
+            return
+        ctx.sent = await self.send_message(ctx.user_id, ctx.response_text, ctx.keyboard)
+        if ctx.sent:
+            logger.debug("Ответ успешно отправлен пользователю %s", ctx.user_id)
 
-    async def build_keyboard(self, state: DialogState, data: Dict[str, Any]) -> dict:
+    async def build_keyboard(self, state: DialogState, data: Dict[str, Any], callback: bool = False,
+                             locale: Optional[str] = None) -> str:
         """
         Создание клавиатуры для текущего состояния
         
+        Статические клавиатуры берутся из реестра готовыми, кнопки заявок
+        собираются из кэшированных фрагментов (см. dialogs.keyboard.KeyboardRegistry).
+        
         Args:
             state: Текущее состояние диалога
             data: Данные для формирования клавиатуры
+            callback: Клиент поддерживает callback-кнопки
+            locale: Язык подписей
             
         Returns:
-            dict: Клавиатура в формате VK API
+            str: JSON клавиатуры в формате VK API
         """
         try:
-            logger.debug(f"Создание клавиатуры для состояния {state} с данными {data}")
-            
-            buttons = []
-            
-            # Добавляем кнопки в зависимости от флагов
-            if data.get("show_start"):
-                buttons.extend(["Начать", "Помощь"])
-                
-            elif data.get("show_main_menu"):
-                buttons.extend([
-                    "Создать заявку",
-                    "Мои заявки",
-                    "Помощь"
-                ])
-                
-            elif data.get("show_service_types"):
-                buttons.extend([
-                    "Услуги Населению",
-                    "Услуги для Бизнеса",
-                    "Назад"
-                ])
-                
-            elif data.get("show_help"):
-                buttons.extend([
-                    "Создать заявку",
-                    "Мои заявки",
-                    "Назад в меню"
-                ])
-                
-            elif data.get("show_cancel"):
-                buttons.extend([
-                    "Да, отменить",
-                    "Нет, продолжить",
-                    "В главное меню"
-                ])
-                
-            elif data.get("show_error"):
-                buttons.extend([
-                    "Повторить",
-                    "Помощь",
-                    "В главное меню"
-                ])
-                
-            elif data.get("show_confirmation"):
-                buttons.extend([
-                    "Подтвердить",
-                    "Изменить",
-                    "Отменить"
-                ])
-                
-            elif data.get("show_back"):
-                buttons.extend(["Назад", "Отменить"])
-            
-            # Если кнопок нет, добавляем кнопку возврата в меню
-            if not buttons:
-                buttons.append("В главное меню")
-            
-            # Разбиваем кнопки на ряды по 2 кнопки
-            keyboard_buttons = []
-            row = []
-            
-            for btn in buttons:
-                row.append({
-                    "action": {
-                        "type": "text",
-                        "label": btn[:40]  # Ограничение VK API
-                    },
-                    "color": "primary" if btn not in ["Отменить", "Назад", "В главное меню"] else "secondary"
-                })
-                
-                if len(row) == 2:
-                    keyboard_buttons.append(row)
-                    row = []
-            
-            # Добавляем оставшиеся кнопки
-            if row:
-                keyboard_buttons.append(row)
-            
-            # Формируем клавиатуру
-            keyboard = {
-                "one_time": False,
-                "buttons": keyboard_buttons
-            }
-            
-            logger.debug(f"Создана клавиатура с кнопками: {buttons}")
-            return keyboard
-            
+            return self.keyboards.for_flags(data, locale or DEFAULT_LOCALE, callback)
         except Exception as e:
-            logger.error(f"Ошибка при создании клавиатуры: {e}", exc_info=True)
+            logger.error("Ошибка при создании клавиатуры для состояния %s: %s", state, e, exc_info=True)
             # Возвращаем базовую клавиатуру с кнопкой меню
-            return {
-                "one_time": False,
-                "buttons": [[{
-                    "action": {
-                        "type": "text",
-                        "label": "В главное меню"
-                    },
-                    "color": "secondary"
-                }]]
-            }
-
-    async def handle_cancel(self, user_id: int, user_state: UserState) -> None:
-        """Обработка отмены создания заявки"""
-        # Сбрасываем состояние
-        user_state.state = DialogState.MAIN_MENU.name
-        user_state.temp_data = {}
-        
-        # Сохраняем обновленное состояние
-        await self.storage.set_user_state(
+            return FALLBACK_KEYBOARD
+
+    def _track_draft(self, user_id: int, state: DialogState) -> None:
+        """Перезапуск таймера черновика на каждое сообщение; вне заполнения заявки - снятие"""
+        if DRAFT_CONFIG['ttl'] <= 0:
+            return
+        if state in DRAFT_STATES:
+            self.drafts.schedule(user_id, DRAFT_CONFIG['ttl'])
+        else:
+            self.drafts.cancel(user_id)
+
+    async def restore_drafts(self) -> None:
+        """Таймеры для черновиков, оставшихся в базе после перезапуска"""
+        if DRAFT_CONFIG['ttl'] <= 0:
+            return
+        users = await self.storage.get_users_in_states([state.name for state in DRAFT_STATES])
+        now = datetime.now()
+        for user_id, updated_at in users:
+            remaining = DRAFT_CONFIG['ttl'] - (now - updated_at).total_seconds()
+            self.drafts.schedule(int(user_id), max(remaining, 0))
+        if users:
+            logger.info("Восстановлено таймеров незаконченных заявок: %s", len(users))
+
+    async def expire_drafts(self) -> None:
+        """Удаление черновиков, у которых истек срок (замена сканирования всего кэша)"""
+        while True:
+            await asyncio.sleep(self.drafts.tick)
+            for user_id in self.drafts.advance():
+                try:
+                    await self._expire_draft(user_id)
+                except Exception as e:
+                    ERRORS_TOTAL.labels("draft_expiry").inc()
+                    logger.error("Ошибка удаления черновика заявки пользователя %s: %s", user_id, e, exc_info=True)
+
+    async def _expire_draft(self, user_id: int) -> None:
+        """
+        Удаление черновика по истечении срока
+
+        Сообщение пользователя могло прийти одновременно с таймером: если
+        оно еще в конвейере или в склейке серии, удаление откладывается на
+        новый срок. Состояние сбрасывается условным UPDATE, только если оно
+        не менялось с момента истечения срока, иначе сохраненный конвейером
+        ответ остается в силе.
+        """
+        if user_id in self._active_users or user_id in self.coalescer:
+            # Сообщение обрабатывается, persist конвейера заново поставит таймер
+            self.drafts.schedule(user_id, DRAFT_CONFIG['ttl'])
+            return
+        user_state = await self.storage.get_user_state(str(user_id))
+        if not user_state or DialogState[user_state.state] not in DRAFT_STATES:
+            return
+
+        expired = await self.storage.reset_stale_user_state(
             str(user_id),
-            user_state.state,
-            user_state.context
+            [state.name for state in DRAFT_STATES],
+            DialogState.MAIN_MENU.name,
+            updated_before=datetime.now() - timedelta(seconds=DRAFT_CONFIG['ttl'])
         )
+        if not expired:
+            return
+        self.text_input_users.discard(user_id)
+        logger.info("Черновик заявки пользователя %s удален по истечении %.0f с", user_id, DRAFT_CONFIG['ttl'])
         
-        # Отправляем сообщение
-        keyboard = await self.build_keyboard(
-            DialogState.MAIN_MENU,
-            {"show_main_menu": True}
-        )
-        await self.send_message(
-            user_id,
-            "Создание заявки отменено. Выберите действие:",
-            keyboard
-        )
-    async def handle_delete_order(self, user_id: int, user_state: UserState) -> None:
-        """Обработка удаления заявки"""
-        try:
-            order_id = user_state.temp_data.get("current_order_id")
-            if not order_id:
-                return
-            
-            # Получаем заявку перед удалением для уведомления
-            order = await self.storage.get_order(order_id)
-            if not order:
-                return
-                
-            # Удаляем заявку
-            deleted = await self.storage.delete_order(order_id)
-            if not deleted:
-                await self.send_message(
-                    user_id,
-                    "Не удалось удалить заявку. Попробуйте позже.",
-                    await self.build_keyboard(DialogState.VIEWING_ORDERS, {"show_orders_list": True})
-                )
-                return
-                
-            # Отправляем уведомление в Telegram
-            await TelegramService.notify_order_delete(order)
-            
-            # Отправляем подтверждение пользователю
-            keyboard = await self.build_keyboard(
-                DialogState.VIEWING_ORDERS,
-                {"show_orders_list": True}
-            )
-            await self.send_message(
+        if DRAFT_CONFIG['reminder']:
+            locale = user_state.context.get("locale")
+            self.queue_message(
                 user_id,
-                f"Заявка №{order_id} успешно удалена.",
-                keyboard
+                self.dialog_handler.templates.render("draft.expired", locale),
+                self.keyboards.for_flags({"show_main_menu": True}, locale or DEFAULT_LOCALE),
+                priority=PRIORITY_LOW
             )
-            
-        except Exception as e:
-            logger.error(f"Ошибка при удалении заявки: {e}")
-            await self.handle_error(user_id, e)
 
-    async def handle_error(self, user_id: int, error: str) -> None:
-        """Обработка ошибок при работе с сообщениями"""
-        try:
-            error_message = "Произошла ошибка при обработке вашего сообщения. Попробуйте еще раз или напишите /start для перезапуска бота."
-            await self.send_message(user_id, error_message)
-            
-            # Отправляем уведомление об ошибке в Telegram
-            await TelegramService.notify_error("message_processing", {
-                "user_id": user_id,
-                "error": str(error)
-            })
-        except Exception as e:
-            logger.error(f"Ошибка при обработке ошибки для пользователя {user_id}: {e}", exc_info=True)
-
-    async def cleanup_cache(self) -> None:
+    def queue_message(self, user_id: int, message: str, keyboard: Optional[Union[str, dict]] = None,
+                      priority: int = PRIORITY_NORMAL) -> bool:
         """
-        Периодическая очистка кэша состояний пользователей
+        Постановка фонового сообщения в очередь отправки
+        
+        Returns:
+            bool: False, если очередь переполнена и сообщение отброшено
         """
+        try:
+            self.send_queue.put_nowait((priority, next(self._send_seq), user_id, message, keyboard))
+        except asyncio.QueueFull:
+            logger.warning("Очередь отправки переполнена, сообщение пользователю %s отброшено", user_id)
+            return False
+        _SEND_QUEUE_DEPTH.set(self.send_queue.qsize())
+        return True
+
+    async def send_queued(self) -> None:
+        """Отправка фоновых сообщений по приоритету, когда нет входящих в обработке"""
         while True:
-            try:
-                await asyncio.sleep(3600)  # Очищаем раз в час
-                current_time = datetime.now()
-                
-                # Удаляем состояния пользователей, неактивных более 24 часов
-                to_remove = []
-                for user_id, state in self.user_states_cache.items():
-                    if (current_time - state.last_activity).total_seconds() > 86400:
-                        to_remove.append(user_id)
-                        
-                for user_id in to_remove:
-                    del self.user_states_cache[user_id]
-                    
-                logger.info(f"Очищено {len(to_remove)} неактивных состояний из кэша")
-                
-            except Exception as e:
-                logger.error(f"Ошибка при очистке кэша: {e}")
-                await asyncio.sleep(60)  # При ошибке ждем минуту перед повторной попыткой
+            _, _, user_id, message, keyboard = await self.send_queue.get()
+            _SEND_QUEUE_DEPTH.set(self.send_queue.qsize())
+            await self._inputs_idle.wait()
+            await self.send_message(user_id, message, keyboard)
 
     async def run(self) -> None:
         """
@@ -437,53 +588,71 @@ class VKService:
         logger.info("Запуск VK бота...")
         
         try:
-            # Запускаем задачу очистки кэша
-            self.cache_cleanup_task = asyncio.create_task(self.cleanup_cache())
+            # Запускаем таймеры незаконченных заявок и очередь фоновых сообщений
+            await self.restore_drafts()
+            self.draft_task = asyncio.create_task(self.expire_drafts())
+            self.send_queue_task = asyncio.create_task(self.send_queued())
+            # Отслеживаем изменения файлов локализации
+            self.localization.start()
+            
+            loop = asyncio.get_running_loop()
             
             # Проверяем подключение перед запуском
             try:
-                group_info = self.vk.groups.getById()[0]
-                logger.info(f"Подключение к VK API активно. Бот готов принимать сообщения в группе {group_info['name']}")
+                group_info = (await loop.run_in_executor(None, self.vk.groups.getById))[0]
+                self.last_poll_at = time.monotonic()
+                logger.info("Подключение к VK API активно. Бот готов принимать сообщения в группе %s", group_info['name'])
             except Exception as e:
-                logger.error(f"Ошибка подключения к VK API: {e}")
+                logger.error("Ошибка подключения к VK API: %s", e)
                 raise
             
             logger.info("Начинаю прослушивание событий...")
             
-            # Основной цикл прослушивания событий
+            # Основной цикл прослушивания событий. Запрос к LongPoll
+            # выполняется в пуле потоков, чтобы не блокировать цикл событий
             while True:
                 try:
-                    for event in self.longpoll.listen():
+                    events = await loop.run_in_executor(None, self.longpoll.check)
+                    self.last_poll_at = time.monotonic()
+                    for event in events:
                         if event.type == VkBotEventType.MESSAGE_NEW:
-                            logger.info(f"Получено новое сообщение от пользователя {event.message.from_id}")
-                            # Обрабатываем сообщение синхронно
+                            # Обрабатываем сообщение синхронно (запись в лог - на этапе ingest)
+                            logger.debug("Событие message_new от пользователя %s", event.message.from_id)
                             await self.process_new_message(event)
+                        elif event.type == VkBotEventType.MESSAGE_EVENT:
+                            logger.debug("Нажата callback-кнопка пользователем %s", event.object.user_id)
+                            await self.process_message_event(event)
                 except vk_api.exceptions.ApiError as e:
-                    logger.error(f"Ошибка API VK в цикле событий: {e}")
+                    VK_API_ERRORS_TOTAL.labels(e.code).inc()
+                    logger.error("Ошибка API VK в цикле событий: %s", e)
                     await asyncio.sleep(5)  # Ждем перед повторной попыткой
                 except Exception as e:
-                    logger.error(f"Ошибка при обработке событий: {e}", exc_info=True)
+                    logger.error("Ошибка при обработке событий: %s", e, exc_info=True)
                     await asyncio.sleep(5)  # Ждем перед повторной попыткой
                     
         except Exception as e:
-            logger.error(f"Критическая ошибка в работе бота: {e}", exc_info=True)
+            logger.error("Критическая ошибка в работе бота: %s", e, exc_info=True)
             raise
             
         finally:
-            # Останавливаем задачу очистки кэша
-            if self.cache_cleanup_task:
-                self.cache_cleanup_task.cancel()
+            await self._stop_background_tasks()
+
+    async def _stop_background_tasks(self) -> None:
+        """Остановка фоновых задач бота"""
+        # Отложенные серии сообщений обрабатываются до остановки
+        await self.coalescer.close()
+        for name in ("draft_task", "send_queue_task"):
+            task = getattr(self, name)
+            if task:
+                task.cancel()
                 try:
-                    await self.cache_cleanup_task
+                    await task
                 except asyncio.CancelledError:
                     pass
+                setattr(self, name, None)
+        await self.localization.stop()
 
     async def stop(self) -> None:
         """Остановка бота"""
         logger.info("Остановка VK бота...")
-        if self.cache_cleanup_task:
-            self.cache_cleanup_task.cancel()
-            try:
-                await self.cache_cleanup_task
-            except asyncio.CancelledError:
-                pass
\ No newline at end of file
+        await self._stop_background_tasks()
\ No newline at end of file
@@ -0,0 +1,166 @@
+import asyncio
+import logging
+import multiprocessing
+import os
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+class WorkerBoard:
+    """
+    Общая для процессов таблица состояния
+
+    Хранится в разделяемой памяти (multiprocessing.Array), поэтому каждый
+    процесс читает состояние остальных без обращения к ним. Ячейка 0 -
+    процесс VK бота, ячейки 1..N - веб-воркеры. Для каждой ячейки:
+    PID, время запуска, время последнего heartbeat, количество
+    перезапусков и время последнего успешного опроса LongPoll (только
+    для бота). Время - по часам системы, монотонные часы у процессов свои.
+    """
+
+    FIELDS = ("pid", "started_at", "heartbeat_at", "restarts", "last_poll_at")
+    BOT_SLOT = 0
+
+    def __init__(self, workers: int, context=None):
+        context = context or multiprocessing.get_context("spawn")
+        self.workers = workers
+        self._values = context.Array('d', (workers + 1) * len(self.FIELDS), lock=False)
+
+    def _index(self, slot: int, field: str) -> int:
+        return slot * len(self.FIELDS) + self.FIELDS.index(field)
+
+    def get(self, slot: int, field: str) -> float:
+        return self._values[self._index(slot, field)]
+
+    def set(self, slot: int, field: str, value: float) -> None:
+        self._values[self._index(slot, field)] = value
+
+    def mark_started(self, slot: int) -> None:
+        """Отметка о запуске процесса в ячейке"""
+        now = time.time()
+        self.set(slot, "pid", os.getpid())
+        self.set(slot, "started_at", now)
+        self.set(slot, "heartbeat_at", now)
+
+    def beat(self, slot: int) -> None:
+        """Heartbeat процесса"""
+        self.set(slot, "heartbeat_at", time.time())
+
+    def longpoll_age(self) -> Optional[float]:
+        """Секунд с последнего успешного опроса LongPoll ботом или None"""
+        last_poll_at = self.get(self.BOT_SLOT, "last_poll_at")
+        return time.time() - last_poll_at if last_poll_at else None
+
+    def snapshot(self) -> List[Dict[str, Any]]:
+        """Состояние всех процессов"""
+        now = time.time()
+        result = []
+        for slot in range(self.workers + 1):
+            heartbeat_at = self.get(slot, "heartbeat_at")
+            result.append({
+                "role": "bot" if slot == self.BOT_SLOT else "web",
+                "slot": slot,
+                "pid": int(self.get(slot, "pid")),
+                "uptime": round(now - self.get(slot, "started_at"), 1) if heartbeat_at else None,
+                "heartbeat_age": round(now - heartbeat_at, 1) if heartbeat_at else None,
+                "restarts": int(self.get(slot, "restarts"))
+            })
+        return result
+
+class WorkerSupervisor:
+    """
+    Запуск и перезапуск веб-воркеров
+
+    Каждый воркер - отдельный процесс (spawn) со своим циклом событий и
+    своими подключениями к базе; все воркеры слушают один порт через
+    SO_REUSEPORT, ядро распределяет между ними соединения. Упавший
+    воркер перезапускается с нарастающей задержкой.
+
+    Сам супервизор работает в процессе бота и заодно публикует в
+    WorkerBoard его heartbeat и время последнего опроса LongPoll.
+    """
+
+    def __init__(self, target: Callable[[int, WorkerBoard], None], count: int,
+                 longpoll_age_getter: Optional[Callable[[], Optional[float]]] = None,
+                 check_interval: float = 1.0, max_restart_delay: float = 30.0):
+        self.context = multiprocessing.get_context("spawn")
+        self.target = target
+        self.count = count
+        self.board = WorkerBoard(count, self.context)
+        self.longpoll_age_getter = longpoll_age_getter
+        self.check_interval = check_interval
+        self.max_restart_delay = max_restart_delay
+
+        self._processes: Dict[int, multiprocessing.Process] = {}
+        self._restart_at: Dict[int, float] = {}
+        self.monitor_task = None
+
+    def _spawn(self, slot: int) -> None:
+        process = self.context.Process(
+            target=self.target, args=(slot, self.board),
+            name=f"web-worker-{slot}", daemon=True
+        )
+        process.start()
+        self._processes[slot] = process
+        logger.info("Запущен веб-воркер %s (PID %s)", slot, process.pid)
+
+    def start(self) -> None:
+        """Запуск всех воркеров и наблюдения за ними"""
+        self.board.mark_started(WorkerBoard.BOT_SLOT)
+        for slot in range(1, self.count + 1):
+            self._spawn(slot)
+        if not self.monitor_task:
+            self.monitor_task = asyncio.create_task(self.monitor())
+
+    async def monitor(self) -> None:
+        """Перезапуск завершившихся воркеров"""
+        while True:
+            await asyncio.sleep(self.check_interval)
+            self._publish_bot_state()
+            now = time.monotonic()
+            for slot, process in list(self._processes.items()):
+                if process.is_alive():
+                    continue
+
+                if slot not in self._restart_at:
+                    restarts = int(self.board.get(slot, "restarts"))
+                    delay = min(self.max_restart_delay, 2 ** min(restarts, 5) * 0.5)
+                    logger.error(
+                        "Веб-воркер %s (PID %s) завершился с кодом %s, перезапуск через %.1f с",
+                        slot, process.pid, process.exitcode, delay
+                    )
+                    self._restart_at[slot] = now + delay
+                elif now >= self._restart_at[slot]:
+                    del self._restart_at[slot]
+                    self.board.set(slot, "restarts", self.board.get(slot, "restarts") + 1)
+                    self._spawn(slot)
+
+    def _publish_bot_state(self) -> None:
+        self.board.beat(WorkerBoard.BOT_SLOT)
+        age = self.longpoll_age_getter() if self.longpoll_age_getter else None
+        if age is not None:
+            self.board.set(WorkerBoard.BOT_SLOT, "last_poll_at", time.time() - age)
+
+    async def stop(self, timeout: float = 10.0) -> None:
+        """Остановка воркеров: SIGTERM, затем SIGKILL по таймауту"""
+        if self.monitor_task:
+            self.monitor_task.cancel()
+            try:
+                await self.monitor_task
+            except asyncio.CancelledError:
+                pass
+            self.monitor_task = None
+
+        for process in self._processes.values():
+            if process.is_alive():
+                process.terminate()
+
+        deadline = time.monotonic() + timeout
+        for process in self._processes.values():
+            remaining = max(0.0, deadline - time.monotonic())
+            await asyncio.get_running_loop().run_in_executor(None, process.join, remaining)
+            if process.is_alive():
+                logger.warning("Веб-воркер PID %s не завершился, принудительная остановка", process.pid)
+                process.kill()
+        self._processes.clear()
@@ -0,0 +1,3 @@
+# services импортируется раньше dialogs: dialogs.handlers обращается к
+# services.storage_service, и обратный порядок дает циклический импорт
+import services  # noqa: F401
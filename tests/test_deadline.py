@@ -0,0 +1,98 @@
+import asyncio
+import time
+
+import pytest
+
+from utils.deadline import (
+    DeadlineExceeded, bounded, current_deadline, deadline_scope, time_left, within
+)
+
+
+def test_without_scope_nothing_is_limited():
+    async def scenario():
+        assert current_deadline() is None
+        assert time_left() is None
+        assert time_left(5) == 5
+        return await within(asyncio.sleep(0, result="ok"))
+
+    assert asyncio.run(scenario()) == "ok"
+
+
+def test_zero_budget_disables_deadline():
+    async def scenario():
+        async with deadline_scope(0) as deadline:
+            assert deadline is None
+            assert current_deadline() is None
+
+    asyncio.run(scenario())
+
+
+def test_scope_raises_deadline_exceeded():
+    async def scenario():
+        async with deadline_scope(0.05):
+            await asyncio.sleep(1)
+
+    with pytest.raises(DeadlineExceeded):
+        asyncio.run(scenario())
+
+
+def test_scope_resets_contextvar():
+    async def scenario():
+        async with deadline_scope(10) as outer:
+            async with deadline_scope(1) as inner:
+                assert current_deadline() is inner
+                assert time_left() <= 1
+            assert current_deadline() is outer
+        assert current_deadline() is None
+
+    asyncio.run(scenario())
+
+
+def test_within_own_timeout_is_plain_timeout():
+    async def scenario():
+        async with deadline_scope(10):
+            await within(asyncio.sleep(1), timeout=0.05)
+
+    with pytest.raises(asyncio.TimeoutError) as info:
+        asyncio.run(scenario())
+    assert not isinstance(info.value, DeadlineExceeded)
+
+
+def test_within_limited_by_deadline():
+    async def scenario():
+        async with deadline_scope(0.05):
+            await within(asyncio.sleep(1), timeout=10)
+
+    with pytest.raises(DeadlineExceeded):
+        asyncio.run(scenario())
+
+
+def test_within_after_expiry_does_not_start_call():
+    started = []
+
+    async def call():
+        started.append(True)
+
+    async def scenario():
+        async with deadline_scope(0.01):
+            time.sleep(0.02)    # Срок истекает без точки ожидания
+            await within(call())
+
+    with pytest.raises(DeadlineExceeded):
+        asyncio.run(scenario())
+    assert started == []
+
+
+def test_bounded_decorator():
+    @bounded
+    async def slow(value):
+        await asyncio.sleep(0.2)
+        return value
+
+    async def scenario():
+        assert await slow(1) == 1
+        async with deadline_scope(0.05):
+            await slow(2)
+
+    with pytest.raises(DeadlineExceeded):
+        asyncio.run(scenario())
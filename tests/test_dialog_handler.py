@@ -0,0 +1,54 @@
+import asyncio
+
+from dialogs import state_machine
+from dialogs.handlers import DialogHandler
+from dialogs.intents import Intent, encode_payload
+from dialogs.states import DialogState
+from models.schemas import UserState
+
+
+class StubStorage:
+    def __init__(self):
+        self.created = []
+
+    async def create_order(self, **fields):
+        self.created.append(fields)
+        return len(self.created)
+
+
+def confirming_user() -> UserState:
+    return UserState(
+        user_id="1",
+        state=DialogState.ORDER_CONFIRMATION.name,
+        context={"name": "Иван"},
+        temp_data={"phone": "+79990000000", "task": "Настроить принтер"}
+    )
+
+
+def confirm(handler: DialogHandler, user_state: UserState):
+    return asyncio.run(handler.handle_state(user_state, "Подтвердить", encode_payload(Intent.CONFIRM)))
+
+
+def test_confirmation_creates_order():
+    storage = StubStorage()
+
+    state, _, _ = confirm(DialogHandler(storage), confirming_user())
+
+    assert state is DialogState.FINISHED
+    assert len(storage.created) == 1
+
+
+def test_invalid_transition_is_rejected_before_write(monkeypatch):
+    monkeypatch.setitem(
+        state_machine.ALLOWED_TRANSITIONS,
+        DialogState.ORDER_CONFIRMATION,
+        frozenset({DialogState.CHOOSING_SERVICE_TYPE})
+    )
+    storage = StubStorage()
+    user_state = confirming_user()
+
+    state, _, _ = confirm(DialogHandler(storage), user_state)
+
+    assert state is DialogState.ERROR_HANDLING
+    assert storage.created == []
+    assert user_state.temp_data["task"] == "Настроить принтер"
@@ -0,0 +1,54 @@
+from services.error_throttle import ErrorThrottle
+
+
+def test_limit_per_window_and_suppressed_count():
+    throttle = ErrorThrottle(limit=2, window=10)
+
+    assert throttle.check("db", "locked", now=0) == (True, 0)
+    assert throttle.check("db", "locked", now=1) == (True, 0)
+    assert throttle.check("db", "locked", now=2) == (False, 0)
+    assert throttle.check("db", "locked", now=3) == (False, 0)
+    # Первое уведомление вышло из окна: следующее проходит и сообщает о подавленных
+    assert throttle.check("db", "locked", now=11) == (True, 2)
+    assert (throttle.total, throttle.allowed, throttle.suppressed) == (5, 3, 2)
+
+
+def test_fingerprint_ignores_numbers_and_ids():
+    same = ErrorThrottle.fingerprint("vk", "User 123 not found, request 0x1f")
+    assert same == ErrorThrottle.fingerprint("vk", "user 456 not found, request 0xff")
+    assert same != ErrorThrottle.fingerprint("db", "user 123 not found, request 0x1f")
+    assert ErrorThrottle.normalize("id 6f1c2a9e-0b7d-4c3e-9a51-2d8e4f6a7b90 'x'") == "id <uuid> '<s>'"
+
+
+def test_grouped_errors_share_limit():
+    throttle = ErrorThrottle(limit=1, window=10)
+
+    assert throttle.check("vk", "timeout after 5s", now=0)[0] is True
+    assert throttle.check("vk", "timeout after 7s", now=1)[0] is False
+    assert throttle.check("vk", "connection reset", now=1)[0] is True
+
+
+def test_pop_summaries_after_window():
+    throttle = ErrorThrottle(limit=1, window=10)
+    throttle.check("db", "locked", now=0)
+    throttle.check("db", "locked", now=1)
+    throttle.check("db", "locked", now=2)
+
+    assert throttle.pop_summaries(now=5) == []
+    summaries = throttle.pop_summaries(now=10)
+    assert len(summaries) == 1
+    assert summaries[0]["error_type"] == "db"
+    assert summaries[0]["count"] == 2
+    assert summaries[0]["period"] == 10
+    # Сводка отправляется один раз
+    assert throttle.pop_summaries(now=30) == []
+
+
+def test_fingerprints_are_bounded():
+    throttle = ErrorThrottle(limit=1, window=10, max_fingerprints=2)
+    for error_type in ("a", "b", "c"):
+        throttle.check(error_type, "error", now=0)
+
+    stats = throttle.get_stats()
+    assert stats["fingerprints"] == len(throttle) == 2
+    assert {item["error_type"] for item in stats["top"]} == {"b", "c"}
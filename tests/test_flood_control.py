@@ -0,0 +1,113 @@
+import asyncio
+
+from services.flood_control import FloodControl, FloodDecision, MessageCoalescer
+
+
+def test_flood_control_drops_then_mutes():
+    flood = FloodControl(rate=1, burst=2, mute_after=2, mute_seconds=10)
+
+    decisions = [flood.check(1, now=0) for _ in range(4)]
+
+    assert decisions == [FloodDecision.ALLOW, FloodDecision.ALLOW, FloodDecision.DROP, FloodDecision.MUTE]
+    assert flood.is_muted(1, now=5)
+    assert flood.check(1, now=5) is FloodDecision.MUTED
+    assert flood.check(1, now=11) is FloodDecision.ALLOW
+    assert not flood.is_muted(1, now=11)
+
+
+def test_flood_control_allowed_message_resets_strikes():
+    flood = FloodControl(rate=1, burst=1, mute_after=2, mute_seconds=10)
+
+    assert flood.check(1, now=0) is FloodDecision.ALLOW
+    assert flood.check(1, now=0) is FloodDecision.DROP
+    assert flood.check(1, now=1) is FloodDecision.ALLOW
+    assert flood.check(1, now=1) is FloodDecision.DROP
+
+
+def test_flood_control_users_are_independent():
+    flood = FloodControl(rate=1, burst=1, mute_after=0, mute_seconds=10)
+
+    assert flood.check(1, now=0) is FloodDecision.ALLOW
+    assert flood.check(2, now=0) is FloodDecision.ALLOW
+    # mute_after=0 - не глушить
+    assert [flood.check(1, now=0) for _ in range(5)] == [FloodDecision.DROP] * 5
+
+
+class Recorder:
+    def __init__(self, delay: float = 0):
+        self.delay = delay
+        self.events = []
+
+    async def __call__(self, user_id, text, *args):
+        self.events.append(("start", user_id, text, args))
+        await asyncio.sleep(self.delay)
+        self.events.append(("end", user_id, text, args))
+
+    @property
+    def texts(self):
+        return [event[2] for event in self.events if event[0] == "start"]
+
+
+def test_coalescer_joins_series():
+    async def scenario():
+        handler = Recorder()
+        coalescer = MessageCoalescer(handler, window=0.05, max_wait=1)
+        coalescer.add(1, "первая", "arg")
+        coalescer.add(1, "вторая", "other")
+        assert 1 in coalescer
+        await asyncio.sleep(0.15)
+        assert 1 not in coalescer
+        return handler
+
+    handler = asyncio.run(scenario())
+
+    assert handler.events == [("start", 1, "первая\nвторая", ("arg",)), ("end", 1, "первая\nвторая", ("arg",))]
+
+
+def test_coalescer_respects_max_wait():
+    async def scenario():
+        handler = Recorder()
+        coalescer = MessageCoalescer(handler, window=0.05, max_wait=0.1)
+        for part in range(6):
+            coalescer.add(1, str(part))
+            await asyncio.sleep(0.03)
+        await coalescer.close()
+        return handler
+
+    texts = asyncio.run(scenario()).texts
+
+    # Паузы короче окна, но серия не копится дольше max_wait
+    assert len(texts) > 1
+    assert "\n".join(texts).split("\n") == [str(part) for part in range(6)]
+
+
+def test_flush_runs_pending_after_in_flight_series_once():
+    async def scenario():
+        handler = Recorder(delay=0.1)
+        coalescer = MessageCoalescer(handler, window=0.02, max_wait=1)
+        coalescer.add(1, "a")
+        await asyncio.sleep(0.05)       # Серия "a" обрабатывается
+        coalescer.add(1, "b")
+        coalescer.add(1, "c")
+        await coalescer.flush(1)
+        await asyncio.sleep(0.2)        # Таймер серии снят и не сработает повторно
+        return handler, coalescer
+
+    handler, coalescer = asyncio.run(scenario())
+
+    assert [(kind, text) for kind, _, text, _ in handler.events] == [
+        ("start", "a"), ("end", "a"), ("start", "b\nc"), ("end", "b\nc")
+    ]
+    assert 1 not in coalescer
+
+
+def test_close_processes_pending_series():
+    async def scenario():
+        handler = Recorder()
+        coalescer = MessageCoalescer(handler, window=10, max_wait=10)
+        coalescer.add(1, "a")
+        coalescer.add(2, "b")
+        await coalescer.close()
+        return handler
+
+    assert sorted(asyncio.run(scenario()).texts) == ["a", "b"]
@@ -0,0 +1,108 @@
+import asyncio
+
+from aiohttp import web
+from aiohttp.test_utils import TestClient, TestServer
+
+from web.middlewares import IdempotencyCache, create_idempotency_middleware
+
+
+def make_app(statuses, delay=0.0):
+    """Приложение с /submit: ответы по очереди из statuses, затем 200"""
+    calls = []
+
+    async def submit(request):
+        calls.append(request.get("idempotency_key"))
+        await asyncio.sleep(delay)
+        status = statuses.pop(0) if statuses else 200
+        return web.json_response({"call": len(calls)}, status=status)
+
+    app = web.Application(middlewares=[create_idempotency_middleware(IdempotencyCache(ttl=60), ["/submit"])])
+    app.router.add_post("/submit", submit)
+    return app, calls
+
+
+async def post(client, body, key="key-1"):
+    response = await client.post("/submit", data=body, headers={"Idempotency-Key": key} if key else {})
+    return response.status, await response.json(), response.headers.get("Idempotent-Replayed")
+
+
+def run(app, scenario):
+    async def main():
+        async with TestClient(TestServer(app)) as client:
+            return await scenario(client)
+    return asyncio.run(main())
+
+
+def test_replay_returns_stored_response():
+    app, calls = make_app([])
+
+    async def scenario(client):
+        return await post(client, b'{"a": 1}'), await post(client, b'{"a": 1}')
+
+    first, second = run(app, scenario)
+
+    assert first == (200, {"call": 1}, None)
+    assert second == (200, {"call": 1}, "true")
+    assert calls == ["key-1"]
+
+
+def test_same_key_with_other_body_is_rejected():
+    app, calls = make_app([])
+
+    async def scenario(client):
+        await post(client, b'{"a": 1}')
+        return await post(client, b'{"a": 2}')
+
+    status, body, _ = run(app, scenario)
+
+    assert status == 422
+    assert "error" in body
+    assert len(calls) == 1
+
+
+def test_concurrent_requests_wait_for_first():
+    app, calls = make_app([], delay=0.1)
+
+    async def scenario(client):
+        return await asyncio.gather(*(post(client, b"{}") for _ in range(3)))
+
+    results = run(app, scenario)
+
+    assert [status for status, _, _ in results] == [200, 200, 200]
+    assert {body["call"] for _, body, _ in results} == {1}
+    assert len(calls) == 1
+
+
+def test_waiter_runs_request_when_first_fails():
+    app, calls = make_app([500], delay=0.1)
+
+    async def scenario(client):
+        return await asyncio.gather(*(post(client, b"{}") for _ in range(3)))
+
+    statuses = sorted(status for status, _, _ in run(app, scenario))
+
+    # Ошибка не сохраняется: один из ожидавших выполняет запрос сам, с тем же ключом
+    assert statuses == [200, 200, 500]
+    assert calls == ["key-1", "key-1"]
+
+
+def test_requests_without_key_are_not_cached():
+    app, calls = make_app([])
+
+    async def scenario(client):
+        return await post(client, b"{}", key=None), await post(client, b"{}", key=None)
+
+    first, second = run(app, scenario)
+
+    assert (first[1], second[1]) == ({"call": 1}, {"call": 2})
+    assert calls == [None, None]
+
+
+def test_too_long_key():
+    app, calls = make_app([])
+
+    async def scenario(client):
+        return await post(client, b"{}", key="x" * 200)
+
+    assert run(app, scenario)[0] == 400
+    assert calls == []
@@ -0,0 +1,118 @@
+import random
+
+import pytest
+
+from dialogs.intents import (
+    BUTTON_INTENTS, Intent, IntentMatcher, bounded_distance, decode_payload, encode_payload, normalize_text
+)
+from dialogs.keyboard import FLAG_BUTTONS, STATE_FLAGS
+from dialogs.states import DialogState
+
+
+def levenshtein(a: str, b: str) -> int:
+    previous = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, 1):
+        current = [i]
+        for j, char_b in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (char_a != char_b)))
+        previous = current
+    return previous[-1]
+
+
+@pytest.fixture(scope="module")
+def matcher():
+    return IntentMatcher()
+
+
+@pytest.mark.parametrize("a, b, limit, expected", [
+    ("", "", 1, 0),
+    ("заявки", "заявки", 2, 0),
+    ("заявки", "заявкм", 2, 1),
+    ("kitten", "sitting", 3, 3),
+    ("kitten", "sitting", 2, 3),
+    ("меню", "помощь", 2, 3),
+    ("а", "абвгд", 2, 3),
+])
+def test_bounded_distance(a, b, limit, expected):
+    assert bounded_distance(a, b, limit) == expected
+    assert bounded_distance(b, a, limit) == expected
+
+
+def test_bounded_distance_matches_full_levenshtein():
+    rng = random.Random(41)
+    for _ in range(500):
+        a = "".join(rng.choice("абв") for _ in range(rng.randint(0, 8)))
+        b = "".join(rng.choice("абв") for _ in range(rng.randint(0, 8)))
+        limit = rng.randint(0, 3)
+        assert bounded_distance(a, b, limit) == min(levenshtein(a, b), limit + 1)
+
+
+def test_normalize_text():
+    assert normalize_text("  Мои   ЗАЯВКИ!! ") == "мои заявки"
+    assert normalize_text("Ещё") == "еще"
+    assert normalize_text(None) == ""
+
+
+def test_exact_match(matcher):
+    match = matcher.match(DialogState.MAIN_MENU, normalize_text("Мои заявки"))
+
+    assert match.intent is Intent.MY_ORDERS
+    assert match.method == "exact"
+
+
+def test_keyword_match(matcher):
+    match = matcher.match(DialogState.MAIN_MENU, normalize_text("хочу оставить заявку"))
+
+    assert match.intent is Intent.CREATE_ORDER
+    assert match.method == "keyword"
+
+
+def test_fuzzy_match(matcher):
+    match = matcher.match(DialogState.MAIN_MENU, normalize_text("помошь"))
+
+    assert match.intent is Intent.HELP
+    assert match.method == "fuzzy"
+
+
+@pytest.mark.parametrize("state", list(STATE_FLAGS))
+def test_tables_follow_sent_keyboards(matcher, state):
+    sent = {BUTTON_INTENTS[normalize_text(label)] for label in FLAG_BUTTONS[STATE_FLAGS[state]]
+            if normalize_text(label) in BUTTON_INTENTS}
+
+    assert sent <= matcher.intents_for(state)
+
+
+def test_fuzzy_match_sent_back_button(matcher):
+    match = matcher.match(DialogState.CHOOSING_SERVICE_TYPE, normalize_text("Назат"))
+
+    assert match.intent is Intent.BACK
+
+
+def test_free_text_states_skip_fuzzy(matcher):
+    assert matcher.match(DialogState.PERSONAL_TASK_INPUT, normalize_text("помошь")) is None
+
+
+def test_unknown_text(matcher):
+    assert matcher.match(DialogState.MAIN_MENU, normalize_text("как дела")) is None
+    assert matcher.match(DialogState.MAIN_MENU, "") is None
+
+
+def test_payload_round_trip(matcher):
+    match = matcher.match_payload(encode_payload(Intent.OPEN_ORDER, id=42))
+
+    assert match.intent is Intent.OPEN_ORDER
+    assert match.method == "payload"
+    assert match.args == {"id": 42}
+
+
+def test_decode_payload_variants():
+    assert decode_payload({"command": "start"}) == (Intent.START, {})
+    assert decode_payload('{"a": "menu"}') == (Intent.MENU, {})
+    assert decode_payload('{"a": "unknown"}') is None
+    assert decode_payload("not json") is None
+    assert decode_payload(None) is None
+
+
+def test_encode_payload_length_limit():
+    with pytest.raises(ValueError):
+        encode_payload(Intent.OPEN_ORDER, note="x" * 300)
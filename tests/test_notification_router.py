@@ -0,0 +1,81 @@
+import asyncio
+
+from services.notification_router import HttpJsonSink, NotificationRouter, NotificationSink, TelegramWebhookSink
+
+
+class FakeSink(NotificationSink):
+    def __init__(self, name, results=(True,), **kwargs):
+        super().__init__(name, **kwargs)
+        self.results = list(results)
+        self.sent = []
+
+    async def send(self, session, event_type, message, payload) -> bool:
+        self.sent.append((event_type, message))
+        result = self.results.pop(0) if len(self.results) > 1 else self.results[0]
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+
+def dispatch(router, event_type, skip=()):
+    return asyncio.run(router.dispatch(None, event_type, "текст", skip=skip))
+
+
+def test_routes_with_wildcard():
+    telegram, ops = FakeSink("telegram"), FakeSink("ops")
+    router = NotificationRouter([telegram, ops], {"*": ["telegram"], "order_created": ["ops"]})
+
+    assert [sink.name for sink in router.sinks_for("order_created")] == ["ops", "telegram"]
+    assert [sink.name for sink in router.sinks_for("order_updated")] == ["telegram"]
+
+
+def test_dispatch_reports_each_sink_and_skips_delivered():
+    good, bad = FakeSink("good"), FakeSink("bad", results=[RuntimeError("сбой")])
+    router = NotificationRouter([good, bad], {"*": ["good", "bad"]})
+
+    assert dispatch(router, "order_created") == {"good": True, "bad": False}
+    assert dispatch(router, "order_created", skip={"good"}) == {"bad": False}
+    assert len(good.sent) == 1
+    assert dispatch(router, "order_created", skip={"good", "bad"}) == {}
+
+
+def test_is_complete_ignores_optional_sinks():
+    router = NotificationRouter(
+        [FakeSink("telegram"), FakeSink("crm", required=False)],
+        {"*": ["telegram", "crm"]}
+    )
+
+    assert router.is_complete("order_created", {"telegram"})
+    assert not router.is_complete("order_created", {"crm"})
+    assert not NotificationRouter([], {}).is_complete("order_created", set())
+
+
+def test_circuit_opens_after_failures():
+    sink = FakeSink("flaky", results=[False], failure_threshold=2, reset_timeout=60)
+    router = NotificationRouter([sink], {"*": ["flaky"]})
+
+    dispatch(router, "error")
+    assert sink.circuit_state == "closed"
+    dispatch(router, "error")
+    assert sink.circuit_state == "open"
+
+    # Пока цепь разомкнута, запросы не выполняются
+    dispatch(router, "error")
+    assert len(sink.sent) == 2
+    assert sink.get_stats()["requests_failed"] == 3
+
+
+def test_from_config():
+    router = NotificationRouter.from_config([
+        {"name": "telegram", "url": "https://example.org/tg"},
+        {"name": "crm", "type": "http", "url": "https://example.org/crm", "events": ["order_created"],
+         "required": False, "headers": {"X-Token": "1"}},
+        {"name": "skipped", "url": ""}
+    ])
+
+    assert isinstance(router.sinks["telegram"], TelegramWebhookSink)
+    assert isinstance(router.sinks["crm"], HttpJsonSink)
+    assert router.sinks["crm"].headers == {"X-Token": "1"}
+    assert router.sinks["crm"].required is False
+    assert "skipped" not in router.sinks
+    assert router.routes == {"*": ["telegram"], "order_created": ["crm"]}
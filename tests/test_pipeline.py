@@ -0,0 +1,97 @@
+import asyncio
+
+import pytest
+
+from services.pipeline import MessageContext, Pipeline
+
+
+def stage(name, calls, stop=None, error=None):
+    async def run(ctx: MessageContext) -> None:
+        calls.append(name)
+        if error is not None:
+            raise error
+        if stop is not None:
+            ctx.stop(stop)
+    return run
+
+
+def run(pipeline: Pipeline, ctx: MessageContext = None) -> MessageContext:
+    return asyncio.run(pipeline.run(ctx or MessageContext(1, "текст")))
+
+
+def test_stages_run_in_order_and_record_timings():
+    calls = []
+    pipeline = Pipeline([(name, stage(name, calls)) for name in ("a", "b", "c")])
+
+    ctx = run(pipeline)
+
+    assert calls == ["a", "b", "c"]
+    assert list(ctx.timings) == ["a", "b", "c"]
+    assert ctx.stopped is None
+
+
+def test_stop_ends_processing_after_current_stage():
+    calls = []
+    pipeline = Pipeline([
+        ("a", stage("a", calls)),
+        ("b", stage("b", calls, stop="duplicate")),
+        ("c", stage("c", calls))
+    ])
+
+    ctx = run(pipeline)
+
+    assert calls == ["a", "b"]
+    assert ctx.stopped == "duplicate"
+
+
+def test_exception_sets_failed_stage():
+    calls = []
+    pipeline = Pipeline([
+        ("a", stage("a", calls)),
+        ("b", stage("b", calls, error=RuntimeError("сбой"))),
+        ("c", stage("c", calls))
+    ])
+    ctx = MessageContext(1)
+
+    with pytest.raises(RuntimeError):
+        run(pipeline, ctx)
+
+    assert calls == ["a", "b"]
+    assert ctx.failed_stage == "b"
+    assert "b" in ctx.timings
+
+
+def test_skip_and_unskip():
+    calls = []
+    pipeline = Pipeline([(name, stage(name, calls)) for name in ("a", "b", "c")], skip=["b"])
+
+    assert pipeline.names == ["a", "b", "c"]
+    assert pipeline.active == ["a", "c"]
+    run(pipeline)
+    assert calls == ["a", "c"]
+
+    pipeline.skip("b", False)
+    assert pipeline.active == ["a", "b", "c"]
+
+
+def test_insert_replace_remove():
+    calls = []
+    pipeline = Pipeline([("a", stage("a", calls)), ("c", stage("c", calls))])
+
+    pipeline.insert("b", stage("b", calls), before="c")
+    pipeline.insert("d", stage("d", calls), after="c")
+    pipeline.replace("a", stage("A", calls))
+    pipeline.remove("d")
+    run(pipeline)
+
+    assert pipeline.names == ["a", "b", "c"]
+    assert calls == ["A", "b", "c"]
+
+
+def test_insert_errors():
+    pipeline = Pipeline([("a", stage("a", []))])
+
+    with pytest.raises(ValueError):
+        pipeline.insert("a", stage("a", []))
+    with pytest.raises(KeyError):
+        pipeline.insert("b", stage("b", []), after="missing")
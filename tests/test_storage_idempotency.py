@@ -0,0 +1,107 @@
+import asyncio
+import sqlite3
+from contextlib import closing
+
+import pytest
+
+from services import storage_service
+from services.storage_service import StorageService
+
+
+@pytest.fixture
+def storage(tmp_path, monkeypatch):
+    monkeypatch.setattr(storage_service, "DATABASE_PATH", tmp_path / "orders.db")
+    return StorageService()
+
+
+def order(task="Настроить принтер", key=None):
+    data = {"user_id": "website", "name": "Иван", "phone": "89991234567", "task": task}
+    if key is not None:
+        data["idempotency_key"] = key
+    return data
+
+
+def count_orders(storage):
+    with closing(sqlite3.connect(storage.db_path)) as db:
+        return db.execute("SELECT COUNT(*) FROM orders").fetchone()[0]
+
+
+def test_create_order_repeats_return_same_id(storage):
+    async def scenario():
+        first = await storage.create_order(**order(), idempotency_key="k1")
+        again = await storage.create_order(**order(), idempotency_key="k1")
+        other = await storage.create_order(**order(), idempotency_key="k2")
+        return first, again, other
+
+    first, again, other = asyncio.run(scenario())
+
+    assert first == again
+    assert other != first
+
+
+def test_create_order_expired_key_creates_new_order(storage):
+    async def scenario():
+        first = await storage.create_order(**order(), idempotency_key="k1")
+        await asyncio.sleep(0.01)
+        second = await storage.create_order(**order(), idempotency_key="k1", idempotency_ttl=0)
+        return first, second
+
+    first, second = asyncio.run(scenario())
+
+    assert first != second
+
+
+def test_batch_dedupes_within_batch(storage):
+    orders = [order("a", "a"), order("b", "b"), order("a2", "a"), order("none"), order("c", "c"), order("b2", "b")]
+
+    batch = asyncio.run(storage.create_orders_batch(orders))
+    ids = batch.order_ids
+
+    assert ids[0] == ids[2]
+    assert ids[1] == ids[5]
+    assert len(set(ids)) == 4
+    assert batch.replayed == [False, False, True, False, False, True]
+    assert batch.created == 4
+    assert count_orders(storage) == 4
+
+
+def test_batch_reuses_keys_from_earlier_orders(storage):
+    async def scenario():
+        existing = await storage.create_order(**order(), idempotency_key="known")
+        batch = await storage.create_orders_batch([order(key="known"), order(key="new")])
+        return existing, batch
+
+    existing, batch = asyncio.run(scenario())
+
+    assert batch.order_ids[0] == existing
+    assert batch.order_ids[1] != existing
+    assert batch.replayed == [True, False]
+    assert count_orders(storage) == 2
+
+
+def test_batch_ignores_expired_keys(storage):
+    async def scenario():
+        existing = await storage.create_order(**order(), idempotency_key="old")
+        await asyncio.sleep(0.01)
+        batch = await storage.create_orders_batch([order(key="old")], idempotency_ttl=0)
+        return existing, batch
+
+    existing, batch = asyncio.run(scenario())
+
+    assert batch.order_ids[0] != existing
+    assert batch.replayed == [False]
+
+
+def test_batch_key_lookup_is_chunked(storage, monkeypatch):
+    monkeypatch.setattr(StorageService, "KEY_LOOKUP_CHUNK", 3)
+
+    async def scenario():
+        first = await storage.create_orders_batch([order(key=f"k{index}") for index in range(10)])
+        again = await storage.create_orders_batch([order(key=f"k{index}") for index in range(10)])
+        return first, again
+
+    first, again = asyncio.run(scenario())
+
+    assert first.order_ids == again.order_ids
+    assert again.created == 0
+    assert count_orders(storage) == 10
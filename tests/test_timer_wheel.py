@@ -0,0 +1,70 @@
+from utils.timer_wheel import TimerWheel
+
+
+def test_timer_fires_at_deadline():
+    wheel = TimerWheel(tick=1.0, now=0)
+    wheel.schedule("a", 5, now=0)
+
+    assert wheel.advance(now=4.9) == []
+    assert wheel.advance(now=5) == ["a"]
+    assert "a" not in wheel
+    assert len(wheel) == 0
+
+
+def test_reschedule_moves_timer():
+    wheel = TimerWheel(tick=1.0, now=0)
+    wheel.schedule("a", 5, now=0)
+    wheel.schedule("a", 5, now=3)
+
+    assert len(wheel) == 1
+    assert wheel.advance(now=6) == []
+    assert wheel.advance(now=8) == ["a"]
+
+
+def test_cancel():
+    wheel = TimerWheel(tick=1.0, now=0)
+    wheel.schedule("a", 5, now=0)
+
+    assert wheel.cancel("a") is True
+    assert wheel.cancel("a") is False
+    assert wheel.advance(now=10) == []
+
+
+def test_short_delay_takes_at_least_one_tick():
+    wheel = TimerWheel(tick=1.0, now=0)
+    wheel.schedule("a", 0, now=0)
+
+    assert wheel.advance(now=0.5) == []
+    assert wheel.advance(now=1) == ["a"]
+
+
+def test_long_delays_cascade_from_upper_wheels():
+    # bits=2: нижнее колесо - 4 тика, следующее - 16, затем 64
+    wheel = TimerWheel(tick=1.0, bits=2, levels=3, now=0)
+    delays = {"near": 3, "middle": 10, "far": 50}
+    for key, delay in delays.items():
+        wheel.schedule(key, delay, now=0)
+
+    fired = {}
+    for second in range(1, 64):
+        for key in wheel.advance(now=second):
+            fired[key] = second
+
+    assert fired == delays
+
+
+def test_delay_beyond_range_is_capped():
+    wheel = TimerWheel(tick=1.0, bits=2, levels=2, now=0)
+    wheel.schedule("a", 1000, now=0)
+
+    assert wheel.advance(now=14) == []
+    assert wheel.advance(now=15) == ["a"]
+
+
+def test_many_keys_expire_in_order():
+    wheel = TimerWheel(tick=1.0, now=0)
+    for key in range(100):
+        wheel.schedule(key, key + 1, now=0)
+
+    assert wheel.advance(now=50) == list(range(50))
+    assert len(wheel) == 50
@@ -1,8 +1,14 @@
 from .helpers import PhoneNumberHelper, DateTimeHelper, TextHelper, OrderHelper
+from .rate_limit import TokenBucket, KeyedRateLimiter
+from .metrics import MetricsRegistry, metrics
 
 __all__ = [
     'PhoneNumberHelper',
     'DateTimeHelper',
     'TextHelper',
-    'OrderHelper'
+    'OrderHelper',
+    'TokenBucket',
+    'KeyedRateLimiter',
+    'MetricsRegistry',
+    'metrics'
 ]
\ No newline at end of file
@@ -0,0 +1,136 @@
+"""
+Бюджет времени на обработку входящего сообщения
+
+deadline_scope задает срок для всего, что выполняется внутри: срок
+хранится в contextvar и виден вложенным вызовам VKService, StorageService
+и TelegramService без передачи параметром. Каждый вызов ввода-вывода
+ждет не дольше оставшегося времени (within), а по истечении срока
+незавершенная работа отменяется и поднимается DeadlineExceeded.
+
+Пример:
+```python
+async with deadline_scope(15):
+    user_state = await storage.get_user_state(user_id)     # @bounded
+    info = await within(loop.run_in_executor(None, fetch))  # Остаток срока
+```
+"""
+
+import asyncio
+import functools
+import inspect
+import time
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from typing import Any, AsyncIterator, Awaitable, Callable, Optional, TypeVar
+
+T = TypeVar("T")
+
+class DeadlineExceeded(asyncio.TimeoutError):
+    """Срок обработки сообщения истек"""
+
+class Deadline:
+    """Срок по time.monotonic()"""
+
+    __slots__ = ("budget", "expires_at")
+
+    def __init__(self, budget: float, now: Optional[float] = None):
+        self.budget = budget
+        self.expires_at = (time.monotonic() if now is None else now) + budget
+
+    def remaining(self) -> float:
+        return self.expires_at - time.monotonic()
+
+    @property
+    def expired(self) -> bool:
+        return self.remaining() <= 0
+
+_CURRENT: ContextVar[Optional[Deadline]] = ContextVar("deadline", default=None)
+
+def current_deadline() -> Optional[Deadline]:
+    return _CURRENT.get()
+
+def time_left(default: Optional[float] = None) -> Optional[float]:
+    """Остаток срока, но не больше default (None - срок не задан и default нет)"""
+    deadline = _CURRENT.get()
+    if deadline is None:
+        return default
+    left = deadline.remaining()
+    return left if default is None else min(left, default)
+
+@asynccontextmanager
+async def deadline_scope(budget: Optional[float]) -> AsyncIterator[Optional[Deadline]]:
+    """
+    Срок на выполнение блока
+
+    Вложенная область задает новый срок (отдельное сообщение - отдельный
+    бюджет). По истечении срока текущая задача отменяется в точке
+    ожидания, блок завершается DeadlineExceeded.
+
+    Args:
+        budget: Бюджет, сек; None или 0 - без срока
+    """
+    if not budget or budget <= 0:
+        yield None
+        return
+
+    deadline = Deadline(budget)
+    token = _CURRENT.set(deadline)
+    try:
+        async with asyncio.timeout(budget):
+            yield deadline
+    except asyncio.TimeoutError as e:
+        if isinstance(e, DeadlineExceeded) or not deadline.expired:
+            raise
+        raise DeadlineExceeded(f"Истек срок обработки {budget:.1f} с") from None
+    finally:
+        _CURRENT.reset(token)
+
+def _discard(awaitable: Awaitable[Any]) -> None:
+    """Отмена ожидания, которое не будет запущено"""
+    if inspect.iscoroutine(awaitable):
+        awaitable.close()
+    elif isinstance(awaitable, asyncio.Future):
+        # Для run_in_executor отменяет и еще не начатую задачу пула
+        awaitable.cancel()
+
+async def within(awaitable: Awaitable[T], timeout: Optional[float] = None) -> T:
+    """
+    Ожидание не дольше остатка срока (и не дольше timeout)
+
+    Raises:
+        DeadlineExceeded: Срок сообщения истек
+        asyncio.TimeoutError: Истек собственный timeout вызова
+    """
+    deadline = _CURRENT.get()
+    limit = timeout
+    by_deadline = False
+    if deadline is not None:
+        left = deadline.remaining()
+        if limit is None or left <= limit:
+            limit = left
+            by_deadline = True
+    if limit is None:
+        return await awaitable
+
+    if limit <= 0:
+        _discard(awaitable)
+        if by_deadline:
+            raise DeadlineExceeded("Срок обработки истек до вызова")
+        raise asyncio.TimeoutError()
+
+    try:
+        async with asyncio.timeout(limit):
+            return await awaitable
+    except asyncio.TimeoutError as e:
+        if by_deadline and not isinstance(e, DeadlineExceeded):
+            raise DeadlineExceeded(f"Истек срок обработки {deadline.budget:.1f} с") from None
+        raise
+
+def bounded(func: Callable[..., Awaitable[T]]) -> Callable[..., Awaitable[T]]:
+    """Декоратор корутины: вызов ограничен остатком текущего срока"""
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs) -> T:
+        if _CURRENT.get() is None:
+            return await func(*args, **kwargs)
+        return await within(func(*args, **kwargs))
+    return wrapper
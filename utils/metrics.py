@@ -0,0 +1,294 @@
+"""
+Метрики в текстовом формате Prometheus
+
+Счетчики, гистограммы и датчики без внешних зависимостей. Дочерние
+метрики для значений меток создаются один раз и кэшируются, поэтому
+на горячем пути остаются только сложение и поиск корзины (bisect),
+без блокировок: все обновления идут из одного цикла событий.
+"""
+
+import time
+from bisect import bisect_left
+from functools import wraps
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+# Корзины гистограмм задержек, секунды
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+                   0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+def _format_value(value: float) -> str:
+    if value == float('inf'):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+def _escape(value: str) -> str:
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+class _Metric:
+    """Базовый класс метрики с метками"""
+
+    type_name = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[Tuple[str, ...], object] = {}
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def labels(self, *values) -> object:
+        """Дочерняя метрика для значений меток (создается при первом обращении)"""
+        key = tuple(str(value) for value in values)
+        child = self._children.get(key)
+        if child is None:
+            if len(key) != len(self.labelnames):
+                raise ValueError(f"Метрика {self.name} ожидает метки {self.labelnames}")
+            child = self._new_child()
+            self._children[key] = child
+        return child
+
+    def _default(self):
+        return self.labels()
+
+    def _collect(self) -> List[str]:
+        raise NotImplementedError
+
+    def render(self) -> List[str]:
+        return [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.type_name}",
+            *self._collect()
+        ]
+
+class _ValueChild:
+    """Значение счетчика или датчика"""
+
+    __slots__ = ("value", "_function")
+
+    def __init__(self):
+        self.value = 0.0
+        self._function: Optional[Callable[[], float]] = None
+
+    def inc(self, amount: float = 1.0) -> None:
+        self.value += amount
+
+    def dec(self, amount: float = 1.0) -> None:
+        self.value -= amount
+
+    def set(self, value: float) -> None:
+        self.value = value
+
+    def set_function(self, function: Callable[[], float]) -> None:
+        """Значение вычисляется при сборе метрик (для уже существующих счетчиков)"""
+        self._function = function
+
+    def get(self) -> float:
+        return float(self._function()) if self._function else self.value
+
+class Counter(_Metric):
+    """Монотонный счетчик"""
+
+    type_name = "counter"
+
+    def _new_child(self) -> _ValueChild:
+        return _ValueChild()
+
+    def inc(self, amount: float = 1.0) -> None:
+        self._default().inc(amount)
+
+    def _collect(self) -> List[str]:
+        return [
+            f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(child.get())}"
+            for key, child in self._children.items()
+        ]
+
+class Gauge(Counter):
+    """Датчик: значение может расти и уменьшаться"""
+
+    type_name = "gauge"
+
+    def set(self, value: float) -> None:
+        self._default().set(value)
+
+    def set_function(self, function: Callable[[], float]) -> None:
+        self._default().set_function(function)
+
+class _HistogramChild:
+    """Корзины одной гистограммы"""
+
+    __slots__ = ("bounds", "counts", "sum")
+
+    def __init__(self, bounds: Tuple[float, ...]):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.sum += value
+
+    def time(self) -> "_Timer":
+        """Замер времени блока: with histogram.labels(...).time(): ..."""
+        return _Timer(self)
+
+class _Timer:
+    __slots__ = ("child", "started")
+
+    def __init__(self, child: _HistogramChild):
+        self.child = child
+
+    def __enter__(self) -> "_Timer":
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.child.observe(time.perf_counter() - self.started)
+
+class Histogram(_Metric):
+    """Гистограмма с фиксированными корзинами"""
+
+    type_name = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def _new_child(self) -> _HistogramChild:
+        return _HistogramChild(self.buckets)
+
+    def observe(self, value: float) -> None:
+        self._default().observe(value)
+
+    def time(self) -> _Timer:
+        return self._default().time()
+
+    def timed(self, *values) -> Callable:
+        """
+        Декоратор для корутин: время выполнения записывается
+        в гистограмму с указанными значениями меток
+        """
+        child = self.labels(*values)
+
+        def decorator(func):
+            @wraps(func)
+            async def wrapper(*args, **kwargs):
+                started = time.perf_counter()
+                try:
+                    return await func(*args, **kwargs)
+                finally:
+                    child.observe(time.perf_counter() - started)
+            return wrapper
+        return decorator
+
+    def _collect(self) -> List[str]:
+        lines = []
+        for key, child in self._children.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), child.counts):
+                cumulative += count
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(child.sum)}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+class MetricsRegistry:
+    """Реестр метрик приложения"""
+
+    CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+
+    def _register(self, metric_class, name: str, *args, **kwargs):
+        metric = self._metrics.get(name)
+        if metric is None:
+            metric = metric_class(name, *args, **kwargs)
+            self._metrics[name] = metric
+        elif type(metric) is not metric_class:
+            raise ValueError(f"Метрика {name} уже зарегистрирована с другим типом")
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter, name, documentation, labelnames)
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self._register(Gauge, name, documentation, labelnames)
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram, name, documentation, labelnames, buckets=buckets)
+
+    def render(self) -> str:
+        """Все метрики в текстовом формате Prometheus"""
+        lines = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+# Общий реестр приложения
+metrics = MetricsRegistry()
+
+# Задержки этапов обработки сообщения ВК (ingest, state_load, vk_send, ...)
+STAGE_SECONDS = metrics.histogram(
+    "vkbot_stage_seconds", "Длительность этапов обработки", ["stage"]
+)
+# Обработка состояния диалога
+DIALOG_STATE_SECONDS = metrics.histogram(
+    "vkbot_dialog_state_seconds", "Длительность DialogHandler.handle_state по состоянию", ["state"]
+)
+# Методы StorageService
+STORAGE_SECONDS = metrics.histogram(
+    "vkbot_storage_seconds", "Длительность вызовов StorageService", ["method"]
+)
+# Доставка уведомлений по приемникам
+NOTIFY_SECONDS = metrics.histogram(
+    "vkbot_notify_seconds", "Длительность отправки уведомления в приемник", ["sink"]
+)
+# Загрузка файлов локализации (при запуске и перезагрузке)
+LOCALE_RELOAD_SECONDS = metrics.histogram(
+    "vkbot_locale_reload_seconds", "Длительность загрузки файлов локализации"
+)
+ERRORS_TOTAL = metrics.counter(
+    "vkbot_errors_total", "Ошибки по компонентам", ["component"]
+)
+VK_API_ERRORS_TOTAL = metrics.counter(
+    "vkbot_vk_api_errors_total", "Ошибки VK API по коду", ["code"]
+)
+CACHE_REQUESTS_TOTAL = metrics.counter(
+    "vkbot_cache_requests_total", "Обращения к кэшам", ["cache", "result"]
+)
+# Уведомления: приемники и подавление повторяющихся ошибок (значения читаются при сборе)
+NOTIFY_REQUESTS_TOTAL = metrics.counter(
+    "vkbot_notify_requests_total", "Запросы к приемникам уведомлений", ["sink"]
+)
+NOTIFY_FAILURES_TOTAL = metrics.counter(
+    "vkbot_notify_failures_total", "Неудачные отправки в приемники, включая отказы предохранителя", ["sink"]
+)
+NOTIFY_CIRCUIT_OPEN = metrics.gauge(
+    "vkbot_notify_circuit_open", "Предохранитель приемника разомкнут (1) или нет (0)", ["sink"]
+)
+ERROR_NOTIFICATIONS_TOTAL = metrics.counter(
+    "vkbot_error_notifications_total", "Уведомления об ошибках: отправленные и подавленные как повторы", ["result"]
+)
+ERROR_FINGERPRINTS = metrics.gauge(
+    "vkbot_error_fingerprints", "Отпечатков ошибок в памяти ErrorThrottle"
+)
+QUEUE_DEPTH = metrics.gauge(
+    "vkbot_queue_depth", "Размер очередей", ["queue"]
+)
+DEADLINE_EXCEEDED_TOTAL = metrics.counter(
+    "vkbot_deadline_exceeded_total", "Сообщения, не обработанные за отведенное время, по этапу", ["stage"]
+)
@@ -0,0 +1,83 @@
+import time
+from collections import OrderedDict
+from typing import Hashable, Optional, Tuple
+
+class TokenBucket:
+    """
+    Ведро токенов: rate токенов в секунду, не больше capacity
+
+    Пополнение считается лениво при каждой проверке,
+    фоновые таймеры не нужны.
+    """
+
+    __slots__ = ("rate", "capacity", "tokens", "updated")
+
+    def __init__(self, rate: float, capacity: float, now: Optional[float] = None):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic() if now is None else now
+
+    def consume(self, cost: float = 1.0, now: Optional[float] = None) -> Tuple[bool, float]:
+        """
+        Попытка списать токены
+
+        Returns:
+            Tuple[bool, float]:
+            - Удалось ли списать токены
+            - Через сколько секунд их станет достаточно (0, если списаны)
+        """
+        now = time.monotonic() if now is None else now
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+        if self.tokens >= cost:
+            self.tokens -= cost
+            return True, 0.0
+        if self.rate <= 0:
+            return False, float('inf')
+        return False, (cost - self.tokens) / self.rate
+
+class KeyedRateLimiter:
+    """
+    Набор ведер токенов по ключу (IP-адрес, ID пользователя)
+
+    Количество ведер ограничено: при переполнении вытесняются
+    давно не использовавшиеся ключи.
+    """
+
+    def __init__(self, rate: float, burst: float, max_keys: int = 10000):
+        self.rate = rate
+        self.burst = burst
+        self.max_keys = max_keys
+        self._buckets: "OrderedDict[Hashable, TokenBucket]" = OrderedDict()
+
+        # Счетчики для мониторинга
+        self.allowed = 0
+        self.limited = 0
+
+    def allow(self, key: Hashable, cost: float = 1.0, now: Optional[float] = None) -> Tuple[bool, float]:
+        """
+        Проверка лимита для ключа
+
+        Returns:
+            Tuple[bool, float]: Разрешено ли действие и сколько секунд ждать при отказе
+        """
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = TokenBucket(self.rate, self.burst, now)
+            self._buckets[key] = bucket
+            if len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end(key)
+
+        allowed, retry_after = bucket.consume(cost, now)
+        if allowed:
+            self.allowed += 1
+        else:
+            self.limited += 1
+        return allowed, retry_after
+
+    def __len__(self) -> int:
+        return len(self._buckets)
@@ -0,0 +1,129 @@
+import math
+import time
+from typing import Dict, Hashable, List, Optional
+
+class _Timer:
+    __slots__ = ("key", "deadline", "level", "slot")
+
+    def __init__(self, key: Hashable, deadline: int):
+        self.key = key
+        self.deadline = deadline   # Тик срабатывания
+        self.level = 0
+        self.slot = 0
+
+class TimerWheel:
+    """
+    Иерархическое колесо таймеров с ключами
+
+    levels колес по 2**bits ячеек: нижнее колесо отсчитывает тики, каждое
+    следующее - полные обороты предыдущего. Постановка, сброс и отмена
+    таймера - O(1): таймер кладется в ячейку по своему тику срабатывания.
+    При обороте нижнего колеса таймеры из очередной ячейки верхнего
+    переносятся ниже, поэтому за тик обрабатываются только ячейки, до
+    которых дошла очередь. Память - по числу активных таймеров.
+
+    На один ключ - один таймер: повторный schedule переносит его.
+
+    Пример:
+    ```python
+    wheel = TimerWheel(tick=1.0)
+    wheel.schedule(user_id, 1800)       # Сработает через 30 минут
+    wheel.schedule(user_id, 1800)       # Сброс: отсчет заново
+    expired = wheel.advance()           # Ключи, у которых истек срок
+    ```
+    """
+
+    def __init__(self, tick: float = 1.0, bits: int = 6, levels: int = 4, now: Optional[float] = None):
+        """
+        Args:
+            tick: Длительность тика, сек
+            bits: log2 числа ячеек в колесе
+            levels: Число колес; дальше tick * 2**(bits*levels) сек таймеры не откладываются
+        """
+        self.tick = tick
+        self.bits = bits
+        self.mask = (1 << bits) - 1
+        self.levels = levels
+        self.max_ticks = (1 << (bits * levels)) - 1
+        self._wheels: List[List[Dict[Hashable, _Timer]]] = [
+            [{} for _ in range(1 << bits)] for _ in range(levels)
+        ]
+        self._timers: Dict[Hashable, _Timer] = {}
+        self._origin = time.monotonic() if now is None else now
+        self._current = 0   # Последний обработанный тик
+
+    def __len__(self) -> int:
+        return len(self._timers)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._timers
+
+    def _place(self, timer: _Timer) -> None:
+        delta = timer.deadline - self._current
+        level = 0
+        while level < self.levels - 1 and delta >= (1 << (self.bits * (level + 1))):
+            level += 1
+        timer.level = level
+        timer.slot = (timer.deadline >> (self.bits * level)) & self.mask
+        self._wheels[level][timer.slot][timer.key] = timer
+
+    def schedule(self, key: Hashable, delay: float, now: Optional[float] = None) -> None:
+        """Поставить (или переставить) таймер ключа через delay секунд"""
+        now = time.monotonic() if now is None else now
+        self.cancel(key)
+        ticks = max(1, math.ceil((now - self._origin + delay) / self.tick) - self._current)
+        timer = _Timer(key, self._current + min(ticks, self.max_ticks))
+        self._timers[key] = timer
+        self._place(timer)
+
+    def cancel(self, key: Hashable) -> bool:
+        """Снять таймер ключа; False, если таймера не было"""
+        timer = self._timers.pop(key, None)
+        if timer is None:
+            return False
+        del self._wheels[timer.level][timer.slot][key]
+        return True
+
+    def _cascade(self, level: int) -> None:
+        """Перенос таймеров из текущей ячейки колеса level на нижние колеса"""
+        slot = (self._current >> (self.bits * level)) & self.mask
+        bucket = self._wheels[level][slot]
+        if not bucket:
+            return
+        self._wheels[level][slot] = {}
+        for timer in bucket.values():
+            self._place(timer)
+
+    def advance(self, now: Optional[float] = None) -> List[Hashable]:
+        """
+        Прокрутка колеса до текущего времени
+
+        Returns:
+            List[Hashable]: Ключи сработавших таймеров (они снимаются)
+        """
+        now = time.monotonic() if now is None else now
+        target = int((now - self._origin) // self.tick)
+        expired: List[Hashable] = []
+        if not self._timers:
+            # Пустое колесо прокручивать незачем
+            self._current = max(self._current, target)
+            return expired
+
+        while self._current < target:
+            self._current += 1
+            # На границе оборота колеса опускаем таймеры с верхних колес
+            level = 1
+            while level < self.levels and (self._current & ((1 << (self.bits * level)) - 1)) == 0:
+                self._cascade(level)
+                level += 1
+
+            slot = self._current & self.mask
+            bucket = self._wheels[0][slot]
+            if bucket:
+                self._wheels[0][slot] = {}
+                for key, timer in bucket.items():
+                    del self._timers[key]
+                    expired.append(key)
+            if not self._timers:
+                self._current = target
+        return expired
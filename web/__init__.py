@@ -0,0 +1,11 @@
+from .middlewares import IdempotencyCache, create_idempotency_middleware, create_rate_limit_middleware
+from .orders_api import OrdersApi
+from .order_feed import OrderFeed
+
+__all__ = [
+    'IdempotencyCache',
+    'create_idempotency_middleware',
+    'create_rate_limit_middleware',
+    'OrdersApi',
+    'OrderFeed'
+]
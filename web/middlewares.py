@@ -0,0 +1,192 @@
+"""
+Middleware веб-приложения
+
+Выполняются до обработчика, то есть до разбора JSON и обращения к базе:
+- rate_limit: ограничение частоты запросов с одного IP (429 Too Many Requests)
+- idempotency: повтор запроса с тем же Idempotency-Key возвращает сохраненный ответ
+  (с другим телом запроса - 422 Unprocessable Entity)
+"""
+
+import asyncio
+import hashlib
+import logging
+import math
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, Iterable, Optional, Tuple
+
+from aiohttp import web
+
+from utils.rate_limit import KeyedRateLimiter
+
+logger = logging.getLogger(__name__)
+
+Handler = Callable[[web.Request], Awaitable[web.StreamResponse]]
+
+IDEMPOTENCY_HEADER = "Idempotency-Key"
+MAX_IDEMPOTENCY_KEY_LENGTH = 128
+
+def get_client_ip(request: web.Request, trust_proxy: bool = False) -> str:
+    """IP-адрес клиента с учетом прокси"""
+    if trust_proxy:
+        forwarded = request.headers.get("X-Forwarded-For")
+        if forwarded:
+            return forwarded.split(",")[0].strip()
+    return request.remote or "unknown"
+
+def create_rate_limit_middleware(limiter: KeyedRateLimiter, paths: Iterable[str],
+                                 trust_proxy: bool = False):
+    """
+    Middleware ограничения частоты POST-запросов по IP
+
+    Args:
+        limiter: Набор ведер токенов по IP
+        paths: Пути, к которым применяется ограничение
+        trust_proxy: Брать IP из X-Forwarded-For
+    """
+    limited_paths = frozenset(paths)
+
+    @web.middleware
+    async def rate_limit_middleware(request: web.Request, handler: Handler) -> web.StreamResponse:
+        if request.method != "POST" or request.path not in limited_paths:
+            return await handler(request)
+
+        client_ip = get_client_ip(request, trust_proxy)
+        allowed, retry_after = limiter.allow(client_ip)
+        if not allowed:
+            logger.warning("Превышен лимит запросов к %s с %s", request.path, client_ip)
+            return web.json_response(
+                {"error": "Слишком много запросов, попробуйте позже"},
+                status=429,
+                headers={"Retry-After": str(max(1, math.ceil(min(retry_after, 3600))))}
+            )
+        return await handler(request)
+
+    return rate_limit_middleware
+
+class IdempotencyCache:
+    """
+    Ограниченный по размеру кэш ответов по ключу идемпотентности
+
+    Хранит только успешные ответы вместе с хэшем тела запроса, чтобы
+    отличить повтор от другого запроса с тем же ключом. Параллельные
+    запросы с одним ключом ждут завершения первого (claim/release),
+    а не выполняются повторно.
+    """
+
+    def __init__(self, ttl: float, max_size: int = 10000):
+        self.ttl = ttl
+        self.max_size = max_size
+        self._responses: "OrderedDict[str, Tuple[float, str, int, bytes, str]]" = OrderedDict()
+        self._in_flight: Dict[str, asyncio.Future] = {}
+
+        # Счетчики для мониторинга
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str) -> Optional[Tuple[str, int, bytes, str]]:
+        """Сохраненный ответ (хэш тела запроса, статус, тело, тип содержимого) или None"""
+        item = self._responses.get(key)
+        if item is None:
+            self.misses += 1
+            return None
+        expires_at, fingerprint, status, body, content_type = item
+        if expires_at < time.monotonic():
+            del self._responses[key]
+            self.misses += 1
+            return None
+        self._responses.move_to_end(key)
+        self.hits += 1
+        return fingerprint, status, body, content_type
+
+    def put(self, key: str, fingerprint: str, status: int, body: bytes, content_type: str) -> None:
+        """Сохранение ответа"""
+        self._responses[key] = (time.monotonic() + self.ttl, fingerprint, status, body, content_type)
+        self._responses.move_to_end(key)
+        while len(self._responses) > self.max_size:
+            self._responses.popitem(last=False)
+
+    def claim(self, key: str) -> Optional[asyncio.Future]:
+        """
+        Отметка о начале выполнения запроса с ключом
+
+        Returns:
+            Optional[asyncio.Future]: None - ключ занят этим запросом (после
+            выполнения нужно вызвать release); иначе - ожидание завершения
+            уже выполняющегося запроса, после которого claim повторяется
+        """
+        in_flight = self._in_flight.get(key)
+        if in_flight is not None:
+            return in_flight
+        self._in_flight[key] = asyncio.get_running_loop().create_future()
+        return None
+
+    def release(self, key: str) -> None:
+        """Завершение запроса, занявшего ключ: ожидающие продолжают"""
+        future = self._in_flight.pop(key, None)
+        if future is not None and not future.done():
+            future.set_result(None)
+
+def create_idempotency_middleware(cache: IdempotencyCache, paths: Iterable[str]):
+    """
+    Middleware обработки заголовка Idempotency-Key
+
+    Повтор в пределах TTL получает тот же ответ из памяти. Запрос с тем же
+    ключом, но другим телом отклоняется с 422. Ключ также передается
+    обработчику через request["idempotency_key"], чтобы сохранить его
+    в SQLite вместе с заявкой: так повторы распознаются и после перезапуска.
+
+    Args:
+        cache: Кэш ответов
+        paths: Пути, к которым применяется обработка
+    """
+    idempotent_paths = frozenset(paths)
+
+    def replay(cached: Tuple[str, int, bytes, str], fingerprint: str) -> web.Response:
+        stored_fingerprint, status, body, content_type = cached
+        if stored_fingerprint != fingerprint:
+            return web.json_response(
+                {"error": "Idempotency-Key уже использован с другим телом запроса"}, status=422
+            )
+        return web.Response(
+            status=status, body=body, content_type=content_type,
+            headers={"Idempotent-Replayed": "true"}
+        )
+
+    @web.middleware
+    async def idempotency_middleware(request: web.Request, handler: Handler) -> web.StreamResponse:
+        if request.method != "POST" or request.path not in idempotent_paths:
+            return await handler(request)
+
+        key = request.headers.get(IDEMPOTENCY_HEADER)
+        if not key:
+            return await handler(request)
+        if len(key) > MAX_IDEMPOTENCY_KEY_LENGTH:
+            return web.json_response({"error": "Слишком длинный Idempotency-Key"}, status=400)
+
+        # Ключ действует в пределах одного пути
+        cache_key = f"{request.path}:{key}"
+        # Тело читается один раз и кэшируется aiohttp, обработчик получит его же
+        fingerprint = hashlib.sha256(await request.read()).hexdigest()
+
+        while True:
+            cached = cache.get(cache_key)
+            if cached:
+                return replay(cached, fingerprint)
+            # Такой же запрос уже выполняется - ждем его результат; если он
+            # завершился без сохраненного ответа, выполняем запрос сами
+            in_flight = cache.claim(cache_key)
+            if in_flight is None:
+                break
+            await asyncio.shield(in_flight)
+
+        try:
+            request["idempotency_key"] = key
+            response = await handler(request)
+            if 200 <= response.status < 300 and isinstance(response, web.Response) and response.body is not None:
+                cache.put(cache_key, fingerprint, response.status, response.body, response.content_type)
+            return response
+        finally:
+            cache.release(cache_key)
+
+    return idempotency_middleware
@@ -0,0 +1,306 @@
+"""
+Лента событий заявок для операторов
+
+GET /api/orders/feed     - Server-Sent Events
+GET /api/orders/feed/ws  - WebSocket (сообщения в JSON)
+
+Источник событий - таблица outbox: каждое создание, изменение и удаление
+заявки записывается туда в одной транзакции с самой заявкой, а ID записи
+служит ID события. Клиент может продолжить с места обрыва, передав
+Last-Event-ID (заголовок или параметр last_event_id).
+
+Одна фоновая задача читает outbox и кодирует каждое событие один раз,
+готовые байты раздаются всем подписчикам. У каждого подписчика своя
+ограниченная очередь: если клиент не успевает читать, он отключается,
+а не копит события в памяти.
+"""
+
+import asyncio
+import hmac
+import json
+import logging
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Set
+
+from aiohttp import web, WSMsgType
+
+from config.config import FEED_CONFIG, OPERATOR_API_CONFIG
+from models.schemas import OutboxEntry
+from services.storage_service import StorageService
+
+logger = logging.getLogger(__name__)
+
+# Событий outbox за один запрос к базе
+FETCH_BATCH = 500
+
+class FeedEvent:
+    """Событие ленты, закодированное для SSE и WebSocket"""
+
+    __slots__ = ("id", "sse", "json")
+
+    def __init__(self, entry: OutboxEntry):
+        self.id = entry.id
+        data = json.dumps({
+            "id": entry.id,
+            "type": entry.event_type,
+            "created_at": entry.created_at.isoformat(),
+            **entry.payload
+        }, ensure_ascii=False, default=str)
+        self.json = data
+        self.sse = f"id: {entry.id}\nevent: {entry.event_type}\ndata: {data}\n\n".encode("utf-8")
+
+class _Subscriber:
+    """Подписчик ленты с ограниченной очередью"""
+
+    __slots__ = ("queue",)
+
+    def __init__(self, size: int):
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=size)
+
+class OrderFeed:
+    """Рассылка событий заявок подписчикам"""
+
+    def __init__(self, storage: StorageService, config: Optional[Dict[str, Any]] = None,
+                 token: Optional[str] = None):
+        config = config or FEED_CONFIG
+        self.storage = storage
+        self.token = OPERATOR_API_CONFIG['token'] if token is None else token
+        self.client_buffer = config['client_buffer']
+        self.max_backfill = config['max_backfill']
+        self.max_clients = config['max_clients']
+        self.heartbeat = config['heartbeat']
+        self.poll_interval = config['poll_interval']
+
+        self._history: Deque[FeedEvent] = deque(maxlen=config['history_size'])
+        self._subscribers: Set[_Subscriber] = set()
+        self.last_id = 0
+        self.feed_task = None
+
+        # Счетчики для мониторинга
+        self.events_total = 0
+        self.dropped_clients = 0
+
+    def register(self, app: web.Application) -> None:
+        """Подключение маршрутов ленты и фоновой задачи к приложению"""
+        if not self.token:
+            logger.info("Лента событий отключена: не задан OPERATOR_API_TOKEN")
+            return
+        app.router.add_get('/api/orders/feed', self.handle_sse)
+        app.router.add_get('/api/orders/feed/ws', self.handle_websocket)
+        app.cleanup_ctx.append(self._lifecycle)
+
+    async def _lifecycle(self, app: web.Application):
+        self.start()
+        yield
+        await self.stop()
+
+    def start(self) -> None:
+        """Запуск чтения outbox"""
+        if not self.feed_task:
+            self.feed_task = asyncio.create_task(self.run())
+
+    async def stop(self) -> None:
+        """Остановка чтения outbox и отключение подписчиков"""
+        if self.feed_task:
+            self.feed_task.cancel()
+            try:
+                await self.feed_task
+            except asyncio.CancelledError:
+                pass
+            self.feed_task = None
+        for subscriber in list(self._subscribers):
+            self._drop(subscriber)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Количество подписчиков и событий"""
+        return {
+            "clients": len(self._subscribers),
+            "events_total": self.events_total,
+            "dropped_clients": self.dropped_clients,
+            "last_id": self.last_id
+        }
+
+    async def run(self) -> None:
+        """Чтение новых событий outbox и рассылка подписчикам"""
+        signal = self.storage.subscribe_outbox()
+        try:
+            self.last_id = await self.storage.get_last_outbox_id()
+            logger.info("Запуск ленты событий заявок с события %s", self.last_id)
+            while True:
+                try:
+                    signal.clear()
+                    entries = await self.storage.get_outbox_since(self.last_id, FETCH_BATCH)
+                    for entry in entries:
+                        self._publish(FeedEvent(entry))
+                    if len(entries) >= FETCH_BATCH:
+                        continue
+
+                    # Сигнал приходит от этого процесса, опрос по таймауту
+                    # подхватывает события, записанные другими процессами
+                    try:
+                        await asyncio.wait_for(signal.wait(), timeout=self.poll_interval)
+                    except asyncio.TimeoutError:
+                        pass
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    logger.error("Ошибка ленты событий заявок: %s", e, exc_info=True)
+                    await asyncio.sleep(self.poll_interval)
+        finally:
+            self.storage.unsubscribe_outbox(signal)
+
+    def _publish(self, event: FeedEvent) -> None:
+        self.last_id = event.id
+        self.events_total += 1
+        self._history.append(event)
+        for subscriber in list(self._subscribers):
+            try:
+                subscriber.queue.put_nowait(event)
+            except asyncio.QueueFull:
+                logger.warning("Клиент ленты событий не успевает читать и будет отключен")
+                self.dropped_clients += 1
+                self._drop(subscriber)
+
+    def _drop(self, subscriber: _Subscriber) -> None:
+        """Отключение подписчика: вместо событий в очередь попадает None"""
+        self._subscribers.discard(subscriber)
+        while not subscriber.queue.empty():
+            subscriber.queue.get_nowait()
+        subscriber.queue.put_nowait(None)
+
+    async def _backlog(self, last_event_id: int) -> List[FeedEvent]:
+        """События после last_event_id, пропущенные клиентом"""
+        if last_event_id >= self.last_id:
+            return []
+        if self._history and self._history[0].id <= last_event_id + 1:
+            return [event for event in self._history if event.id > last_event_id]
+
+        # В памяти нет нужных событий - читаем из базы
+        events: List[FeedEvent] = []
+        after_id = last_event_id
+        while len(events) < self.max_backfill:
+            entries = await self.storage.get_outbox_since(after_id, min(FETCH_BATCH, self.max_backfill - len(events)))
+            entries = [entry for entry in entries if entry.id <= self.last_id]
+            if not entries:
+                break
+            events.extend(FeedEvent(entry) for entry in entries)
+            after_id = entries[-1].id
+        return events
+
+    def _check_auth(self, request: web.Request) -> Optional[web.Response]:
+        # Токен только в заголовке: строка запроса с ним попала бы в журнал доступа
+        header = request.headers.get("Authorization", "")
+        scheme, _, token = header.partition(" ")
+        if scheme.lower() != "bearer" or not hmac.compare_digest(token.strip(), self.token):
+            return web.json_response({"error": "Требуется авторизация"}, status=401)
+        if len(self._subscribers) >= self.max_clients:
+            return web.json_response({"error": "Слишком много подключений к ленте"}, status=503)
+        return None
+
+    @staticmethod
+    def _last_event_id(request: web.Request) -> Optional[int]:
+        """Last-Event-ID из заголовка или параметра, ValueError для некорректного значения"""
+        value = request.headers.get("Last-Event-ID") or request.query.get("last_event_id")
+        return None if value is None else int(value)
+
+    def _prepare_subscription(self, request: web.Request):
+        """Проверка доступа и Last-Event-ID: (ответ с ошибкой или None, Last-Event-ID)"""
+        denied = self._check_auth(request)
+        if denied:
+            return denied, None
+        try:
+            return None, self._last_event_id(request)
+        except ValueError:
+            return web.json_response({"error": "Некорректный Last-Event-ID"}, status=400), None
+
+    async def _subscribe(self, last_event_id: Optional[int]):
+        """
+        Подписка с досылкой пропущенных событий
+
+        Подписчик регистрируется до чтения пропущенных событий, поэтому
+        ничего не теряется; повторы отсекаются по ID.
+        """
+        subscriber = _Subscriber(self.client_buffer)
+        self._subscribers.add(subscriber)
+        try:
+            sent_id = self.last_id if last_event_id is None else last_event_id
+            if last_event_id is not None:
+                for event in await self._backlog(last_event_id):
+                    yield event
+                    sent_id = event.id
+            while True:
+                event = await subscriber.queue.get()
+                if event is None:
+                    return
+                if event.id > sent_id:
+                    sent_id = event.id
+                    yield event
+        finally:
+            self._subscribers.discard(subscriber)
+
+    async def handle_sse(self, request: web.Request) -> web.StreamResponse:
+        """Лента в формате Server-Sent Events"""
+        denied, last_event_id = self._prepare_subscription(request)
+        if denied:
+            return denied
+
+        response = web.StreamResponse(headers={
+            "Content-Type": "text/event-stream; charset=utf-8",
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no"
+        })
+        await response.prepare(request)
+        await response.write(f"retry: 3000\n: last-id {self.last_id}\n\n".encode())
+
+        events = self._subscribe(last_event_id)
+        pending = asyncio.ensure_future(events.__anext__())
+        try:
+            while True:
+                done, _ = await asyncio.wait({pending}, timeout=self.heartbeat)
+                if not done:
+                    await response.write(b": ping\n\n")
+                    continue
+                try:
+                    event = pending.result()
+                except StopAsyncIteration:
+                    break
+                await response.write(event.sse)
+                pending = asyncio.ensure_future(events.__anext__())
+        except (ConnectionResetError, asyncio.CancelledError):
+            pass
+        finally:
+            pending.cancel()
+            try:
+                await pending
+            except (asyncio.CancelledError, StopAsyncIteration):
+                pass
+            await events.aclose()
+        return response
+
+    async def handle_websocket(self, request: web.Request) -> web.WebSocketResponse:
+        """Лента через WebSocket: каждое событие - текстовое сообщение JSON"""
+        denied, last_event_id = self._prepare_subscription(request)
+        if denied:
+            return denied
+
+        ws = web.WebSocketResponse(heartbeat=self.heartbeat)
+        await ws.prepare(request)
+
+        async def forward():
+            async for event in self._subscribe(last_event_id):
+                await ws.send_str(event.json)
+            await ws.close()
+
+        sender = asyncio.create_task(forward())
+        try:
+            # Входящие сообщения не ожидаются, чтение нужно для обработки закрытия
+            async for message in ws:
+                if message.type == WSMsgType.ERROR:
+                    break
+        finally:
+            sender.cancel()
+            try:
+                await sender
+            except (asyncio.CancelledError, ConnectionResetError):
+                pass
+        return ws
@@ -0,0 +1,189 @@
+"""
+API заявок для операторов
+
+GET /api/orders              - список с фильтрами status, source, created_from,
+                               created_to, q и курсорной пагинацией
+GET /api/orders/search?q=... - поиск по имени, телефону и тексту заявки
+GET /api/orders/{id}         - заявка по ID
+
+Доступ по заголовку Authorization: Bearer <OPERATOR_API_TOKEN>.
+Ответы содержат ETag, рассчитанный по времени изменения заявок, и на
+If-None-Match с тем же значением отдается 304 без тела. Список пишется
+в ответ потоково, большие страницы сжимаются gzip.
+"""
+
+import base64
+import binascii
+import hashlib
+import hmac
+import json
+import logging
+from datetime import datetime
+from typing import Any, Dict, Optional, Tuple
+
+from aiohttp import web
+
+from config.config import OPERATOR_API_CONFIG
+from services.storage_service import StorageService
+
+logger = logging.getLogger(__name__)
+
+# Размер порции, которой тело списка отправляется клиенту
+WRITE_CHUNK_SIZE = 64 * 1024
+
+def encode_cursor(order_id: int) -> str:
+    """Непрозрачный курсор для следующей страницы"""
+    return base64.urlsafe_b64encode(str(order_id).encode()).decode().rstrip("=")
+
+def decode_cursor(cursor: str) -> int:
+    """ID из курсора, ValueError для некорректного значения"""
+    try:
+        return int(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode())
+    except (binascii.Error, UnicodeDecodeError) as e:
+        raise ValueError(str(e))
+
+def etag_matches(request: web.Request, etag: str) -> bool:
+    """Совпадает ли ETag с заголовком If-None-Match"""
+    header = request.headers.get("If-None-Match")
+    if not header:
+        return False
+    candidates = [value.strip() for value in header.split(",")]
+    # Слабое сравнение: префикс W/ не учитывается
+    return "*" in candidates or etag.removeprefix("W/") in (value.removeprefix("W/") for value in candidates)
+
+class OrdersApi:
+    """Обработчики API заявок"""
+
+    def __init__(self, storage: StorageService, config: Optional[Dict[str, Any]] = None):
+        config = config or OPERATOR_API_CONFIG
+        self.storage = storage
+        self.token = config['token']
+        self.default_limit = config['default_limit']
+        self.max_limit = config['max_limit']
+        self.gzip_min_items = config['gzip_min_items']
+
+    def register(self, app: web.Application) -> None:
+        """Подключение маршрутов API к приложению"""
+        if not self.token:
+            logger.info("API заявок отключен: не задан OPERATOR_API_TOKEN")
+            return
+        app.router.add_get('/api/orders', self.handle_list)
+        app.router.add_get('/api/orders/search', self.handle_search)
+        app.router.add_get(r'/api/orders/{order_id:\d+}', self.handle_get)
+
+    def _check_auth(self, request: web.Request) -> Optional[web.Response]:
+        header = request.headers.get("Authorization", "")
+        scheme, _, token = header.partition(" ")
+        if scheme.lower() != "bearer" or not hmac.compare_digest(token.strip(), self.token):
+            return web.json_response(
+                {"error": "Требуется авторизация"}, status=401,
+                headers={"WWW-Authenticate": "Bearer"}
+            )
+        return None
+
+    def _parse_query(self, request: web.Request) -> Tuple[Dict[str, Any], Optional[int], int]:
+        """Фильтры, курсор и размер страницы из параметров запроса"""
+        query = request.query
+        filters: Dict[str, Any] = {}
+
+        if query.get("status"):
+            filters["status"] = query["status"]
+        if query.get("source"):
+            if query["source"] not in ("website", "vk"):
+                raise ValueError("source: ожидается website или vk")
+            filters["source"] = query["source"]
+        for name in ("created_from", "created_to"):
+            if query.get(name):
+                try:
+                    filters[name] = datetime.fromisoformat(query[name]).isoformat()
+                except ValueError:
+                    raise ValueError(f"{name}: ожидается дата в формате ISO 8601")
+        if query.get("q"):
+            filters["query"] = query["q"].strip()[:200]
+
+        before_id = None
+        if query.get("cursor"):
+            try:
+                before_id = decode_cursor(query["cursor"])
+            except ValueError:
+                raise ValueError("cursor: некорректное значение")
+
+        try:
+            limit = int(query.get("limit", self.default_limit))
+        except ValueError:
+            raise ValueError("limit: ожидается число")
+        return filters, before_id, max(1, min(limit, self.max_limit))
+
+    async def handle_get(self, request: web.Request) -> web.Response:
+        """Заявка по ID"""
+        denied = self._check_auth(request)
+        if denied:
+            return denied
+
+        order = await self.storage.get_order(int(request.match_info['order_id']), include_deleted=True)
+        if not order:
+            return web.json_response({"error": "Заявка не найдена"}, status=404)
+
+        version = (order.updated_at or order.created_at).isoformat()
+        etag = f'"{order.id}-{hashlib.sha1(version.encode()).hexdigest()[:16]}"'
+        headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+        if etag_matches(request, etag):
+            return web.Response(status=304, headers=headers)
+        return web.json_response(order.to_dict(), headers=headers)
+
+    async def handle_search(self, request: web.Request) -> web.StreamResponse:
+        """Поиск заявок: то же, что список, но параметр q обязателен"""
+        denied = self._check_auth(request)
+        if denied:
+            return denied
+        if not request.query.get("q", "").strip():
+            return web.json_response({"error": "Не указан параметр q"}, status=400)
+        return await self.handle_list(request)
+
+    async def handle_list(self, request: web.Request) -> web.StreamResponse:
+        """Страница заявок от новых к старым"""
+        denied = self._check_auth(request)
+        if denied:
+            return denied
+
+        try:
+            filters, before_id, limit = self._parse_query(request)
+        except ValueError as e:
+            return web.json_response({"error": str(e)}, status=400)
+
+        # ETag по ID и времени изменения заявок страницы (лишняя строка
+        # показывает, есть ли следующая страница)
+        versions = await self.storage.get_order_versions(filters, before_id, limit + 1)
+        digest = hashlib.sha1()
+        for order_id, version in versions:
+            digest.update(f"{order_id}:{version};".encode())
+        etag = f'W/"{digest.hexdigest()[:24]}"'
+        headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+        if etag_matches(request, etag):
+            return web.Response(status=304, headers=headers)
+
+        response = web.StreamResponse(headers=headers)
+        response.content_type = "application/json"
+        response.charset = "utf-8"
+        if len(versions) >= self.gzip_min_items and "gzip" in request.headers.get("Accept-Encoding", ""):
+            response.enable_compression(web.ContentCoding.gzip)
+        await response.prepare(request)
+
+        buffer = bytearray(b'{"items":[')
+        count = 0
+        last_id = None
+        async for order in self.storage.iter_orders(filters, before_id, limit):
+            if count:
+                buffer += b","
+            buffer += json.dumps(order, ensure_ascii=False).encode("utf-8")
+            count += 1
+            last_id = order["id"]
+            if len(buffer) >= WRITE_CHUNK_SIZE:
+                await response.write(bytes(buffer))
+                buffer.clear()
+
+        next_cursor = encode_cursor(last_id) if len(versions) > limit and last_id is not None else None
+        buffer += f'],"count":{count},"next_cursor":{json.dumps(next_cursor)}}}'.encode("utf-8")
+        await response.write(bytes(buffer))
+        await response.write_eof()
+        return response